@@ -8,7 +8,8 @@ from .base import success_response, error_response
 from core.config import cfg
 from apis.base import format_search_kw
 from core.print import print_warning, print_info, print_error, print_success
-from core.cache import clear_cache_pattern
+from core.cache import clear_cache_tags
+from core.pagination import decode_cursor, apply_cursor, fetch_page, InvalidCursor
 from tools.fix import fix_article
 router = APIRouter(prefix=f"/articles", tags=["文章管理"])
 
@@ -25,16 +26,18 @@ async def clean_orphan_articles(
         
         # 找出Articles表中mp_id不在Feeds表中的记录
         subquery = session.query(Feed.id).subquery()
+        orphan_mp_ids = [row[0] for row in session.query(Article.mp_id)
+                         .filter(~Article.mp_id.in_(subquery)).distinct().all()]
         deleted_count = session.query(Article)\
             .filter(~Article.mp_id.in_(subquery))\
             .delete(synchronize_session=False)
         
         session.commit()
+        # 孤立文章已全部删除，对应的计数行一并删除
+        DB.delete_article_counts(orphan_mp_ids)
         
-        # 清除相关缓存
-        clear_cache_pattern("articles_list")
-        clear_cache_pattern("home_page")
-        clear_cache_pattern("tag_detail")
+        # 清除相关缓存：全部文章列表、首页，以及被清理公众号的文章列表和详情
+        clear_cache_tags("feed:all", "view:home_page", *(f"feed:{mp_id}" for mp_id in orphan_mp_ids))
         
         return success_response({
             "message": "清理无效文章成功",
@@ -76,10 +79,8 @@ async def toggle_article_read_status(
         article.is_read = 1 if is_read else 0
         session.commit()
         
-        # 清除相关缓存
-        clear_cache_pattern("articles_list")
-        clear_cache_pattern("article_detail")
-        clear_cache_pattern("tag_detail")
+        # 清除相关缓存：只清除展示了这篇文章的列表页和详情页
+        clear_cache_tags(f"article:{article_id}")
         
         return success_response({
             "message": f"文章已标记为{'已读' if is_read else '未读'}",
@@ -127,16 +128,25 @@ async def get_articles(
     search: str = Query(None),
     mp_id: str = Query(None),
     has_content:bool=Query(False),
+    cursor: str = Query(None),
     current_user: dict = Depends(get_current_user_or_ak)
 ):
     session = DB.get_session()
     try:
+        try:
+            cursor_key = decode_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=fast_status.HTTP_400_BAD_REQUEST,
+                detail=error_response(code=40001, message=str(e))
+            )
       
         
         # 构建查询条件
         query = session.query(ArticleBase)
         if has_content:
-            query=session.query(Article)
+            from sqlalchemy.orm import undefer
+            query=session.query(Article).options(undefer(Article.content))
         if status:
             query = query.filter(Article.status == status)
         else:
@@ -150,10 +160,11 @@ async def get_articles(
         
         # 获取总数
         total = query.count()
-        query= query.order_by(Article.publish_time.desc()).offset(offset).limit(limit)
-        # query= query.order_by(Article.id.desc()).offset(offset).limit(limit)
-        # 分页查询（按发布时间降序）
-        articles = query.all()
+        # 分页查询（按发布时间降序），传入cursor时按 (publish_time, id) 键集分页
+        query= apply_cursor(query, cursor_key)
+        if cursor_key is None:
+            query= query.offset(offset)
+        articles, next_cursor = fetch_page(query, limit)
         
         # 打印生成的 SQL 语句（包含分页参数）
         print_warning(query.statement.compile(compile_kwargs={"literal_binds": True}))
@@ -176,7 +187,8 @@ async def get_articles(
         from .base import success_response
         return success_response({
             "list": article_list,
-            "total": total
+            "total": total,
+            "next_cursor": next_cursor
         })
     except HTTPException as e:
         raise e
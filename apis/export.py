@@ -22,7 +22,7 @@ async def export_mps(
     kw: str = Query(""),
     current_user: dict = Depends(get_current_user_or_ak)
 ):
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
         from core.models.feed import Feed
         query = session.query(Feed)
@@ -165,7 +165,7 @@ async def export_mps_opml(
     kw: str = Query(""),
     current_user: dict = Depends(get_current_user_or_ak)
 ):
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
         from core.models.feed import Feed
         query = session.query(Feed)
@@ -221,7 +221,7 @@ async def export_tags(
         kw: str = Query(""),
         current_user: dict = Depends(get_current_user_or_ak)
 ):
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
         from core.models.tags import Tags
         query = session.query(Tags)
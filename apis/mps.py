@@ -12,7 +12,7 @@ from core.config import cfg
 from core.res import save_avatar_locally
 import io
 import os
-from jobs.article import UpdateArticle
+from jobs.article import UpdateArticle,UpdateArticles
 from driver.wxarticle import WXArticleFetcher
 router = APIRouter(prefix=f"/mps", tags=["公众号管理"])
 # import core.db as db
@@ -55,6 +55,7 @@ async def get_mps(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     kw: str = Query(""),
+    exact: bool = Query(False, description="是否实时统计文章数（同时校正计数表）"),
     current_user: dict = Depends(get_current_user_or_ak)
 ):
     session = DB.get_session()
@@ -65,6 +66,7 @@ async def get_mps(
             query = query.filter(Feed.mp_name.ilike(f"%{kw}%"))
         total = query.count()
         mps = query.order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
+        counts = DB.get_article_counts([mp.id for mp in mps], exact=exact)
         return success_response({
             "list": [{
                 "id": mp.id,
@@ -72,6 +74,7 @@ async def get_mps(
                 "mp_cover": mp.mp_cover,
                 "mp_intro": mp.mp_intro,
                 "status": mp.status,
+                "article_count": counts.get(mp.id, 0),
                 "created_at": mp.created_at.isoformat()
             } for mp in mps],
             "page": {
@@ -122,7 +125,7 @@ async def update_mps(
         def UpArt(mp):
             from core.wx import WxGather
             wx=WxGather().Model()
-            wx.get_Articles(mp.faker_id,Mps_id=mp.id,Mps_title=mp.mp_name,CallBack=UpdateArticle,start_page=start_page,MaxPage=end_page)
+            wx.get_Articles(mp.faker_id,Mps_id=mp.id,Mps_title=mp.mp_name,Batch_CallBack=UpdateArticles,start_page=start_page,MaxPage=end_page)
             result=wx.articles
         import threading
         threading.Thread(target=UpArt,args=(mp,)).start()
@@ -248,7 +251,7 @@ async def add_mp(
             from core.queue import TaskQueue
             from core.wx import WxGather
             Max_page=int(cfg.get("max_page","2"))
-            TaskQueue.add_task( WxGather().Model().get_Articles,faker_id=feed.faker_id,Mps_id=feed.id,CallBack=UpdateArticle,MaxPage=Max_page,Mps_title=mp_name)
+            TaskQueue.add_task( WxGather().Model().get_Articles,faker_id=feed.faker_id,Mps_id=feed.id,Batch_CallBack=UpdateArticles,MaxPage=Max_page,Mps_title=mp_name)
             
         return success_response({
             "id": feed.id,
@@ -289,6 +292,7 @@ async def delete_mp(
                 )
             )
         
+        # 只删除公众号，文章及其计数保留到清理孤立文章时一并删除
         session.delete(mp)
         session.commit()
         return success_response({
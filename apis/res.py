@@ -1,18 +1,129 @@
 from fastapi import APIRouter, Request, HTTPException
 import httpx
-from fastapi.responses import Response
+from fastapi.responses import Response, FileResponse, StreamingResponse
 import os
 import hashlib
 import time
 import json
+import asyncio
+import threading
 from core.config import cfg
+from core.print import print_warning
 CACHE_DIR = cfg.get("cache.dir","data/cache")
 CACHE_TTL = 3600  # 缓存过期时间1小时
+# 缓存的上游响应头，其余（Content-Length、连接相关等）由本服务重新生成
+CACHE_HEADERS = ("content-type", "content-encoding", "cache-control", "etag", "last-modified", "expires")
+# 逐跳响应头，不转发给浏览器
+HOP_HEADERS = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+               "transfer-encoding", "upgrade"}
 
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
 
+
+def _http2_available() -> bool:
+    try:
+        import h2
+        return True
+    except ImportError:
+        return False
+
+
+def _log_close_error(task: asyncio.Task) -> None:
+    # 旧循环已结束时底层连接可能已不可用，关闭失败只记录不抛出
+    if not task.cancelled() and task.exception() is not None:
+        print_warning(f"关闭旧连接池失败: {task.exception()}")
+
+
+class ImageProxy:
+    """图片反向代理的共享连接池
+
+    所有请求共用一个 httpx.AsyncClient（启用时使用HTTP/2，需安装h2），按 res.proxy.* 限制连接数；
+    每个上游域名同时进行的请求数不超过 per_host，文章页一次加载几十张图片时排队而不是同时建立连接
+    """
+    def __init__(self):
+        self.http2 = str(cfg.get("res.proxy.http2", True)).lower() not in ("false", "0", "") and _http2_available()
+        self.max_connections = int(cfg.get("res.proxy.max_connections", 100) or 100)
+        self.max_keepalive = int(cfg.get("res.proxy.max_keepalive", 20) or 20)
+        self.per_host = int(cfg.get("res.proxy.per_host", 8) or 8)
+        self.timeout = float(cfg.get("res.proxy.timeout", 15) or 15)
+        self.requests = 0
+        self.cache_hits = 0
+        self.failed = 0
+        self._client = None
+        self._loop = None
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def _bind(self) -> None:
+        # 连接池和信号量只能在创建它们的事件循环中使用，循环变化时（如测试中）关闭旧连接池后重新创建
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._client is not None and self._loop is loop:
+                return
+            old_client, old_loop = self._client, self._loop
+            # 不跟随重定向（与原实现一致），3xx原样返回，上游无法把请求转到允许的域名之外
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5)),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_keepalive),
+                headers={"User-Agent": cfg.get("user_agent", "") or "Mozilla/5.0"},
+            )
+            self._loop = loop
+            self._limits = {}
+        if old_client is not None:
+            self._discard(old_client, old_loop)
+
+    @staticmethod
+    def _discard(client: httpx.AsyncClient, loop) -> None:
+        """关闭旧事件循环上的连接池：旧循环仍在运行时交给它关闭，已结束时在当前循环中关闭"""
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        asyncio.get_running_loop().create_task(client.aclose()).add_done_callback(_log_close_error)
+
+    def client(self) -> httpx.AsyncClient:
+        self._bind()
+        return self._client
+
+    def limit(self, host: str) -> asyncio.Semaphore:
+        self._bind()
+        semaphore = self._limits.get(host)
+        if semaphore is None:
+            semaphore = self._limits[host] = asyncio.Semaphore(self.per_host)
+        return semaphore
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> dict:
+        return {"http2": self.http2, "per_host": self.per_host, "hosts": len(self._limits),
+                "requests": self.requests, "cache_hits": self.cache_hits, "failed": self.failed}
+
+
+# 进程内共享的图片代理
+PROXY = ImageProxy()
+
+
+class ProxyResponse(StreamingResponse):
+    """流式代理响应：无论输出完成、客户端断开还是尚未开始输出，结束后都关闭上游响应并释放并发名额"""
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.cleanup()
+
+
 router = APIRouter(prefix="/res", tags=["资源反向代理"])
+router.add_event_handler("shutdown", PROXY.close)
+
 @router.api_route("/logo/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"], operation_id="reverse_proxy_logo")
 async def reverse_proxy(request: Request, path: str):
     hosts=["mmbiz.qpic.cn","mmbiz.qlogo.cn","mmecoa.qpic.cn"]
@@ -30,65 +141,111 @@ async def reverse_proxy(request: Request, path: str):
     # 生成缓存文件名
     cache_key = f"{request.method}_{path}".encode('utf-8')
     cache_filename = os.path.join(CACHE_DIR, hashlib.sha256(cache_key).hexdigest())
+    headers_filename = cache_filename + ".headers"
     
     # 检查缓存是否存在且有效
     if os.path.exists(cache_filename):
         file_mtime = os.path.getmtime(cache_filename)
         if time.time() - file_mtime < CACHE_TTL:
-            with open(cache_filename, 'rb') as f:
-                content = f.read()
-            
-            # 读取缓存的状态码和响应头
-            headers_filename = cache_filename + ".headers"
+            # 读取缓存的响应头
+            headers = {}
             if os.path.exists(headers_filename):
                 with open(headers_filename, 'r', encoding='utf-8') as f:
-                    headers = json.load(f)
-            else:
-                headers = {}
-            
-            media_type = headers.get("Content-Type")
-            status_code = 200  # 默认状态码
-            
-            return Response(
-                content=content,
-                status_code=status_code,
+                    headers = {k: v for k, v in json.load(f).items() if k.lower() in CACHE_HEADERS}
+            PROXY.cache_hits += 1
+            # 直接发送缓存文件，不读入内存
+            return FileResponse(
+                cache_filename,
+                status_code=200,
                 headers=headers,
-                media_type=media_type
+                media_type=headers.get("content-type") or headers.get("Content-Type")
             )
     
     target_url = path
-    
-    client = httpx.AsyncClient()
     request_data = await request.body()
-    headers = dict(request.headers)
-    headers.pop("host", host)
-    headers.pop("referer", None)
-    print(headers)
-    resp = await client.request(
-        method=request.method,
-        url=target_url,
-        # headers=headers,
-        content=request_data
-    )
-    
-    content = resp.content
-    status_code = resp.status_code
-    headers = dict(resp.headers)
-    media_type = resp.headers.get("Content-Type")
+    client = PROXY.client()
+    semaphore = PROXY.limit(host)
+    PROXY.requests += 1
+    await semaphore.acquire()
+    # 名额交给ProxyResponse之前出现任何异常（包括请求被取消）都要关闭上游响应并释放名额
+    resp = None
+    owned = False
     try:
-        # 缓存响应
-        with open(cache_filename, 'wb') as f:
-            f.write(content)
-        
-        # 缓存响应头
-        headers_filename = cache_filename + ".headers"
-        with open(headers_filename, 'w', encoding='utf-8') as f:
-            json.dump(headers, f)
-    except Exception as e:
-        print(f"缓存响应失败: {str(e)}")    
-    return Response(
-        content=content,
-        status_code=status_code,
-        headers=headers,
-        media_type=media_type
-    )
\ No newline at end of file
+        try:
+            resp = await client.send(client.build_request(
+                method=request.method,
+                url=target_url,
+                content=request_data
+            ), stream=True)
+        except httpx.HTTPError as e:
+            PROXY.failed += 1
+            print_warning(f"代理请求失败 {target_url}: {e}")
+            return Response(content="获取资源失败", status_code=502)
+
+        status_code = resp.status_code
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in HOP_HEADERS}
+        # 只缓存成功的GET响应，边转发边写入临时文件，完整结束后再替换缓存
+        tmp_filename = f"{cache_filename}.{os.getpid()}.{id(resp)}.tmp" if request.method == "GET" and status_code == 200 else None
+        state = {"closed": False}
+
+        async def cleanup():
+            if state["closed"]:
+                return
+            state["closed"] = True
+            await resp.aclose()
+            semaphore.release()
+            if tmp_filename is not None:
+                try:
+                    os.unlink(tmp_filename)
+                except OSError:
+                    pass
+
+        async def body():
+            f = None
+            try:
+                if tmp_filename is not None:
+                    try:
+                        f = open(tmp_filename, 'wb')
+                    except OSError as e:
+                        print_warning(f"缓存响应失败: {str(e)}")
+                async for chunk in resp.aiter_raw():
+                    if f is not None:
+                        f.write(chunk)
+                    yield chunk
+                if f is not None:
+                    f.close()
+                    f = None
+                    try:
+                        # 先写响应头再替换缓存文件，读到缓存文件时响应头一定存在
+                        headers_tmp = f"{headers_filename}.{os.getpid()}.{id(resp)}.tmp"
+                        with open(headers_tmp, 'w', encoding='utf-8') as hf:
+                            json.dump({k: v for k, v in headers.items() if k.lower() in CACHE_HEADERS}, hf)
+                        os.replace(headers_tmp, headers_filename)
+                        os.replace(tmp_filename, cache_filename)
+                    except OSError as e:
+                        print_warning(f"缓存响应失败: {str(e)}")
+            except httpx.HTTPError as e:
+                # 已发送响应头，只能中断连接，浏览器不会把不完整的图片当作成功
+                PROXY.failed += 1
+                print_warning(f"代理响应中断 {target_url}: {e}")
+                raise
+            finally:
+                if f is not None:
+                    f.close()
+                await cleanup()
+
+        response = ProxyResponse(
+            body(),
+            cleanup,
+            status_code=status_code,
+            headers=headers,
+            media_type=resp.headers.get("Content-Type")
+        )
+        owned = True
+        return response
+    finally:
+        if not owned:
+            if resp is not None:
+                await resp.aclose()
+            semaphore.release()
+    
\ No newline at end of file
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request,Response
 from fastapi import status
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from core.db import DB
-from core.rss import RSS
+from core.rss import RSS, VALIDATORS, FEED_VERSIONS, feed_validators
+from core.prerender import PRERENDER
+from core.websub import HUB
 from core.models.feed import Feed
 import json
 from .base import success_response, error_response
@@ -10,6 +12,11 @@ from core.auth import get_current_user
 from core.config import cfg
 from apis.base import format_search_kw
 from core.print import print_error,print_success
+from core.pagination import decode_cursor, encode_cursor, apply_cursor, InvalidCursor
+from urllib.parse import urlencode, urlsplit, parse_qsl
+import asyncio
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
 def verify_rss_access(current_user: dict = Depends(get_current_user)):
     """
     RSS访问认证方法
@@ -67,9 +74,8 @@ async def get_rss_feeds(
             content=rss_xml,
             media_type="application/xml"
         )
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
-        total = session.query(Feed).count()
         feeds = session.query(Feed).order_by(Feed.created_at.desc()).limit(limit).offset(offset).all()
         rss_domain=cfg.get("rss.base_url",request.base_url)
         # 转换为RSS格式数据
@@ -105,9 +111,15 @@ async def get_rss_feeds(
 @router.get("/content/{content_id}", summary="获取缓存的文章内容")
 async def get_rss_feed(content_id: str):
     rss = RSS()
-    content = rss.get_cached_content(content_id)
+    parts = rss.get_cached_parts(content_id)
+    if parts is None:
+        # 正文在入库时写入，早于此版本采集的文章首次访问时从数据库补写一次
+        content = DB.load_article_content(content_id)
+        if content is not None:
+            rss.cache_content(content_id, content)
+            parts = rss.get_cached_parts(content_id)
       
-    if content is None:
+    if parts is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=error_response(
@@ -115,6 +127,7 @@ async def get_rss_feed(content_id: str):
                 message="文章内容未找到"
             )
         )
+    content, body = parts
     title=content['title']
     html='''
     <!DOCTYPE html>
@@ -140,15 +153,167 @@ async def get_rss_feed(content_id: str):
     </body>
     </html>
     '''
-    text=rss.add_logo_prefix_to_urls(content['content'])
-    html=html.format(title=title,text=text,source=content['mp_name'],publish_time=content['publish_time'])
-    return Response(
-            content=html,
+    # 正文直接输出存储中的字节（未压缩时为段文件的memoryview），只格式化前后的页面框架
+    head, tail = html.split("{text}")
+    head=head.format(title=title,source=content['mp_name'],publish_time=content['publish_time'])
+    return StreamingResponse(
+            iter([head.encode("utf-8"), body, tail.encode("utf-8")]),
             media_type="text/html"
         )
 def UpdateArticle(art:dict):
             return DB.add_article(art)
 
+def next_page_url(request: Request, rss_domain: str, next_cursor: str):
+    """生成下一页链接：保留当前查询参数，去掉offset并带上cursor"""
+    if not next_cursor:
+        return None
+    params = dict(request.query_params)
+    params.pop("offset", None)
+    params["cursor"] = next_cursor
+    return f"{str(rss_domain).rstrip('/')}{request.url.path}?{urlencode(params)}"
+
+def cache_headers(etag: str, last_modified: int) -> dict:
+    """订阅源响应的缓存头"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={VALIDATORS.max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if last_modified:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+def _flight_timeout() -> float:
+    return float(cfg.get("rss.coalesce_timeout", 30) or 0)
+
+class FeedResponse(StreamingResponse):
+    """流式订阅源响应：无论输出完成、客户端断开还是尚未开始输出，结束后都释放生成登记，等待的请求随即读取缓存"""
+    def __init__(self, content, rss: RSS, **kwargs):
+        super().__init__(content, **kwargs)
+        self.rss = rss
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.rss.end_flight()
+
+def cached_response(rss: RSS, request: Request, validator, links: dict):
+    """返回缓存文件，客户端支持时返回预压缩版本；没有缓存文件时返回None
+
+    没有传入校验值（进程内校验值已过期）时使用缓存文件生成时记录的校验值，
+    客户端的校验值一致时返回304
+    """
+    if validator is None:
+        validator = rss.cached_validator()
+    if validator is not None and is_not_modified(request, *validator):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**cache_headers(*validator), **links})
+    body, encoding = rss.read_cache(request.headers.get("accept-encoding", ""))
+    if body is None:
+        return None
+    headers = cache_headers(*validator) if validator is not None else {"Vary": "Accept-Encoding"}
+    headers.update(links)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=body,
+        media_type=rss.get_type(),
+        headers=headers
+    )
+
+def is_not_modified(request: Request, etag: str, last_modified: int) -> bool:
+    """判断条件请求是否命中：优先比较If-None-Match（弱比较），未携带时再比较If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def websub_links(request: Request, rss_domain: str, feed_id: str, tag_id: str, ext: str, limit: int, content_type: str):
+    """订阅源首页声明的WebSub hub地址和自身地址（topic），未启用或无法订阅时返回 (None, None)"""
+    if not HUB.enabled or ext not in ("rss", "xml", "atom", "json"):
+        return None, None
+    query = {"limit": limit}
+    if content_type:
+        query["ctype"] = content_type
+    # Hub只接受 rss.base_url 下的topic，未配置时不声明hub
+    base_url = str(rss_domain or request.base_url)
+    self_url = f"{base_url.rstrip('/')}{request.url.path}?{urlencode(query)}"
+    if HUB.topic(self_url) is None:
+        return None, None
+    return HUB.get_hub_url(base_url), self_url
+
+def websub_headers(hub_url: str, self_url: str) -> dict:
+    if not hub_url:
+        return {}
+    return {"Link": f'<{hub_url}>; rel="hub", <{self_url}>; rel="self"'}
+
+def replay_feed(path: str, base_url: str, feed_id: str, tag_id: str, ext: str, limit: int, content_type: str, kw: str = ""):
+    """在进程内重放一次订阅源首页请求，返回 (Content-Type, 内容)，同时生成当前版本的缓存文件"""
+    base = urlsplit(base_url)
+    query = {"limit": limit}
+    if content_type:
+        query["ctype"] = content_type
+    request = Request({
+        "type": "http",
+        "method": "GET",
+        "scheme": base.scheme or "http",
+        "path": path,
+        "root_path": base.path.rstrip("/"),
+        "query_string": urlencode(query).encode("latin-1"),
+        "headers": [(b"host", base.netloc.encode("latin-1"))],
+        "prerender": True,
+    })
+    async def render():
+        response = await get_mp_articles_source(request=request, feed_id=feed_id, tag_id=tag_id, ext=ext, limit=limit,
+                                                offset=0, kw=kw, is_update=False, content_type=content_type,
+                                                template=None, cursor=None)
+        if not isinstance(response, StreamingResponse):
+            return response.media_type, response.body
+        chunks = []
+        try:
+            async for chunk in response.body_iterator:
+                chunks.append(chunk.encode("utf-8") if isinstance(chunk, str) else bytes(chunk))
+        finally:
+            # 直接读取输出而不经过响应发送，需要自行释放生成登记
+            if isinstance(response, FeedResponse):
+                response.rss.end_flight()
+        return response.media_type, b"".join(chunks)
+    return asyncio.run(render())
+
+def prerender_variant(variant: tuple):
+    """按访问记录重放一次订阅源请求，生成当前版本的缓存文件（缓存已是最新时直接返回）"""
+    path, feed_id, tag_id, ext, limit, content_type, base_url = variant
+    replay_feed(path, base_url, feed_id, tag_id, ext, limit, content_type)
+
+def websub_content(topic: dict):
+    """WebSub内容分发：按订阅的topic生成订阅源内容"""
+    return replay_feed(topic["path"], topic["base_url"], topic["feed_id"], topic["tag_id"], topic["ext"],
+                       topic["limit"], topic["content_type"], kw=topic["kw"])
+
+PRERENDER.set_renderer(prerender_variant)
+HUB.set_fetcher(websub_content)
+
+
+@feed_router.post("/hub", summary="WebSub订阅/退订")
+async def websub_hub(request: Request):
+    """WebSub Hub：接收 application/x-www-form-urlencoded 的 hub.mode/hub.topic/hub.callback 等参数，
+    校验订阅者意图后生效，订阅源有新文章时推送内容"""
+    if not HUB.enabled:
+        return Response(content="WebSub未启用", status_code=status.HTTP_404_NOT_FOUND, media_type="text/plain")
+    form = dict(parse_qsl((await request.body()).decode("utf-8", "replace"), keep_blank_values=True))
+    error = HUB.request(form)
+    if error:
+        return Response(content=error, status_code=status.HTTP_400_BAD_REQUEST, media_type="text/plain")
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
 
 @router.api_route("/{feed_id}/fresh", summary="更新并获取公众号文章RSS")
 async def update_rss_feeds( 
@@ -180,30 +345,69 @@ async def get_mp_articles_source(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     kw:str="",
-    is_update:bool=True,
+    is_update:bool=False,
     content_type:str=Query(None,alias="ctype"),
-    template:str=None
+    template:str=None,
+    cursor:str=None
     # current_user: dict = Depends(get_current_user)
 ):
-    rss=RSS(name=f'{tag_id}_{feed_id}_{limit}_{offset}',ext=ext)
-    rss.set_content_type(content_type)
-    rss_xml = rss.get_cache()
-    if rss_xml is not None and is_update==False:
-         return Response(
-            content=rss_xml,
-            media_type=rss.get_type()
+    try:
+        cursor_key = decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error_response(code=40001, message=str(e))
         )
-    session = DB.get_session()
+    rss_domain=cfg.get("rss.base_url",str(request.base_url))
+    # 首页声明WebSub的hub和自身地址，翻页和模板输出不声明
+    hub_url, self_url = (None, None) if cursor or offset or template is not None else \
+        websub_links(request, rss_domain, feed_id, tag_id, ext, limit, content_type)
+    links=websub_headers(hub_url, self_url)
+    # 搜索词、内容类型、模板、域名和WebSub地址不同的订阅源分别缓存
+    variant=hashlib.md5(repr((kw, content_type, template, rss_domain)+((hub_url, self_url) if hub_url else ())).encode("utf-8")).hexdigest()[:8]
+    rss=RSS(name=f'{tag_id}_{feed_id}_{limit}_{offset}'+(f'_{cursor}' if cursor else '')+f'_{variant}',ext=ext)
+    rss.set_content_type(content_type)
+    # 记录首页请求的访问频率，采集完成后据此预生成热门订阅源
+    prerender_variant=None
+    if not kw and not cursor and not offset and template is None and not request.scope.get("prerender"):
+        prerender_variant=(request.url.path, feed_id, tag_id, ext, limit, content_type, str(request.base_url))
+        PRERENDER.record(prerender_variant)
+    # 先取版本号再查询，查询期间有新文章写入时缓存按旧版本记录，下次请求会重新生成
+    version=FEED_VERSIONS.get(FEED_VERSIONS.key(feed_id, tag_id))
+    rss.set_version(version)
+    # 版本未变化且校验值与客户端一致时直接返回304，不访问数据库
+    validator=VALIDATORS.get(rss.rss_file, version)
+    if validator is not None and is_not_modified(request, *validator):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**cache_headers(*validator), **links})
+    if is_update==False and rss.is_current():
+        # 直接返回缓存文件，客户端支持时返回预压缩版本，不再逐请求压缩
+        response = cached_response(rss, request, validator, links)
+        if response is not None:
+            return response
+    if is_update==False and template is None:
+        # 有新文章但旧缓存过期不久：先返回旧内容，后台重新生成（同一变体只生成一次）
+        if prerender_variant is not None and rss.is_stale(float(cfg.get("rss.stale_ttl", 60) or 0)) \
+                and PRERENDER.refresh(prerender_variant):
+            response = cached_response(rss, request, None, links)
+            if response is not None:
+                return response
+        # 同一订阅源同一版本只由一个请求查询生成，其他请求等待生成完成后读取缓存文件
+        if not rss.begin_flight(_flight_timeout()) and await rss.wait_flight(_flight_timeout()):
+            response = cached_response(rss, request, VALIDATORS.get(rss.rss_file, version), links)
+            if response is not None:
+                return response
+    # 流式输出会在其他线程继续读取，使用独立会话并在输出结束后关闭
+    session = DB.open_read_session()
     try:
         from core.models.article import Article
         from core.models.tags import Tags
+        from core.models.tag_feed import TagFeed
         # 查询公众号信息
         feed = session.query(Feed)
-        query=session.query(Feed, Article).join(Article, Feed.id == Article.mp_id)
-        rss_domain=cfg.get("rss.base_url",str(request.base_url))
+        from sqlalchemy.orm import undefer
+        tags=None
         if feed_id not in ["all",None]:
             feed=feed.filter(Feed.id == feed_id).first()
-            query=query.filter(Article.mp_id==feed_id)
         else:
             feed=Feed()
             feed.mp_name=cfg.get("rss.title","WeRss") or "WeRss"
@@ -213,8 +417,6 @@ async def get_mp_articles_source(
             if tag_id is not None:
                 tags=session.query(Tags).filter(Tags.id == tag_id).first()
                 if tags:
-                    mps_ids = [str(mp['id']) for mp in json.loads(tags.mps_id)] if tags.mps_id else []
-                    query=query.filter(Feed.id.in_(mps_ids))
                     feed.mp_name = tags.name
                     feed.mp_intro = tags.intro
                     feed.mp_cover = f'{rss_domain}{tags.cover}'
@@ -228,56 +430,78 @@ async def get_mp_articles_source(
                     message="公众号不存在"
                 )
             )
-      
-        # 查询文章列表
-        total = query.count()
-        # articles = query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
-        if kw!="":
-            query=query.filter(format_search_kw(kw))
-        articles =query.order_by(Article.publish_time.desc()).limit(limit).offset(offset).all()
+
+        def articles_query(*entities):
+            """按当前订阅源条件查询文章，条目查询和校验值探测共用同一组条件"""
+            query=session.query(*entities).select_from(Feed).join(Article, Feed.id == Article.mp_id)
+            if feed_id not in ["all",None]:
+                query=query.filter(Article.mp_id==feed_id)
+            elif tags:
+                query=query.join(TagFeed, TagFeed.mp_id == Article.mp_id).filter(TagFeed.tag_id == tags.id)
+            if kw!="":
+                query=query.filter(format_search_kw(kw))
+            # 传入cursor时按 (publish_time, id) 键集分页，否则兼容offset分页
+            query=apply_cursor(query, cursor_key)
+            if cursor_key is None and offset:
+                query=query.offset(offset)
+            return query.limit(limit+1)
+
+        # 只读取条目ID和时间戳计算校验值，未变化时不再读取正文
+        etag, last_modified = feed_validators(
+            articles_query(Article.id, Article.publish_time, Article.updated_at, Article.has_content).all(),
+            ext, rss.get_content_type(), content_type, template, kw, rss_domain,
+            cfg.get("rss.full_context",False), cfg.get("rss.add_cover",False), cfg.get("rss.cdata",False), cfg.get("rss.local",False),
+            feed.mp_name, feed.mp_intro, feed.mp_cover)
+        VALIDATORS.set(rss.rss_file, etag, last_modified, version)
+        rss.set_validator(etag, last_modified)
+        if is_not_modified(request, etag, last_modified):
+            session.close()
+            rss.end_flight()
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**cache_headers(etag, last_modified), **links})
+        query=articles_query(Feed, Article).options(undefer(Article.content))
         # 转换为RSS格式数据
-        from datetime import datetime, timezone, timedelta
-        cst = timezone(timedelta(hours=8))
-        rss_list = [{
-            "id": str(article.id),
-            "title": article.title or "",
-            "link":  f"{rss_domain}/views/article/{article.id}" if cfg.get("rss.local",False) else article.url,
-            "description": article.description if article.description != "" else article.title or "",
-            "content": article.content or "",
-            "image": article.pic_url or "",
-            "mp_name":_feed.mp_name or "",
-            "updated": datetime.fromtimestamp(article.publish_time, tz=cst),
-            "feed": {
-                    "id":_feed.id,
-                    "name":_feed.mp_name,
-                    "cover":_feed.mp_cover,
-                    "intro":_feed.mp_intro
-            }
-        } for _feed,article in articles]
-        
+        page = {"next_cursor": None}
+        def rss_items():
+            """从数据库游标逐条读取文章，多取的一条只用于生成下一页游标"""
+            last = None
+            try:
+                for i, (_feed, article) in enumerate(query.yield_per(20)):
+                    if i >= limit:
+                        page["next_cursor"] = encode_cursor(last.publish_time, last.id)
+                        break
+                    last = article
+                    yield {
+                        "id": str(article.id),
+                        "title": article.title or "",
+                        "link":  f"{rss_domain}/views/article/{article.id}" if cfg.get("rss.local",False) else article.url,
+                        "description": article.description if article.description != "" else article.title or "",
+                        "content": article.content or "",
+                        "image": article.pic_url or "",
+                        "mp_name":_feed.mp_name or "",
+                        "publish_time": article.publish_time or 0,
+                        "feed": {
+                                "id":_feed.id,
+                                "name":_feed.mp_name,
+                                "cover":_feed.mp_cover,
+                                "intro":_feed.mp_intro
+                        }
+                    }
+            except Exception as e:
+                print_error(f"获取RSS错误:{e}")
+                raise
+            finally:
+                session.close()
 
-        # 缓存文章内容
-        for _feed,article in articles:
-            content_data = {
-                "id": article.id,
-                "title": article.title,
-                "content": article.content,
-                "publish_time": article.publish_time,
-                "mp_id": article.mp_id,
-                "pic_url": article.pic_url,
-                "mp_name": _feed.mp_name
-            }
-            rss.cache_content(article.id, content_data)
-        # 生成RSS XML
-        rss_xml = rss.generate(rss_list,ext=ext, title=f"{feed.mp_name}",link=rss_domain,description=feed.mp_intro,image_url=feed.mp_cover,template=template)
-        
-        return Response(
-            content=rss_xml,
-            media_type=rss.get_type()
-        )
+        # 边查询边输出，同时写入缓存文件
+        chunks = rss.stream(rss_items(),ext=ext, title=f"{feed.mp_name}",link=rss_domain,description=feed.mp_intro,image_url=feed.mp_cover,template=template,
+                            next_url=lambda: next_page_url(request, rss_domain, page["next_cursor"]), hub_url=hub_url, self_url=self_url)
+        return FeedResponse(chunks, rss, media_type=rss.get_type(), headers={**cache_headers(etag, last_modified), **links})
     except Exception as e:
+        session.close()
+        rss.end_flight()
         print_error(f"获取RSS错误:{e}")
         # raise
+        rss_xml = rss.get_cache()
         return Response(
              content=rss_xml,
              media_type=rss.get_type()
@@ -294,9 +518,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 
 
 @feed_router.get("/search/{kw}/{feed_id}.{ext}", summary="获取公众号文章源")
@@ -308,9 +533,10 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 @feed_router.get("/tag/{tag_id}.{ext}", summary="获取公众号文章源")
 async def rss(
     request: Request,
@@ -321,8 +547,9 @@ async def rss(
     offset: int = Query(0, ge=0),
     kw:str="",
     content_type:str=Query(None,alias="ctype"),
-    is_update:bool=True
+    is_update:bool=False,
+    cursor:str=None
 ):
-    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type)
+    return await get_mp_articles_source(request=request,feed_id=feed_id, tag_id=tag_id,limit=limit,offset=offset, is_update=is_update,ext=ext,kw=kw,content_type=content_type,cursor=cursor)
 
 
@@ -65,6 +65,12 @@ async def system_resources(
             message=f"获取系统资源失败: {str(e)}"
         )
 from core.article_lax import get_article_info
+from core.db import DB
+from core.rss import FRAGMENTS, FEED_VERSIONS
+from core.prerender import PRERENDER
+from core.websub import HUB
+from core.cache import view_cache, data_cache
+from apis.res import PROXY
 from .ver import API_VERSION
 from core.base import VERSION as CORE_VERSION,LATEST_VERSION
 @router.get("/info", summary="获取系统信息")
@@ -110,6 +116,14 @@ async def get_system_info(
             },
             "article":get_article_info(),
             'queue':TaskQueue.get_queue_info(),
+            'db':DB.get_health(),
+            'rss_fragments':FRAGMENTS.stats(),
+            'rss_versions':FEED_VERSIONS.stats(),
+            'rss_prerender':PRERENDER.stats(),
+            'websub':HUB.stats(),
+            'view_cache':view_cache.stats(),
+            'data_cache':data_cache.stats(),
+            'res_proxy':PROXY.stats(),
         }
         return success_response(data=system_info)
     except Exception as e:
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from schemas.tags import Tags, TagsCreate
 from .base import success_response, error_response
 from core.auth import get_current_user_or_ak
-from core.cache import clear_cache_pattern
+from core.cache import clear_cache_tags
 
 # 标签管理API路由
 # 提供标签的增删改查功能
@@ -81,8 +81,7 @@ async def create_tag(tag: TagsCreate, db: Session = Depends(get_db),cur_user: di
         db.refresh(db_tag)
         
         # 清除相关缓存
-        clear_cache_pattern("home_page")
-        clear_cache_pattern("tag_detail")
+        clear_cache_tags("view:home_page", "view:tags_page", f"tag:{db_tag.id}")
         
         return success_response(data=db_tag)
     except Exception as e:
@@ -153,8 +152,7 @@ async def update_tag(tag_id: str, tag_data: TagsCreate, db: Session = Depends(ge
         db.refresh(tag)
         
         # 清除相关缓存
-        clear_cache_pattern("home_page")
-        clear_cache_pattern("tag_detail")
+        clear_cache_tags("view:home_page", "view:tags_page", f"tag:{tag_id}")
         
         return success_response(data=tag)
     except Exception as e:
@@ -183,8 +181,7 @@ async def delete_tag(tag_id: str, db: Session = Depends(get_db),cur_user: dict =
         db.commit()
         
         # 清除相关缓存
-        clear_cache_pattern("home_page")
-        clear_cache_pattern("tag_detail")
+        clear_cache_tags("view:home_page", "view:tags_page", f"tag:{tag_id}")
         
         return success_response(message="Tag deleted successfully")
     except Exception as e:
@@ -17,9 +17,9 @@ class ArticleInfo():
     mp_all_count:int=0
 def laxArticle():
     info=ArticleInfo()
-    session=DB.get_session()
+    session=DB.get_read_session()
     #获取没有内容的文章数量 - 只查询content字段
-    info.no_content_count=session.query(Article).filter(Article.content == None).count()
+    info.no_content_count=session.query(Article.id).filter(Article.has_content == 0).count()
     #所有文章数量 - 只查询id字段
     info.all_count=session.query(Article.id).count()
     #有内容的文章数量
@@ -46,8 +46,10 @@ class PasswordHasher:
 pwd_context = PasswordHasher()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_BASE}/auth/token",auto_error=False)
 
-# 用户缓存字典
-_user_cache = {}
+# 用户缓存：只保存在进程内存中，修改密码等操作清除时通过共享缓存后端通知其他工作进程
+# 条目1小时后过期重新查询数据库，错过失效通知时用户信息最多滞后1小时
+from core.cache import ViewCache
+_user_cache = ViewCache("data/cache/users", default_ttl=3600, enabled=True, memory_mb=4, disk=False, namespace="users")
 # 登录失败次数记录
 _login_attempts = {}
 MAX_LOGIN_ATTEMPTS = 5
@@ -83,8 +85,9 @@ def get_login_attempts(username: str) -> int:
 def get_user(username: str) -> Optional[dict]:
     """从数据库获取用户，带缓存功能"""
     # 先检查缓存
-    if username in _user_cache:
-        return _user_cache[username]
+    cached = _user_cache.get("user", username=username)
+    if cached is not None:
+        return cached
 
     session = DB.get_session()
     try:
@@ -95,7 +98,7 @@ def get_user(username: str) -> Optional[dict]:
             # 移除 SQLAlchemy 内部属性（如 _sa_instance_state）
             user_dict.pop('_sa_instance_state', None)
             user_dict=User(**user_dict)
-            _user_cache[username] = user_dict
+            _user_cache.set("user", user_dict, username=username)
             return user_dict
         return None
     except Exception as e:
@@ -105,10 +108,10 @@ def get_user(username: str) -> Optional[dict]:
 
 def get_user_by_id(user_id: str) -> Optional[dict]:
     """从数据库通过用户ID获取用户，带缓存功能"""
-    # 缓存键使用 id: 前缀
-    cache_key = f"id:{user_id}"
-    if cache_key in _user_cache:
-        return _user_cache[cache_key]
+    # 按用户ID单独缓存
+    cached = _user_cache.get("user_id", user_id=user_id)
+    if cached is not None:
+        return cached
 
     session = DB.get_session()
     try:
@@ -119,7 +122,7 @@ def get_user_by_id(user_id: str) -> Optional[dict]:
             # 移除 SQLAlchemy 内部属性（如 _sa_instance_state）
             user_dict.pop('_sa_instance_state', None)
             user_dict=User(**user_dict)
-            _user_cache[cache_key] = user_dict
+            _user_cache.set("user_id", user_dict, user_id=user_id)
             return user_dict
         return None
     except Exception as e:
@@ -128,9 +131,9 @@ def get_user_by_id(user_id: str) -> Optional[dict]:
         return None
         
 def clear_user_cache(username: str):
-    """清除指定用户的缓存"""
-    if username in _user_cache:
-        del _user_cache[username]
+    """清除指定用户的缓存（按ID缓存的用户信息一并清除）"""
+    _user_cache.delete("user", username=username)
+    _user_cache.clear("user_id")
 
 from apis.base import error_response
 def authenticate_user(username: str, password: str) -> Optional[DBUser]:
@@ -3,17 +3,204 @@ import hashlib
 import time
 import json
 import pickle
-from typing import Any, Optional, Union
+import fnmatch
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict, namedtuple
+from typing import Any, Iterable, Optional, Union
 from functools import wraps
 from core.config import cfg
+from core.print import print_error, print_warning
+from core.cache_backend import create_backend
+
+class MemoryCache:
+    """进程内LRU缓存，按序列化后的字节数限制容量
+
+    条目记录写入时间，读取时按调用方传入的ttl判断过期；命中直接返回缓存对象，不访问文件系统。
+    条目可带失效标签，按标签反查索引只删除受影响的条目
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._items = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        # 调用方持有锁
+        created, size, data, tags = self._items.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key, max_age: float) -> Optional[tuple]:
+        """返回 (写入时间, 数据)，不存在或写入超过 max_age 秒时返回None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if time.time() - item[0] > max_age:
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0], item[2]
+
+    def set(self, key, data: Any, size: int, created: float = None, tags: Iterable[str] = ()) -> None:
+        # 单个条目超过总容量的1/4时不放入内存，避免一次挤掉所有热点
+        if size > self.max_bytes // 4:
+            return
+        tags = frozenset(tags or ())
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (created or time.time(), size, data, tags)
+            self.size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes and self._items:
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+
+    def delete(self, match) -> int:
+        """删除缓存前缀满足 match 的条目，返回删除数量"""
+        with self._lock:
+            keys = [key for key in self._items if match(key[0])]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def delete_key(self, key) -> None:
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+    def delete_tags(self, tags: Iterable[str]) -> int:
+        """删除带有任一标签的条目，返回删除数量"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._tags.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self.size, "max_bytes": self.max_bytes, "tags": len(self._tags),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "expired": self.expired}
+
+
+# 后端中带失效标签的缓存值，其他进程读取后放入内存时带上标签，按标签失效时只删除受影响的条目
+_Tagged = namedtuple("_Tagged", "data tags")
+
+
+class SingleFlight:
+    """按键合并并发的异步调用：同一键同时只执行一次，其他调用等待同一个结果
+
+    执行放在独立的任务中，等待方被取消（客户端断开）不会中断执行，其他等待方照常拿到结果
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.coalesced = 0
+        self._tasks = {}
+
+    def start(self, key, factory) -> asyncio.Task:
+        """返回该键正在执行的任务，没有时调用 factory() 创建新任务"""
+        loop = asyncio.get_running_loop()
+        # 任务不能跨事件循环等待，预生成线程中的 asyncio.run 各自合并
+        flight_key = (loop, key)
+        task = self._tasks.get(flight_key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = loop.create_task(factory())
+        self._tasks[flight_key] = task
+        self.started += 1
+        def done(finished):
+            if self._tasks.get(flight_key) is finished:
+                del self._tasks[flight_key]
+        task.add_done_callback(done)
+        return task
+
+    async def run(self, key, factory):
+        return await asyncio.shield(self.start(key, factory))
+
+    def refresh(self, key, factory) -> None:
+        """后台执行，不等待结果；该键已在执行时不重复启动"""
+        if (asyncio.get_running_loop(), key) in self._tasks:
+            return
+        self.start(key, factory).add_done_callback(_log_refresh_error)
+
+    def stats(self) -> dict:
+        return {"running": len(self._tasks), "started": self.started, "coalesced": self.coalesced}
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print_error(f"后台刷新缓存失败: {task.exception()}")
+
+
+def _enabled(value) -> bool:
+    return str(value).lower() not in ("false", "0", "", "none")
+
 
 class ViewCache:
-    """视图缓存管理类"""
+    """视图缓存管理类
     
-    def __init__(self, cache_dir: str = None, default_ttl: int = 1800, enabled: bool = False):
+    两级缓存：进程内LRU在前，共享后端（cache.backend: file/sqlite/redis）在后，后端可只用于失效通知。
+    内存命中时不做任何文件操作，内存未命中再读后端并放回内存；写入同时写内存和后端。
+    删除缓存时在后端记录失效事件（删除的键、标签或前缀）并递增版本号，其他进程发现版本变化后
+    按事件只删除各自进程内缓存中受影响的条目（事件已被清理时丢弃全部）。
+    Redis后端通过发布/订阅即时通知其他进程；file/sqlite后端没有推送，由各进程每 sync_interval 秒轮询版本号，
+    其他进程的失效最多延迟 sync_interval 秒生效（Redis订阅连接断开期间同样退回轮询）。
+    写入时可带失效标签（如 article:{id}、feed:{mp_id}），invalidate 按标签反查只删除受影响的缓存。
+    过期后 stale_ttl 秒内的缓存仍可由 lookup 取出，供 cache_view 先返回旧值再后台刷新；
+    过期时间按写入后端的时间计算，各进程一致。
+    生成缓存前通过 acquire 在后端登记租约，其他进程同时未命中时由 wait_shared 等待同一份结果
+    """
+
+    def __init__(self, cache_dir: str = None, default_ttl: int = 1800, enabled: bool = False,
+                 memory_mb: int = None, disk: bool = None, namespace: str = None):
         self.cache_dir = cache_dir or cfg.get("cache.views.dir", "data/cache/views")
         self.default_ttl = default_ttl or cfg.get("cache.views.ttl", 1800)  # 默认30分钟
         self.enabled = enabled or cfg.get("cache.views.enabled", False)
+        if memory_mb is None:
+            memory_mb = int(cfg.get("cache.views.memory_mb", 64) or 0)
+        self.memory = MemoryCache(memory_mb * 1024 * 1024) if memory_mb > 0 else None
+        self.disk = _enabled(cfg.get("cache.views.disk", True)) if disk is None else disk
+        self.disk_hits = 0
+        self.stale_hits = 0
+        self.stale_ttl = int(cfg.get("cache.views.stale_ttl", 300) or 0)
+        self.flights = SingleFlight()
+        self.coalesce_timeout = float(cfg.get("cache.views.coalesce_timeout", 10) or 0)
+        self.shared_waits = 0
+        self.namespace = namespace or os.path.basename(os.path.normpath(self.cache_dir))
+        self.backend = create_backend(self.namespace, self.cache_dir)
+        self.sync_interval = float(cfg.get("cache.sync_interval", 1) or 0)
+        self._version = None
+        self._next_sync = 0.0
+        self._subscribed = False
+        self._listening = False
         
         # 确保缓存目录存在
         if not os.path.exists(self.cache_dir):
@@ -30,92 +217,273 @@ class ViewCache:
         key_hash = hashlib.sha256(key_data.encode('utf-8')).hexdigest()
         return f"{prefix}_{key_hash}"
     
-    def _get_cache_path(self, cache_key: str) -> str:
-        """获取缓存文件路径"""
-        return os.path.join(self.cache_dir, f"{cache_key}.cache")
-    
+    def _get_memory_key(self, prefix: str, **kwargs) -> tuple:
+        """内存缓存键：参数本身组成的元组，不做序列化和哈希"""
+        items = tuple(sorted((k, v) for k, v in kwargs.items() if k != 'request'))
+        try:
+            hash(items)
+        except TypeError:
+            items = json.dumps(dict(items), sort_keys=True, default=str)
+        return (prefix, items)
+
     def get(self, prefix: str, ttl: Optional[int] = None, **kwargs) -> Optional[Any]:
         """获取缓存数据"""
+        item = self.lookup(prefix, ttl, **kwargs)
+        return item[0] if item is not None else None
+
+    def lookup(self, prefix: str, ttl: Optional[int] = None, stale_ttl: int = 0, _memory: bool = True,
+               **kwargs) -> Optional[tuple]:
+        """获取缓存数据及是否已过期
+
+        Args:
+            _memory: 为False时跳过进程内缓存直接读取后端（等待其他进程写入时使用）
+
+        Returns:
+            (数据, 是否已过期)；不存在或过期超过 stale_ttl 秒时返回None
+        """
         if not self.enabled:
             return None
             
+        ttl = ttl or self.default_ttl
+        max_age = ttl + stale_ttl
+        self._sync()
+        memory_key = None
+        if self.memory is not None:
+            memory_key = self._get_memory_key(prefix, **kwargs)
+            item = self.memory.get(memory_key, max_age) if _memory else None
+            if item is not None:
+                return self._checked(item[1], item[0], ttl)
+        if not self.disk:
+            return None
+
         cache_key = self._get_cache_key(prefix, **kwargs)
-        cache_path = self._get_cache_path(cache_key)
-        
-        if not os.path.exists(cache_path):
+        try:
+            item = self.backend.get(cache_key)
+        except Exception as e:
+            print_warning(f"读取缓存失败[{self.backend.name}]: {e}")
+            return None
+        if item is None:
             return None
         
-        # 检查缓存是否过期
-        ttl = ttl or self.default_ttl
-        file_mtime = os.path.getmtime(cache_path)
-        if time.time() - file_mtime > ttl:
+        # 检查缓存是否过期（超过可返回旧值的时间）
+        created, raw = item
+        if time.time() - created > max_age:
             # 删除过期缓存
-            try:
-                os.remove(cache_path)
-            except OSError:
-                pass
+            self._backend_call("delete", cache_key)
             return None
         
         # 读取缓存数据
         try:
-            with open(cache_path, 'rb') as f:
-                return pickle.load(f)
-        except (pickle.PickleError, IOError, EOFError):
-            # 缓存文件损坏，删除并返回None
-            try:
-                os.remove(cache_path)
-            except OSError:
-                pass
+            data = pickle.loads(raw)
+        except (pickle.PickleError, EOFError, AttributeError, ImportError, IndexError):
+            # 缓存数据损坏，删除并返回None
+            self._backend_call("delete", cache_key)
             return None
+        tags = ()
+        if isinstance(data, _Tagged):
+            data, tags = data
+        self.disk_hits += 1
+        # 放回内存，过期时间仍按后端写入时间计算
+        if memory_key is not None:
+            self.memory.set(memory_key, data, len(raw), created=created, tags=tags)
+        return self._checked(data, created, ttl)
+
+    def _checked(self, data: Any, created: float, ttl: int) -> tuple:
+        expired = time.time() - created > ttl
+        if expired:
+            self.stale_hits += 1
+        return data, expired
     
-    def set(self, prefix: str, data: Any, **kwargs) -> bool:
-        """设置缓存数据"""
+    def set(self, prefix: str, data: Any, _tags: Iterable[str] = None, **kwargs) -> bool:
+        """设置缓存数据，_tags 为该条缓存的失效标签"""
         if not self.enabled:
             return True
-            
-        cache_key = self._get_cache_key(prefix, **kwargs)
-        cache_path = self._get_cache_path(cache_key)
-        
+
         try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(data, f)
+            raw = pickle.dumps(_Tagged(data, tuple(_tags)) if _tags else data)
+        except (pickle.PickleError, TypeError, AttributeError):
+            return False
+        if self.memory is not None:
+            self.memory.set(self._get_memory_key(prefix, **kwargs), data, len(raw), tags=_tags)
+        if not self.disk:
             return True
-        except (pickle.PickleError, IOError):
+
+        cache_key = self._get_cache_key(prefix, **kwargs)
+        if not self._backend_call("set", cache_key, raw):
             return False
+        return self._backend_call("add_tags", cache_key, list(_tags)) if _tags else True
+
+    def delete(self, prefix: str, **kwargs) -> bool:
+        """删除单个缓存"""
+        deleted = self._backend_call("delete", self._get_cache_key(prefix, **kwargs))
+        return self._publish(("key", self._get_memory_key(prefix, **kwargs))) and deleted
     
     def clear(self, prefix: Optional[str] = None) -> bool:
         """清除缓存"""
-        try:
-            if prefix:
-                # 清除特定前缀的缓存
-                for filename in os.listdir(self.cache_dir):
-                    if filename.startswith(f"{prefix}_") and filename.endswith('.cache'):
-                        os.remove(os.path.join(self.cache_dir, filename))
-            else:
-                # 清除所有缓存
-                for filename in os.listdir(self.cache_dir):
-                    if filename.endswith('.cache'):
-                        os.remove(os.path.join(self.cache_dir, filename))
-            return True
-        except OSError:
-            return False
+        # 与原先按文件名前缀 {prefix}_ 删除的规则一致
+        deleted = self._backend_call("delete_pattern", f"{prefix}_*") if prefix else self._backend_call("clear")
+        return self._publish(("prefix", prefix) if prefix else ("clear", None)) and deleted
     
     def delete_pattern(self, pattern: str) -> bool:
         """删除匹配模式的缓存"""
+        deleted = self._backend_call("delete_pattern", f"{pattern}_*")
+        return self._publish(("pattern", pattern)) and deleted
+
+    def invalidate(self, *tags: str) -> bool:
+        """删除带有任一标签的缓存，其他缓存不受影响"""
+        tags = [tag for tag in tags if tag]
+        if not tags:
+            return True
+        deleted = self._backend_call("delete_tags", tags)
+        return self._publish(("tags", tags)) and deleted
+
+    def _drop(self, event: tuple) -> None:
+        """按失效事件删除进程内缓存中受影响的条目"""
+        if self.memory is None:
+            return
+        kind, arg = event
+        if kind == "key":
+            self.memory.delete_key(arg)
+        elif kind == "tags":
+            self.memory.delete_tags(arg)
+        elif kind == "prefix":
+            self.memory.delete(lambda key_prefix: key_prefix == arg or key_prefix.startswith(f"{arg}_"))
+        elif kind == "pattern":
+            # 与后端键 {prefix}_{hash} 匹配 {pattern}_* 的规则一致
+            self.memory.delete(lambda key_prefix: fnmatch.fnmatchcase(f"{key_prefix}_", f"{arg}_*"))
+        else:
+            self.memory.clear()
+
+    def _publish(self, event: tuple) -> bool:
+        """删除本进程内存中受影响的条目，并在后端记录失效事件，其他进程同步时删除同样的条目"""
+        self._drop(event)
+        try:
+            raw = pickle.dumps(event)
+        except (pickle.PickleError, TypeError, AttributeError):
+            raw = None
         try:
-            import glob
-            pattern_path = os.path.join(self.cache_dir, f"{pattern}_*.cache")
-            for cache_file in glob.glob(pattern_path):
-                os.remove(cache_file)
+            version = self.backend.bump(raw)
+        except Exception as e:
+            print_warning(f"缓存操作失败[{self.backend.name}.bump]: {e}")
+            return False
+        # 本进程已处理过这次失效，期间没有其他进程的失效时直接跟上版本号，不必再同步
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+        return True
+
+    def acquire(self, prefix: str, **kwargs) -> Optional[str]:
+        """在共享后端登记由本进程生成该缓存，返回租约令牌；其他进程正在生成时返回None
+
+        不写入后端或后端不可用时返回空字符串，各进程各自生成
+        """
+        if not self.disk or self.coalesce_timeout <= 0:
+            return ""
+        try:
+            return self.backend.acquire(self._get_cache_key(prefix, **kwargs), self.coalesce_timeout)
+        except Exception as e:
+            print_warning(f"缓存操作失败[{self.backend.name}.acquire]: {e}")
+            return ""
+
+    def release(self, prefix: str, token: Optional[str], **kwargs) -> None:
+        if token:
+            self._backend_call("release", self._get_cache_key(prefix, **kwargs), token)
+
+    async def wait_shared(self, prefix: str, ttl: Optional[int] = None, **kwargs) -> Optional[tuple]:
+        """等待其他进程生成该缓存，返回 (数据, False)；对方结束后仍未写入或等待超时返回None"""
+        self.shared_waits += 1
+        cache_key = self._get_cache_key(prefix, **kwargs)
+        deadline = time.monotonic() + self.coalesce_timeout
+        while True:
+            # 先看租约再读缓存：读到租约已释放时，对方的写入一定已经完成
+            try:
+                locked = self.backend.locked(cache_key)
+            except Exception:
+                locked = False
+            cached = self.lookup(prefix, ttl, _memory=False, **kwargs)
+            if cached is not None and not cached[1]:
+                return cached
+            if not locked or time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(0.05)
+
+    def _backend_call(self, method: str, *args) -> bool:
+        try:
+            getattr(self.backend, method)(*args)
             return True
-        except OSError:
+        except Exception as e:
+            print_warning(f"缓存操作失败[{self.backend.name}.{method}]: {e}")
             return False
 
-# 全局缓存实例
+    def _notify(self, listening: bool) -> None:
+        """后端推送的失效通知：下次读取时同步；通知连接断开时恢复定期轮询"""
+        self._listening = listening
+        self._next_sync = 0.0
+
+    def _sync(self) -> None:
+        """检查后端版本号，其他进程删除过缓存时按失效事件删除本进程内存中受影响的条目
+
+        后端支持推送时只在收到通知后检查，否则每 sync_interval 秒检查一次（为0时每次读取都检查）
+        """
+        if not self._subscribed:
+            self._subscribed = True
+            try:
+                self.backend.subscribe(self._notify)
+            except Exception as e:
+                print_warning(f"订阅缓存失效通知失败[{self.backend.name}]: {e}")
+        now = time.time()
+        if now < self._next_sync:
+            return
+        # 先设置下次检查时间再读取版本号，读取期间收到的通知不会被覆盖
+        self._next_sync = float("inf") if self._listening and self.sync_interval > 0 else now + self.sync_interval
+        try:
+            version = self.backend.version()
+        except Exception as e:
+            print_warning(f"读取缓存版本失败[{self.backend.name}]: {e}")
+            return
+        if version != self._version:
+            if self._version is not None and self.memory is not None:
+                self._replay(self._version)
+            self._version = version
+
+    def _replay(self, since: int) -> None:
+        try:
+            events = self.backend.events(since)
+        except Exception as e:
+            print_warning(f"读取缓存失效事件失败[{self.backend.name}]: {e}")
+            events = None
+        try:
+            events = [pickle.loads(raw) for raw in events] if events is not None else None
+        except (pickle.PickleError, EOFError, AttributeError, ImportError, IndexError, TypeError):
+            events = None
+        if events is None:
+            # 事件已被清理或无法读取时无法确定受影响的条目
+            self.memory.clear()
+            return
+        for event in events:
+            self._drop(event)
+
+    def stats(self) -> dict:
+        stats = {"enabled": bool(self.enabled), "backend": self.backend.name, "namespace": self.namespace,
+                 "disk": self.disk, "disk_hits": self.disk_hits, "stale_hits": self.stale_hits,
+                 "stale_ttl": self.stale_ttl, "flights": self.flights.stats(), "shared_waits": self.shared_waits}
+        if self.memory is not None:
+            stats["memory"] = self.memory.stats()
+        return stats
+
+# 全局缓存实例；每个实例在每个工作进程中各有一份进程内缓存，大小默认为 cache.views.memory_mb
 view_cache = ViewCache()
 data_cache = ViewCache("data/cache/data", default_ttl=3600, enabled=True)  # 数据缓存，默认1小时
 
-def cache_view(prefix: str, ttl: Optional[int] = None, key_func=None):
+# 当前正在生成的视图收集到的失效标签，由 cache_view 设置，视图函数内通过 cache_tags 追加
+_current_tags = contextvars.ContextVar("cache_tags", default=None)
+
+def cache_tags(*tags: str) -> None:
+    """为当前正在生成的缓存视图添加失效标签（不在 cache_view 中时忽略）"""
+    current = _current_tags.get()
+    if current is not None:
+        current.update(tag for tag in tags if tag)
+
+def cache_view(prefix: str, ttl: Optional[int] = None, key_func=None, stale_ttl: Optional[int] = None):
     """
     视图缓存装饰器
     
@@ -123,6 +491,10 @@ def cache_view(prefix: str, ttl: Optional[int] = None, key_func=None):
         prefix: 缓存前缀
         ttl: 缓存过期时间（秒），None表示使用默认值
         key_func: 自定义缓存键生成函数，接收函数参数，返回字符串
+        stale_ttl: 过期后仍返回旧值的时间（秒），期间后台只刷新一次；None表示使用 cache.views.stale_ttl
+
+    缓存自动带有 view:{prefix} 标签，视图函数内可调用 cache_tags 追加与数据相关的标签。
+    同一缓存键同时只生成一次，并发请求等待同一个结果；其他工作进程正在生成时等待其写入共享后端
     """
     def decorator(func):
         @wraps(func)
@@ -136,19 +508,46 @@ def cache_view(prefix: str, ttl: Optional[int] = None, key_func=None):
                 cache_key_prefix = key_func(*args, **kwargs)
             else:
                 cache_key_prefix = prefix
+
+            async def render():
+                # 执行原函数，同时收集失效标签
+                tags = {f"view:{prefix}"}
+                token = _current_tags.set(tags)
+                try:
+                    result = await func(*args, **kwargs)
+                finally:
+                    _current_tags.reset(token)
+                # 缓存结果
+                view_cache.set(cache_key_prefix, result, _tags=tags, **kwargs)
+                return result
+
+            async def render_shared(wait: bool = True):
+                token = view_cache.acquire(cache_key_prefix, **kwargs)
+                if token is None:
+                    # 其他工作进程正在生成：等待其结果，后台刷新时直接跳过
+                    if not wait:
+                        return None
+                    cached = await view_cache.wait_shared(cache_key_prefix, ttl=ttl, **kwargs)
+                    if cached is not None:
+                        return cached[0]
+                try:
+                    return await render()
+                finally:
+                    view_cache.release(cache_key_prefix, token, **kwargs)
             
             # 尝试从缓存获取
-            cached_result = view_cache.get(cache_key_prefix, ttl=ttl, **kwargs)
-            if cached_result is not None:
-                return cached_result
-            
-            # 执行原函数
-            result = await func(*args, **kwargs)
+            flight_key = view_cache._get_memory_key(cache_key_prefix, **kwargs)
+            cached = view_cache.lookup(cache_key_prefix, ttl=ttl,
+                                       stale_ttl=view_cache.stale_ttl if stale_ttl is None else stale_ttl, **kwargs)
+            if cached is not None:
+                result, expired = cached
+                if expired:
+                    # 已过期但仍在旧值窗口内：直接返回旧值，后台刷新
+                    view_cache.flights.refresh(flight_key, lambda: render_shared(wait=False))
+                return result
             
-            # 缓存结果
-            view_cache.set(cache_key_prefix, result, **kwargs)
-            
-            return result
+            # 未命中时同一缓存键只执行一次原函数
+            return await view_cache.flights.run(flight_key, render_shared)
         return wrapper
     return decorator
 
@@ -156,6 +555,10 @@ def clear_cache_pattern(pattern: str) -> bool:
     """清除匹配模式的缓存"""
     return view_cache.delete_pattern(pattern)
 
+def clear_cache_tags(*tags: str) -> bool:
+    """清除带有任一标签的视图缓存"""
+    return view_cache.invalidate(*tags)
+
 def clear_all_cache() -> bool:
     """清除所有视图缓存"""
-    return view_cache.clear()
\ No newline at end of file
+    return view_cache.clear()
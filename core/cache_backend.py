@@ -0,0 +1,666 @@
+import os
+import glob
+import shutil
+import hashlib
+import time
+import struct
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit, unquote
+from core.config import cfg
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 缓存值前8字节为写入时间（float64），读取时按调用方的ttl判断过期
+_CREATED = struct.Struct("<d")
+
+
+class CacheBackend:
+    """视图缓存的共享存储
+
+    多个工作进程（server.threads>1）各自的进程内缓存之下共用同一个后端：
+    值按 key 保存并带写入时间；失效时除删除对应的键外还会递增命名空间的版本号并记录失效事件，
+    其他进程发现版本号变化后按版本号之后的事件只丢弃进程内缓存中受影响的条目，
+    事件已被清理（落后超过 max_events 个版本）时丢弃全部进程内缓存
+    """
+    name = "base"
+    # 保留的失效事件数量
+    max_events = 1000
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        """返回 (写入时间, 序列化后的值)，不存在时返回None"""
+        raise NotImplementedError
+
+    def set(self, key: str, raw: bytes) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_pattern(self, pattern: str) -> None:
+        """删除键匹配通配符 pattern（*、?）的缓存"""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def add_tags(self, key: str, tags: Iterable[str]) -> None:
+        """记录 标签 -> 键 的反查索引"""
+        raise NotImplementedError
+
+    def delete_tags(self, tags: Iterable[str]) -> None:
+        """删除带有任一标签的缓存及这些标签的索引"""
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """命名空间当前的失效版本号"""
+        raise NotImplementedError
+
+    def bump(self, event: bytes = None) -> int:
+        """递增失效版本号并记录本次的失效事件，返回新的版本号；没有事件时其他进程丢弃全部进程内缓存"""
+        raise NotImplementedError
+
+    def events(self, since: int) -> Optional[List[bytes]]:
+        """版本号 since 之后记录的失效事件，有事件已被清理或没有记录时返回None"""
+        raise NotImplementedError
+
+    def subscribe(self, callback) -> bool:
+        """订阅失效通知：其他进程递增版本号时调用 callback(True)，通知连接断开时调用 callback(False)
+
+        Returns:
+            后端不支持推送时返回False，调用方定期轮询版本号
+        """
+        return False
+
+    def acquire(self, name: str, ttl: float) -> Optional[str]:
+        """获取名为 name 的租约（用于跨进程合并生成同一缓存），成功时返回令牌，已被其他进程持有时返回None
+
+        持有者未释放（进程退出等）时租约 ttl 秒后自动失效
+        """
+        raise NotImplementedError
+
+    def locked(self, name: str) -> bool:
+        """租约是否仍被持有"""
+        raise NotImplementedError
+
+    def release(self, name: str, token: str) -> None:
+        """释放本进程持有的租约，令牌不一致（已过期被其他进程获取）时不做处理"""
+        raise NotImplementedError
+
+
+class FileCacheBackend(CacheBackend):
+    """本地文件后端：每个键一个 {key}.cache 文件，版本号保存在 .version 文件中
+
+    同一台机器上的多个进程共享同一目录即可互相看到写入和失效；
+    失效事件为 .events 目录下每个版本一个文件，递增版本号时持有 .version.lock 文件锁（仅POSIX，
+    其他平台的版本号为写入时间，不记录事件）；
+    标签索引为 .tags 目录下每个标签一个目录，带该标签的每个键一个空文件，同一键重复写入不会增加索引，
+    删除缓存（delete_pattern、过期删除）时定期清理指向已删除键的索引；
+    租约为 .locks 目录下独占创建（O_EXCL）的文件，内容为 "令牌 过期时间"
+    """
+    name = "file"
+    # 按键删除缓存（过期、损坏）后清理标签索引的最短间隔（秒）
+    prune_interval = 600
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._next_prune = 0.0
+        self.version_path = os.path.join(cache_dir, ".version")
+        self.events_dir = os.path.join(cache_dir, ".events")
+        self.tags_dir = os.path.join(cache_dir, ".tags")
+        self.locks_dir = os.path.join(cache_dir, ".locks")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.cache")
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        path = self._path(key)
+        try:
+            created = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                return created, f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, raw: bytes) -> None:
+        # 先写临时文件再替换，其他进程不会读到写了一半的文件
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            return
+        now = time.time()
+        if now >= self._next_prune:
+            self._next_prune = now + self.prune_interval
+            self.prune_tags()
+
+    def delete_pattern(self, pattern: str) -> None:
+        for cache_file in glob.glob(os.path.join(self.cache_dir, f"{pattern}.cache")):
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+        self.prune_tags()
+
+    def clear(self) -> None:
+        self.delete_pattern("*")
+        shutil.rmtree(self.tags_dir, ignore_errors=True)
+
+    def _tag_path(self, tag: str) -> str:
+        return os.path.join(self.tags_dir, hashlib.md5(tag.encode("utf-8")).hexdigest())
+
+    def _take_tag(self, path: str) -> set:
+        """取出并移除标签索引中的键
+
+        先改名再读取，之后写入的键进入新的索引目录，不会被误删；兼容旧版本逐行记录键的索引文件
+        """
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.del"
+        try:
+            os.rename(path, tmp)
+        except OSError:
+            return set()
+        if os.path.isdir(tmp):
+            keys = set(os.listdir(tmp))
+            shutil.rmtree(tmp, ignore_errors=True)
+            return keys
+        try:
+            with open(tmp, "r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        finally:
+            os.remove(tmp)
+
+    def add_tags(self, key: str, tags: Iterable[str]) -> None:
+        for tag in tags:
+            path = self._tag_path(tag)
+            keys = {key}
+            for attempt in range(3):
+                try:
+                    os.makedirs(path, exist_ok=True)
+                    for tagged in keys:
+                        open(os.path.join(path, tagged), "a").close()
+                    break
+                except FileExistsError:
+                    # 旧版本的索引文件，转换为目录
+                    keys |= self._take_tag(path)
+                except FileNotFoundError:
+                    # 目录恰好被 delete_tags 或 prune_tags 移走，重新创建
+                    continue
+
+    def delete_tags(self, tags: Iterable[str]) -> None:
+        keys = set()
+        for tag in tags:
+            keys |= self._take_tag(self._tag_path(tag))
+        for key in keys:
+            self.delete(key)
+
+    def prune_tags(self) -> None:
+        """删除指向已不存在的缓存的索引项，以及已经没有键的标签目录"""
+        try:
+            entries = [entry for entry in os.scandir(self.tags_dir) if entry.is_dir() and not entry.name.endswith(".del")]
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                keys = os.listdir(entry.path)
+            except OSError:
+                continue
+            for key in keys:
+                if not os.path.exists(self._path(key)):
+                    try:
+                        os.remove(os.path.join(entry.path, key))
+                    except OSError:
+                        pass
+            try:
+                # 目录非空（包括刚有新键写入）时删除失败，保留
+                os.rmdir(entry.path)
+            except OSError:
+                pass
+
+    def version(self) -> int:
+        try:
+            with open(self.version_path, "r") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @contextmanager
+    def _version_lock(self):
+        with open(f"{self.version_path}.lock", "a+b") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _write(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def bump(self, event: bytes = None) -> int:
+        if fcntl is None:
+            # 没有文件锁时无法保证版本号连续，写入时间作为版本号，其他进程丢弃全部进程内缓存
+            version = time.time_ns()
+            self._write(self.version_path, str(version).encode())
+            return version
+        os.makedirs(self.events_dir, exist_ok=True)
+        with self._version_lock():
+            version = self.version() + 1
+            # 先写事件再写版本号，读到新版本号时事件一定已经写入
+            if event is not None:
+                self._write(os.path.join(self.events_dir, str(version)), event)
+            self._write(self.version_path, str(version).encode())
+        try:
+            os.remove(os.path.join(self.events_dir, str(version - self.max_events)))
+        except OSError:
+            pass
+        return version
+
+    def events(self, since: int) -> Optional[List[bytes]]:
+        current = self.version()
+        if fcntl is None or since > current or current - since > self.max_events:
+            return None
+        events = []
+        for version in range(since + 1, current + 1):
+            try:
+                with open(os.path.join(self.events_dir, str(version)), "rb") as f:
+                    events.append(f.read())
+            except OSError:
+                return None
+        return events
+
+    def _lock_path(self, name: str) -> str:
+        return os.path.join(self.locks_dir, hashlib.md5(name.encode("utf-8")).hexdigest())
+
+    def _read_lock(self, path: str) -> Optional[Tuple[str, float]]:
+        try:
+            with open(path, "r") as f:
+                token, _, expires = f.read().partition(" ")
+            return token, float(expires)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # 刚创建还没写入内容，视为有效
+            return "", time.time() + 1
+
+    def acquire(self, name: str, ttl: float) -> Optional[str]:
+        os.makedirs(self.locks_dir, exist_ok=True)
+        path = self._lock_path(name)
+        token = os.urandom(8).hex()
+        for attempt in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                lock = self._read_lock(path)
+                if attempt or (lock is not None and lock[1] > time.time()):
+                    return None
+                # 持有者超时未释放，删除后重试一次；同时重试的进程只有一个能创建成功
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{token} {time.time() + ttl}")
+            return token
+        return None
+
+    def locked(self, name: str) -> bool:
+        lock = self._read_lock(self._lock_path(name))
+        return lock is not None and lock[1] > time.time()
+
+    def release(self, name: str, token: str) -> None:
+        path = self._lock_path(name)
+        lock = self._read_lock(path)
+        if lock is not None and lock[0] == token:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLite后端（WAL模式）：所有命名空间共用一个数据库文件，版本号保存在 cache_versions 表，
+    失效事件保存在 cache_events 表，标签索引保存在 cache_tags 表，租约保存在 cache_locks 表"""
+    name = "sqlite"
+
+    def __init__(self, path: str, namespace: str):
+        self.path = os.path.normpath(path)
+        self.namespace = namespace
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3连接不能跨线程使用，每个线程各自持有一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries (ns TEXT NOT NULL, key TEXT NOT NULL, "
+                         "created REAL NOT NULL, value BLOB NOT NULL, PRIMARY KEY (ns, key))")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_versions (ns TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_events (ns TEXT NOT NULL, version INTEGER NOT NULL, "
+                         "event BLOB NOT NULL, PRIMARY KEY (ns, version))")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_tags (ns TEXT NOT NULL, tag TEXT NOT NULL, "
+                         "key TEXT NOT NULL, PRIMARY KEY (ns, tag, key))")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags (ns, key)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_locks (ns TEXT NOT NULL, name TEXT NOT NULL, "
+                         "token TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (ns, name))")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        row = self._conn().execute("SELECT created, value FROM cache_entries WHERE ns = ? AND key = ?",
+                                   (self.namespace, key)).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+    def set(self, key: str, raw: bytes) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO cache_entries (ns, key, created, value) VALUES (?, ?, ?, ?)",
+                             (self.namespace, key, time.time(), raw))
+
+    def delete(self, key: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE ns = ? AND key = ?", (self.namespace, key))
+        conn.execute("DELETE FROM cache_tags WHERE ns = ? AND key = ?", (self.namespace, key))
+
+    def delete_pattern(self, pattern: str) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE ns = ? AND key GLOB ?", (self.namespace, pattern))
+        conn.execute("DELETE FROM cache_tags WHERE ns = ? AND key GLOB ?", (self.namespace, pattern))
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM cache_entries WHERE ns = ?", (self.namespace,))
+        conn.execute("DELETE FROM cache_tags WHERE ns = ?", (self.namespace,))
+
+    def add_tags(self, key: str, tags: Iterable[str]) -> None:
+        self._conn().executemany("INSERT OR IGNORE INTO cache_tags (ns, tag, key) VALUES (?, ?, ?)",
+                                 [(self.namespace, tag, key) for tag in tags])
+
+    def delete_tags(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+        conn = self._conn()
+        marks = ", ".join("?" * len(tags))
+        # 同一事务内删除缓存和这些键的全部索引行，避免残留指向已删除键的索引
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT key FROM cache_tags WHERE ns = ? AND tag IN ({marks})", (self.namespace, *tags))]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                key_marks = ", ".join("?" * len(chunk))
+                conn.execute(f"DELETE FROM cache_entries WHERE ns = ? AND key IN ({key_marks})", (self.namespace, *chunk))
+                conn.execute(f"DELETE FROM cache_tags WHERE ns = ? AND key IN ({key_marks})", (self.namespace, *chunk))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def version(self) -> int:
+        row = self._conn().execute("SELECT version FROM cache_versions WHERE ns = ?", (self.namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, event: bytes = None) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO cache_versions (ns, version) VALUES (?, 1) "
+                         "ON CONFLICT(ns) DO UPDATE SET version = version + 1", (self.namespace,))
+            version = conn.execute("SELECT version FROM cache_versions WHERE ns = ?", (self.namespace,)).fetchone()[0]
+            if event is not None:
+                conn.execute("INSERT OR REPLACE INTO cache_events (ns, version, event) VALUES (?, ?, ?)",
+                             (self.namespace, version, event))
+            conn.execute("DELETE FROM cache_events WHERE ns = ? AND version <= ?", (self.namespace, version - self.max_events))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def events(self, since: int) -> Optional[List[bytes]]:
+        current = self.version()
+        if since > current or current - since > self.max_events:
+            return None
+        rows = self._conn().execute("SELECT event FROM cache_events WHERE ns = ? AND version > ? AND version <= ? "
+                                    "ORDER BY version", (self.namespace, since, current)).fetchall()
+        return [bytes(row[0]) for row in rows] if len(rows) == current - since else None
+
+    def acquire(self, name: str, ttl: float) -> Optional[str]:
+        conn = self._conn()
+        now = time.time()
+        token = os.urandom(8).hex()
+        conn.execute("DELETE FROM cache_locks WHERE ns = ? AND name = ? AND expires <= ?", (self.namespace, name, now))
+        cursor = conn.execute("INSERT OR IGNORE INTO cache_locks (ns, name, token, expires) VALUES (?, ?, ?, ?)",
+                              (self.namespace, name, token, now + ttl))
+        return token if cursor.rowcount == 1 else None
+
+    def locked(self, name: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM cache_locks WHERE ns = ? AND name = ? AND expires > ?",
+                                    (self.namespace, name, time.time())).fetchone() is not None
+
+    def release(self, name: str, token: str) -> None:
+        self._conn().execute("DELETE FROM cache_locks WHERE ns = ? AND name = ? AND token = ?",
+                             (self.namespace, name, token))
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    """最小的Redis协议(RESP2)客户端，只实现缓存用到的命令，兼容Redis/Valkey/KeyDB等服务"""
+
+    def __init__(self, host: str, port: int, password: str = None, username: str = None, db: int = 0,
+                 timeout: float = 5):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.execute("AUTH", *([username] if username else []), password)
+        if db:
+            self.execute("SELECT", db)
+
+    def execute(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis连接已关闭")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(body.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise RedisError(f"无法解析的Redis响应: {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis协议后端：键为 {prefix}:{命名空间}:{key}，版本号为 {prefix}:{命名空间}:__version__ (INCR)，
+    失效事件为 {prefix}:{命名空间}:__event__:{版本号}，递增版本号后发布到频道 {prefix}:{命名空间}:__events__，标签索引为集合 {prefix}:{命名空间}:__tag__:{标签}，租约为 {prefix}:{命名空间}:__lock__:{名称} (SET NX PX)
+
+    每个线程一个连接，连接出错时重连一次；缓存键设置过期时间 max_ttl，避免长期不访问的页面一直占用内存
+    """
+    name = "redis"
+
+    def __init__(self, url: str, namespace: str, prefix: str = "werss", max_ttl: int = 86400, timeout: float = 5):
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", ""):
+            raise ValueError(f"不支持的Redis地址: {url}")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 6379
+        self.username = unquote(parts.username) if parts.username else None
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.strip("/") or 0)
+        self.key_prefix = f"{prefix}:{namespace}:"
+        self.version_key = f"{self.key_prefix}__version__"
+        self.event_prefix = f"{self.key_prefix}__event__:"
+        self.channel = f"{self.key_prefix}__events__"
+        self.tag_prefix = f"{self.key_prefix}__tag__:"
+        self.lock_prefix = f"{self.key_prefix}__lock__:"
+        self.max_ttl = max_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _execute(self, *args):
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = _RespConnection(self.host, self.port, self.password, self.username, self.db, self.timeout)
+                    self._local.conn = conn
+                return conn.execute(*args)
+            except (OSError, ConnectionError):
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        data = self._execute("GET", self.key_prefix + key)
+        if not data or len(data) < _CREATED.size:
+            return None
+        return _CREATED.unpack_from(data)[0], data[_CREATED.size:]
+
+    def set(self, key: str, raw: bytes) -> None:
+        self._execute("SET", self.key_prefix + key, _CREATED.pack(time.time()) + raw, "EX", self.max_ttl)
+
+    def delete(self, key: str) -> None:
+        self._execute("DEL", self.key_prefix + key)
+
+    def delete_pattern(self, pattern: str) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = self._execute("SCAN", cursor, "MATCH", self.key_prefix + pattern, "COUNT", 500)
+            keys = [key for key in keys if key != self.version_key.encode("utf-8")
+                    and not key.startswith(self.event_prefix.encode("utf-8"))]
+            if keys:
+                self._execute("DEL", *keys)
+            if cursor in (b"0", "0"):
+                break
+
+    def clear(self) -> None:
+        self.delete_pattern("*")
+
+    def add_tags(self, key: str, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._execute("SADD", self.tag_prefix + tag, key)
+            # 索引与缓存键同样过期，不再写入的标签不会一直占用内存
+            self._execute("EXPIRE", self.tag_prefix + tag, self.max_ttl)
+
+    def delete_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            tag_key = self.tag_prefix + tag
+            keys = self._execute("SMEMBERS", tag_key) or []
+            self._execute("DEL", tag_key, *[self.key_prefix.encode("utf-8") + key for key in keys])
+
+    def version(self) -> int:
+        return int(self._execute("GET", self.version_key) or 0)
+
+    def bump(self, event: bytes = None) -> int:
+        version = self._execute("INCR", self.version_key)
+        # 递增和写入事件之间读到新版本号的进程找不到事件，按没有记录处理（丢弃全部进程内缓存）
+        if event is not None:
+            self._execute("SET", f"{self.event_prefix}{version}", event, "EX", self.max_ttl)
+        self._execute("PUBLISH", self.channel, version)
+        return version
+
+    def events(self, since: int) -> Optional[List[bytes]]:
+        current = self.version()
+        if since > current or current - since > self.max_events:
+            return None
+        if current == since:
+            return []
+        events = self._execute("MGET", *[f"{self.event_prefix}{version}" for version in range(since + 1, current + 1)])
+        return None if None in events else events
+
+    def subscribe(self, callback) -> bool:
+        threading.Thread(target=self._listen, args=(callback,), name=f"cache-{self.channel}", daemon=True).start()
+        return True
+
+    def _listen(self, callback) -> None:
+        """订阅连接（不设读取超时）收到消息时通知调用方，断开后逐步延长间隔重连，断开期间调用方改为轮询"""
+        delay = 1
+        while True:
+            conn = None
+            try:
+                conn = _RespConnection(self.host, self.port, self.password, self.username, self.db, None)
+                conn.execute("SUBSCRIBE", self.channel)
+                delay = 1
+                # 订阅成功时也通知一次，补上连接断开期间错过的失效
+                callback(True)
+                while True:
+                    conn._read()
+                    callback(True)
+            except Exception as e:
+                from core.print import print_warning
+                print_warning(f"缓存失效通知连接断开[{self.channel}]: {e}")
+                callback(False)
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def acquire(self, name: str, ttl: float) -> Optional[str]:
+        token = os.urandom(8).hex()
+        reply = self._execute("SET", self.lock_prefix + name, token, "NX", "PX", max(1, int(ttl * 1000)))
+        return token if reply is not None else None
+
+    def locked(self, name: str) -> bool:
+        return self._execute("GET", self.lock_prefix + name) is not None
+
+    def release(self, name: str, token: str) -> None:
+        # 先比较再删除不是原子操作，只在租约恰好过期并被其他进程获取的瞬间可能误删，影响仅是多生成一次
+        if self._execute("GET", self.lock_prefix + name) == token.encode("utf-8"):
+            self._execute("DEL", self.lock_prefix + name)
+
+
+def create_backend(namespace: str, cache_dir: str) -> CacheBackend:
+    """按配置 cache.backend 创建命名空间对应的共享后端（file/sqlite/redis）"""
+    backend = str(cfg.get("cache.backend", "file") or "file").lower()
+    if backend == "sqlite":
+        return SQLiteCacheBackend(cfg.get("cache.sqlite_path", "data/cache/cache.db") or "data/cache/cache.db", namespace)
+    if backend == "redis":
+        return RedisCacheBackend(cfg.get("cache.redis_url", "redis://127.0.0.1:6379/0") or "redis://127.0.0.1:6379/0",
+                                 namespace, prefix=cfg.get("cache.redis_prefix", "werss") or "werss",
+                                 max_ttl=int(cfg.get("cache.redis_max_ttl", 86400) or 86400))
+    return FileCacheBackend(cache_dir)
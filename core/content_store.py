@@ -0,0 +1,360 @@
+import os
+import json
+import gzip
+import mmap
+import struct
+import hashlib
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Optional, Dict, Iterable, Tuple
+from core.config import cfg
+from core.print import print_warning
+
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+
+class ContentStore:
+    """文章正文存储
+
+    文章采集入库时写入一次，/rss/content/{id} 直接读取，订阅源请求不再逐篇写文件。
+    数据保存在单个SQLite文件(WAL模式)中，正文按JSON序列化后zlib压缩存储
+    """
+    def __init__(self, path: str):
+        self.path = os.path.normpath(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3连接不能跨线程使用，每个线程各自持有一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS contents (id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(content: dict) -> bytes:
+        return zlib.compress(json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def _decode(data: bytes) -> dict:
+        return json.loads(zlib.decompress(data).decode("utf-8"))
+
+    def put_many(self, contents: Dict[str, dict]) -> None:
+        """批量写入（已存在的ID覆盖）"""
+        rows = [(str(content_id), self._encode(content)) for content_id, content in contents.items()]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._conn()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO contents (id, data) VALUES (?, ?)", rows)
+
+    def put(self, content_id: str, content: dict) -> None:
+        self.put_many({content_id: content})
+
+    def get(self, content_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM contents WHERE id = ?", (str(content_id),)).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def get_parts(self, content_id: str) -> Optional[Tuple[dict, bytes]]:
+        """返回 (不含正文的元数据, 正文字节)"""
+        content = self.get(content_id)
+        if content is None:
+            return None
+        body = content.pop("content", None) or ""
+        return content, body.encode("utf-8")
+
+    def delete_many(self, content_ids: Iterable[str]) -> None:
+        ids = [(str(content_id),) for content_id in content_ids]
+        if not ids:
+            return
+        with self._lock:
+            conn = self._conn()
+            with conn:
+                conn.executemany("DELETE FROM contents WHERE id = ?", ids)
+
+    def stats(self) -> dict:
+        count = self._conn().execute("SELECT COUNT(*) FROM contents").fetchone()[0]
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"items": count, "size": size, "path": self.path}
+
+
+# 索引项: 文章ID的md5(16) + 偏移(8) + 长度(4) + 标志(1) + 填充(3)，定长32字节，可直接mmap扫描
+_INDEX_ENTRY = struct.Struct("<16sQIB3x")
+_META_LEN = struct.Struct("<I")
+_CODEC_NONE = 0
+_CODEC_GZIP = 1
+_CODEC_ZSTD = 2
+_DELETED = 0x80
+_CODECS = {"none": _CODEC_NONE, "": _CODEC_NONE, "gzip": _CODEC_GZIP, "zstd": _CODEC_ZSTD}
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+class SegmentContentStore:
+    """追加写的单文件正文存储
+
+    正文记录顺序追加到 {base}.seg，索引项追加到 {base}.idx（后写入的覆盖先写入的，删除写入墓碑项）。
+    跨进程写入和压缩都先锁定不会被替换的 {base}.lock，再打开段文件和索引。
+    两个文件都通过mmap读取：启动时扫描索引建立内存字典，读取正文时直接返回段文件的memoryview。
+    覆盖和删除留下的无效数据超过 compact_ratio 时自动压缩重写；compress 可选 none/gzip/zstd，
+    开启压缩后按记录整块压缩，读取时需要解压
+    """
+    def __init__(self, base: str, compress: str = "none", compact_ratio: float = 0.5,
+                 compact_min_bytes: int = 16 * 1024 * 1024):
+        self.segment_path = os.path.normpath(f"{base}.seg")
+        self.index_path = os.path.normpath(f"{base}.idx")
+        self.lock_path = os.path.normpath(f"{base}.lock")
+        self.codec = _CODECS.get(str(compress or "none").lower())
+        if self.codec is None:
+            print_warning(f"不支持的正文压缩方式: {compress}，不压缩存储")
+            self.codec = _CODEC_NONE
+        if self.codec == _CODEC_ZSTD and _zstd() is None:
+            print_warning("未安装zstandard，正文改用gzip压缩")
+            self.codec = _CODEC_GZIP
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._lock = threading.RLock()
+        self._index = {}
+        self._index_pos = 0
+        self._index_ino = None
+        self._live = 0
+        self._dead = 0
+        self._mmap = None
+        os.makedirs(os.path.dirname(self.segment_path) or ".", exist_ok=True)
+        for path in (self.segment_path, self.index_path, self.lock_path):
+            open(path, "ab").close()
+        self._scan_index()
+
+    @staticmethod
+    def _key(content_id: str) -> bytes:
+        return hashlib.md5(str(content_id).encode("utf-8")).digest()
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """跨进程锁（仅POSIX），写入和压缩加排他锁，扫描索引加共享锁
+
+        锁定单独的锁文件而不是段文件或索引：压缩会替换这两个文件，
+        先打开再加锁可能锁住并写入已被替换的旧文件，写入的数据随之丢失
+        """
+        with open(self.lock_path, "ab") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+
+    def _apply(self, key: bytes, offset: int, length: int, flags: int) -> None:
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._live -= old[1]
+            self._dead += old[1]
+        if flags & _DELETED:
+            return
+        self._index[key] = (offset, length, flags)
+        self._live += length
+
+    def _scan_index(self, locked: bool = False) -> None:
+        """扫描索引文件中尚未读取的部分；索引文件被压缩替换后从头重建
+
+        有新索引项时在共享锁内扫描，避免索引和段文件分别读到压缩前后的不同版本。
+        locked 表示调用方已持有排他锁
+        """
+        with self._lock:
+            st = os.stat(self.index_path)
+            if st.st_ino == self._index_ino and st.st_size - st.st_size % _INDEX_ENTRY.size <= self._index_pos:
+                return
+            if not locked:
+                with self._file_lock(shared=True):
+                    self._scan_index(locked=True)
+                return
+            if st.st_ino != self._index_ino:
+                self._index = {}
+                self._index_pos = 0
+                self._index_ino = st.st_ino
+                self._live = self._dead = 0
+                self._mmap = None
+            end = st.st_size - st.st_size % _INDEX_ENTRY.size
+            if end <= self._index_pos:
+                return
+            segment_size = os.path.getsize(self.segment_path)
+            with open(self.index_path, "rb") as f:
+                with mmap.mmap(f.fileno(), end, access=mmap.ACCESS_READ) as mm:
+                    for key, offset, length, flags in _INDEX_ENTRY.iter_unpack(mm[self._index_pos:end]):
+                        # 段文件写入未完成（进程崩溃）的索引项直接跳过
+                        if not flags & _DELETED and offset + length > segment_size:
+                            continue
+                        self._apply(key, offset, length, flags)
+            self._index_pos = end
+
+    def _encode(self, content: dict) -> bytes:
+        meta = {k: v for k, v in content.items() if k != "content"}
+        meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        record = _META_LEN.pack(len(meta_bytes)) + meta_bytes + (content.get("content") or "").encode("utf-8")
+        if self.codec == _CODEC_GZIP:
+            return gzip.compress(record, compresslevel=6)
+        if self.codec == _CODEC_ZSTD:
+            return _zstd().ZstdCompressor().compress(record)
+        return record
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        """段文件指定范围的memoryview，文件增长后重新映射（旧映射由仍在使用的memoryview持有）"""
+        with self._lock:
+            if self._mmap is None or offset + length > len(self._mmap):
+                with open(self.segment_path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else None
+            return memoryview(self._mmap)[offset:offset + length]
+
+    def _append(self, records) -> None:
+        """追加 (key, 记录字节或None表示删除) 列表，先写段文件再写索引"""
+        with self._lock:
+            # 加锁后再打开，保证写入的是其他进程压缩替换后的当前文件
+            with self._file_lock(), open(self.segment_path, "ab") as seg, open(self.index_path, "ab") as idx:
+                offset = seg.seek(0, os.SEEK_END)
+                entries = []
+                for key, record in records:
+                    if record is None:
+                        entries.append(_INDEX_ENTRY.pack(key, 0, 0, _DELETED))
+                        continue
+                    seg.write(record)
+                    entries.append(_INDEX_ENTRY.pack(key, offset, len(record), self.codec))
+                    offset += len(record)
+                seg.flush()
+                idx.write(b"".join(entries))
+                idx.flush()
+            self._scan_index()
+            self._maybe_compact()
+
+    def put_many(self, contents: Dict[str, dict]) -> None:
+        records = [(self._key(content_id), self._encode(content)) for content_id, content in contents.items()]
+        if records:
+            self._append(records)
+
+    def put(self, content_id: str, content: dict) -> None:
+        self.put_many({content_id: content})
+
+    def delete_many(self, content_ids: Iterable[str]) -> None:
+        records = [(self._key(content_id), None) for content_id in content_ids]
+        if records:
+            self._append(records)
+
+    def _record(self, content_id: str) -> Optional[memoryview]:
+        # 先读取其他进程追加或压缩后的索引（只需一次stat），避免读到被覆盖的旧记录
+        self._scan_index()
+        entry = self._index.get(self._key(content_id))
+        if entry is None:
+            return None
+        offset, length, codec = entry
+        view = self._view(offset, length)
+        if codec == _CODEC_GZIP:
+            return memoryview(gzip.decompress(view))
+        if codec == _CODEC_ZSTD:
+            zstd = _zstd()
+            if zstd is None:
+                print_warning("未安装zstandard，无法读取zstd压缩的正文")
+                return None
+            return memoryview(zstd.ZstdDecompressor().decompress(view))
+        return view
+
+    def get_parts(self, content_id: str) -> Optional[Tuple[dict, memoryview]]:
+        """返回 (不含正文的元数据, 正文memoryview)，未压缩时正文直接指向段文件映射"""
+        record = self._record(content_id)
+        if record is None:
+            return None
+        (meta_len,) = _META_LEN.unpack_from(record)
+        meta = json.loads(bytes(record[_META_LEN.size:_META_LEN.size + meta_len]))
+        return meta, record[_META_LEN.size + meta_len:]
+
+    def get(self, content_id: str) -> Optional[dict]:
+        parts = self.get_parts(content_id)
+        if parts is None:
+            return None
+        meta, body = parts
+        meta["content"] = str(body, "utf-8")
+        return meta
+
+    def _maybe_compact(self) -> None:
+        total = self._live + self._dead
+        if self._dead >= self.compact_min_bytes and total and self._dead / total >= self.compact_ratio:
+            self.compact()
+
+    def compact(self) -> dict:
+        """只保留有效记录重写段文件和索引，返回压缩前后的大小"""
+        with self._lock:
+            with self._file_lock():
+                self._scan_index(locked=True)
+                before = os.path.getsize(self.segment_path)
+                seg_tmp = f"{self.segment_path}.compact"
+                idx_tmp = f"{self.index_path}.compact"
+                entries = []
+                with open(seg_tmp, "wb") as seg:
+                    offset = 0
+                    for key, (old_offset, length, codec) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                        seg.write(self._view(old_offset, length))
+                        entries.append(_INDEX_ENTRY.pack(key, offset, length, codec))
+                        offset += length
+                with open(idx_tmp, "wb") as idx:
+                    idx.write(b"".join(entries))
+                self._mmap = None
+                os.replace(seg_tmp, self.segment_path)
+                os.replace(idx_tmp, self.index_path)
+            self._scan_index()
+            return {"before": before, "after": os.path.getsize(self.segment_path)}
+
+    def stats(self) -> dict:
+        self._scan_index()
+        return {
+            "items": len(self._index),
+            "size": os.path.getsize(self.segment_path),
+            "live": self._live,
+            "dead": self._dead,
+            "compress": {v: k for k, v in _CODECS.items() if k}[self.codec],
+            "path": self.segment_path,
+        }
+
+
+def _create_store():
+    base = cfg.get("rss.content_store", "data/cache/content") or "data/cache/content"
+    backend = str(cfg.get("rss.content_backend", "segment") or "segment").lower()
+    if backend == "sqlite":
+        return ContentStore(f"{base}.db")
+    return SegmentContentStore(base, compress=cfg.get("rss.content_compress", "none"))
+
+
+class _LazyStore:
+    """首次使用时才按配置创建正文存储，导入模块时不创建目录和文件"""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._store = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = self._factory()
+        return self._store
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+# 进程内共享的正文存储
+CONTENTS = _LazyStore(_create_store)
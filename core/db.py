@@ -1,21 +1,272 @@
-from sqlalchemy import create_engine, Engine,Text,event
+from sqlalchemy import create_engine, Engine,Text,event,inspect,select
 from sqlalchemy.orm import sessionmaker, declarative_base,scoped_session
 from sqlalchemy import Column, Integer, String, DateTime
 from typing import Optional, List
-from .models import Feed, Article
+from .models import Feed, Article, ArticleCount, TagFeed
 from .config import cfg
-from core.models.base import Base  
+from core.rss import RSS, FEED_VERSIONS, FeedVersions
+from core.content_store import CONTENTS
+from core.websub import HUB
+from core.cache import clear_cache_tags
+from core.models.base import Base,DATA_STATUS
 from core.print import print_warning,print_info,print_error,print_success
+import threading
+import time
 # 声明基类
 # Base = declarative_base()
 
+def replication_lag(conn) -> Optional[float]:
+    """查询只读副本的复制延迟（秒），无法判断时返回None，复制中断时返回inf"""
+    dialect=conn.dialect.name
+    if dialect in ("mysql","mariadb"):
+        try:
+            row=conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        except Exception:
+            row=conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+        if row is None:
+            return None
+        lag=row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return float("inf") if lag is None else float(lag)
+    if dialect=="postgresql":
+        lag=conn.exec_driver_sql(
+            "SELECT CASE WHEN pg_is_in_recovery() THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+        ).scalar()
+        return float(lag or 0)
+    return None
+
+class ConnectionHealth:
+    """数据库连接健康状态管理
+
+    - 连接检出时由连接池执行 pre-ping，失效连接自动替换
+    - 后台线程定时探活，发现异常时按指数退避重建连接池
+    - 统计重连、探活失败、连接作废等次数
+    - 只读副本同时记录复制延迟
+    """
+    def __init__(self, name:str, interval:int=30, max_backoff:int=60, measure_lag:bool=False):
+        self.name=name
+        self.engine=None
+        self.interval=interval
+        self.max_backoff=max_backoff
+        self.measure_lag=measure_lag
+        self.lag=None            # 复制延迟（秒），仅只读副本
+        self.healthy=True
+        self.reconnects=0        # 重建连接池次数
+        self.failures=0          # 探活失败次数
+        self.invalidated=0       # 被连接池作废的连接数（pre-ping失败等）
+        self.last_error=None
+        self.last_check=None
+        self._backoff=1
+        self._next_retry=0
+        self._lock=threading.Lock()
+        self._thread=None
+    def attach(self, engine:Engine):
+        """绑定引擎及连接池事件"""
+        self.engine=engine
+        event.listen(engine, "invalidate", self._on_invalidate)
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidated+=1
+        if exception is not None:
+            self.last_error=str(exception)
+    def ping(self) -> bool:
+        """执行一次探活查询"""
+        self.last_check=time.time()
+        try:
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+                if self.measure_lag:
+                    try:
+                        self.lag=replication_lag(conn)
+                    except Exception as e:
+                        # 无权限查询复制状态时不影响可用性
+                        self.lag=None
+                        self.last_error=f"replication lag: {e}"
+            self.healthy=True
+            self._backoff=1
+            self._next_retry=0
+            return True
+        except Exception as e:
+            self.healthy=False
+            self.failures+=1
+            self.last_error=str(e)
+            return False
+    def reconnect(self) -> bool:
+        """重建连接池，失败时按指数退避，退避期内直接返回False"""
+        with self._lock:
+            now=time.time()
+            if now < self._next_retry:
+                return False
+            print_warning(f"[{self.name}] Database connection lost: {self.last_error}. Reconnecting...")
+            try:
+                self.engine.dispose()
+            except Exception:
+                pass
+            self.reconnects+=1
+            if self.ping():
+                print_success(f"[{self.name}] 数据库重连成功")
+                return True
+            self._next_retry=now+self._backoff
+            self._backoff=min(self._backoff*2, self.max_backoff)
+            return False
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self.ping():
+                self.reconnect()
+    def start(self):
+        """启动后台探活线程（幂等）"""
+        if self.interval<=0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread=threading.Thread(target=self._run, daemon=True, name=f"db-health-{self.name}")
+        self._thread.start()
+    def stats(self) -> dict:
+        return {
+            "tag": self.name,
+            "healthy": self.healthy,
+            "lag": self.lag,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "invalidated": self.invalidated,
+            "last_error": self.last_error,
+            "last_check": self.last_check,
+        }
+
+def _create_engine(con_str: str) -> Engine:
+    """按统一的连接池参数创建引擎"""
+    # 检查SQLite数据库文件是否存在
+    if con_str.startswith('sqlite:///'):
+        import os
+        db_path = con_str[10:]  # 去掉'sqlite:///'前缀
+        if not os.path.exists(db_path):
+            try:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            except Exception as e:
+                pass
+            open(db_path, 'w').close()
+    return create_engine(con_str,
+                                 pool_size=int(cfg.get("db_pool.size",5) or 5),          # 连接池常驻连接数（进程内同一URL共享）
+                                 max_overflow=int(cfg.get("db_pool.max_overflow",10) or 0),      # 允许的最大溢出连接数
+                                 pool_timeout=30,      # 获取连接时的超时时间（秒）
+                                 echo=False,
+                                 pool_recycle=60,  # 连接池回收时间（秒）
+                                 pool_pre_ping=bool(cfg.get("db_pool.pre_ping",True)),  # 检出连接时探活，替代每次取会话时的查询
+                                 isolation_level="AUTOCOMMIT",  # 设置隔离级别
+                                #  isolation_level="READ COMMITTED",  # 设置隔离级别
+                                #  query_cache_size=0,
+                                 connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
+                                 )
+
+class EngineRegistry:
+    """引擎注册表
+
+    同一连接串在进程内只创建一个引擎（连接池）和一个探活线程，
+    各模块的 Db(tag=...) 从共享连接池获取连接，并按标签统计会话使用情况。
+    """
+    def __init__(self):
+        self._engines={}     # 连接串 -> (引擎, 健康状态)
+        self._tags={}        # 连接串 -> 使用该连接池的标签
+        self._metrics={}     # 标签 -> 会话统计
+        self._lock=threading.Lock()
+    def get(self, url:str, name:str, tag:str=None, measure_lag:bool=False):
+        """获取连接串对应的 (引擎, 健康状态)，不存在时创建"""
+        with self._lock:
+            if tag:
+                self._tags.setdefault(url, set()).add(tag)
+            if url not in self._engines:
+                health=ConnectionHealth(name,
+                                        interval=int(cfg.get("db_pool.check_interval",30) or 0),
+                                        max_backoff=int(cfg.get("db_pool.max_backoff",60) or 60),
+                                        measure_lag=measure_lag)
+                engine=_create_engine(url)
+                health.attach(engine)
+                if measure_lag:
+                    health.ping()
+                health.start()
+                self._engines[url]=(engine, health)
+            return self._engines[url]
+    def metrics(self, tag:str) -> dict:
+        """获取标签的会话统计（同一标签的多个Db实例共用）"""
+        with self._lock:
+            return self._metrics.setdefault(tag, {"sessions": 0, "read_sessions": 0, "transactions": 0, "commits": 0, "rollbacks": 0})
+    def stats(self) -> dict:
+        """各连接池状态及按标签的会话统计"""
+        engines=[]
+        for url, (engine, health) in list(self._engines.items()):
+            engines.append({
+                "url": engine.url.render_as_string(hide_password=True),
+                "pool": engine.pool.status(),
+                "health": health.stats(),
+                "tags": sorted(self._tags.get(url, [])),
+            })
+        return {
+            "engines": engines,
+            "tags": {tag: dict(metrics) for tag, metrics in self._metrics.items()},
+        }
+
+# 进程内共享的引擎注册表
+ENGINES=EngineRegistry()
+
+class Replica:
+    """只读副本：共享的引擎和健康状态，每个Db独立的会话工厂"""
+    def __init__(self, name:str, url:str, engine:Engine, health:ConnectionHealth):
+        self.name=name
+        self.url=url
+        self.engine=engine
+        self.health=health
+        self.factory=sessionmaker(bind=engine, autoflush=False, expire_on_commit=True, future=True)
+        self.Session=scoped_session(self.factory)
+    def usable(self, max_lag:float) -> bool:
+        """健康且复制延迟在允许范围内（无法获取延迟时视为可用）"""
+        if not self.health.healthy:
+            return False
+        return self.health.lag is None or self.health.lag <= max_lag
+
+def _replica_urls(value) -> List[str]:
+    """解析副本配置，支持YAML列表或逗号分隔的字符串"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value=value.split(",")
+    return [str(url).strip() for url in value if url and str(url).strip()]
+
+# 影响订阅源输出的字段，只修改其他字段（如已读、同步时间）时不使缓存失效
+_ARTICLE_FEED_FIELDS=("title", "url", "description", "pic_url", "content", "status", "publish_time", "mp_id")
+_FEED_FEED_FIELDS=("mp_name", "mp_cover", "mp_intro", "status")
+# 影响公众号文章计数的字段
+_ARTICLE_COUNT_FIELDS=("status", "mp_id")
+
+def _changed(obj, fields) -> bool:
+    state=inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+def _committed(obj, fields) -> Optional[dict]:
+    """返回属性在数据库中的原值，任一属性的原值未加载时返回None"""
+    state=inspect(obj)
+    values={}
+    for field in fields:
+        history=state.attrs[field].history
+        if history.deleted:
+            values[field]=history.deleted[0]
+        elif history.unchanged:
+            values[field]=history.unchanged[0]
+        else:
+            return None
+    return values
+
 class Db:
     connection_str: str=None
-    def __init__(self,tag:str="默认",User_In_Thread=True):
+    def __init__(self,tag:str="默认",User_In_Thread=True,replicas:List[str]=None):
         self.Session= None
         self.engine = None
+        self.health = None
         self.User_In_Thread=User_In_Thread
         self.tag=tag
+        self.replicas:List[Replica]=[]
+        self.replica_urls=_replica_urls(cfg.get("db_replica.urls","")) if replicas is None else _replica_urls(replicas)
+        self.max_lag=float(cfg.get("db_replica.max_lag",30) or 30)
+        self._replica_index=0
+        self.read_fallbacks=0    # 副本不可用回退到主库的次数
+        # 按标签统计的会话使用情况
+        self.metrics=ENGINES.metrics(tag)
         print_success(f"[{tag}]连接初始化")
         self.init(cfg.get("db"))
     def get_engine(self) -> Engine:
@@ -24,36 +275,198 @@ class Db:
             raise ValueError("Database connection has not been initialized.")
         return self.engine
     def get_session_factory(self):
-        return sessionmaker(bind=self.engine, autoflush=True, expire_on_commit=True, future=True)
+        factory=sessionmaker(bind=self.engine, autoflush=True, expire_on_commit=True, future=True)
+        event.listen(factory, "after_begin", lambda *args: self._count("transactions"))
+        event.listen(factory, "after_commit", lambda *args: self._count("commits"))
+        event.listen(factory, "after_rollback", lambda *args: self._count("rollbacks"))
+        # 订阅源缓存失效：flush时记录受影响的订阅源，提交后递增版本号，回滚则丢弃
+        event.listen(factory, "after_flush", self._collect_feed_changes)
+        event.listen(factory, "after_commit", self._publish_feed_changes)
+        event.listen(factory, "after_soft_rollback", lambda session, *args: session.info.pop("feed_versions", None))
+        # 公众号文章计数：flush前按文章的新增、删除和状态变化计算增量，写入成功后再更新计数
+        event.listen(factory, "before_flush", self._collect_article_counts)
+        event.listen(factory, "after_flush", self._apply_article_counts)
+        # 文章正文在入库提交后写入正文存储，只写一次
+        event.listen(factory, "after_flush", self._collect_article_contents)
+        event.listen(factory, "after_commit", self._store_article_contents)
+        event.listen(factory, "after_soft_rollback", lambda session, *args: session.info.pop("article_contents", None))
+        # 新文章提交后通过WebSub推送给订阅者
+        event.listen(factory, "after_commit", self._publish_new_articles)
+        event.listen(factory, "after_soft_rollback", lambda session, *args: session.info.pop("new_articles", None))
+        return factory
+    def _count(self, key:str) -> None:
+        self.metrics[key]+=1
+    def _touch_feeds(self, session, mp_ids=(), tag_ids=()) -> None:
+        """记录本事务影响的订阅源（公众号、所属标签及全部文章源），提交后统一递增版本号
+
+        公众号所属标签需要在事务内查询，批量写入等绕过ORM的操作需显式调用
+        """
+        mp_ids={mp_id for mp_id in mp_ids if mp_id}
+        tag_ids={tag_id for tag_id in tag_ids if tag_id}
+        if not mp_ids and not tag_ids:
+            return
+        keys=session.info.setdefault("feed_versions", set())
+        if mp_ids:
+            keys.add(FeedVersions.ALL)
+            keys.update(FeedVersions.key(feed_id=mp_id) for mp_id in mp_ids)
+            rows=session.connection().execute(select(TagFeed.tag_id).where(TagFeed.mp_id.in_(mp_ids)))
+            tag_ids.update(row[0] for row in rows)
+        keys.update(FeedVersions.key(tag_id=tag_id) for tag_id in tag_ids)
+    def _collect_feed_changes(self, session, flush_context) -> None:
+        """从本次flush的新增、修改、删除对象中找出影响订阅源输出的变更"""
+        from core.models.tags import Tags
+        mp_ids=set()
+        tag_ids=set()
+        for obj in list(session.new)+list(session.dirty)+list(session.deleted):
+            if isinstance(obj, Article):
+                if obj in session.dirty and not _changed(obj, _ARTICLE_FEED_FIELDS):
+                    continue
+                mp_ids.add(obj.mp_id)
+                if obj in session.new and obj.mp_id:
+                    session.info.setdefault("new_articles", set()).add(obj.mp_id)
+            elif isinstance(obj, Feed):
+                if obj in session.dirty and not _changed(obj, _FEED_FEED_FIELDS):
+                    continue
+                mp_ids.add(obj.id)
+            elif isinstance(obj, Tags):
+                tag_ids.add(obj.id)
+        self._touch_feeds(session, mp_ids, tag_ids)
+    def _collect_article_counts(self, session, flush_context, instances) -> None:
+        """按本次flush新增、删除及修改了状态/公众号的文章计算计数增量
+
+        原值取自属性历史，未加载时在flush前从数据库读取；
+        绕过ORM的批量写入、批量删除不经过flush，需调用方自行维护计数
+        """
+        session.info.pop("article_counts", None)
+        new=session.new
+        deleted=session.deleted
+        changes=[]
+        unknown=[]
+        for obj in list(new)+list(session.dirty)+list(deleted):
+            if not isinstance(obj, Article):
+                continue
+            if obj in new:
+                changes.append((obj, None))
+                continue
+            if obj not in deleted and not _changed(obj, _ARTICLE_COUNT_FIELDS):
+                continue
+            old=_committed(obj, _ARTICLE_COUNT_FIELDS)
+            if old is None:
+                unknown.append(obj.id)
+            changes.append((obj, old))
+        if not changes:
+            return
+        committed={}
+        if unknown:
+            rows=session.connection().execute(select(Article.id, Article.status, Article.mp_id).where(Article.id.in_(unknown)))
+            committed={row[0]: {"status": row[1], "mp_id": row[2]} for row in rows}
+        deltas={}
+        for obj, old in changes:
+            if old is None and obj not in new:
+                old=committed.get(obj.id)
+            if old and old["status"] == DATA_STATUS.ACTIVE:
+                deltas[old["mp_id"]]=deltas.get(old["mp_id"],0)-1
+            if obj in deleted:
+                continue
+            status=obj.status
+            if status is None and obj in new:
+                # 未设置状态的新文章按列默认值（有效）写入
+                status=DATA_STATUS.ACTIVE
+            if status == DATA_STATUS.ACTIVE:
+                deltas[obj.mp_id]=deltas.get(obj.mp_id,0)+1
+        session.info["article_counts"]=deltas
+    def _apply_article_counts(self, session, flush_context) -> None:
+        deltas=session.info.pop("article_counts", None)
+        if deltas:
+            self._bump_article_counts(session, deltas)
+    def _publish_feed_changes(self, session) -> None:
+        keys=session.info.pop("feed_versions", None)
+        if keys:
+            FEED_VERSIONS.bump(keys)
+    def _publish_new_articles(self, session) -> None:
+        mp_ids=session.info.pop("new_articles", None)
+        if mp_ids:
+            # 只清除这些公众号的文章列表和全部文章列表，其他页面的缓存不受影响
+            clear_cache_tags("feed:all", *(f"feed:{mp_id}" for mp_id in mp_ids))
+            HUB.publish(mp_ids)
+    def _stage_contents(self, session, rows) -> None:
+        """记录本事务写入的文章正文，提交后写入正文存储
+
+        rows 为包含 id/mp_id/title/content/publish_time/pic_url 的字典，content 为None时表示从存储中移除
+        """
+        staged=session.info.setdefault("article_contents", {})
+        rows=[row for row in rows if row.get("id")]
+        mp_ids={row.get("mp_id") for row in rows if row.get("content") is not None and row.get("mp_id")}
+        names={}
+        if mp_ids:
+            result=session.connection().execute(select(Feed.id, Feed.mp_name).where(Feed.id.in_(mp_ids)))
+            names={row[0]: row[1] for row in result}
+        for row in rows:
+            if row.get("content") is None:
+                staged[row["id"]]=None
+                continue
+            staged[row["id"]]={
+                "id": row["id"],
+                "title": row.get("title"),
+                "content": row.get("content"),
+                "publish_time": row.get("publish_time"),
+                "mp_id": row.get("mp_id"),
+                "pic_url": row.get("pic_url"),
+                "mp_name": names.get(row.get("mp_id")),
+            }
+    def _collect_article_contents(self, session, flush_context) -> None:
+        """新增文章或正文变化时暂存正文；删除、正文为空或未加载正文的修改只移除存储中的旧数据"""
+        rows=[]
+        for obj in list(session.new)+list(session.dirty)+list(session.deleted):
+            if not isinstance(obj, Article):
+                continue
+            if obj in session.dirty and not _changed(obj, _ARTICLE_FEED_FIELDS):
+                continue
+            if obj in session.deleted or "content" not in inspect(obj).dict or not obj.content:
+                rows.append({"id": obj.id, "content": None})
+                continue
+            rows.append({"id": obj.id, "mp_id": obj.mp_id, "title": obj.title, "content": obj.content,
+                         "publish_time": obj.publish_time, "pic_url": obj.pic_url})
+        if rows:
+            self._stage_contents(session, rows)
+    def _store_article_contents(self, session) -> None:
+        staged=session.info.pop("article_contents", None)
+        if not staged:
+            return
+        try:
+            removed=[content_id for content_id, content in staged.items() if content is None]
+            CONTENTS.delete_many(removed)
+            RSS().cache_contents({content_id: content for content_id, content in staged.items() if content is not None})
+        except Exception as e:
+            print_warning(f"写入文章正文存储失败: {e}")
     def init(self, con_str: str) -> None:
-        """Initialize database connection and create tables"""
+        """初始化数据库连接（从引擎注册表获取共享连接池，重复调用不会新建连接池）"""
         try:
+            if self.engine is not None and con_str==self.connection_str:
+                return
             self.connection_str=con_str
-            # 检查SQLite数据库文件是否存在
-            if con_str.startswith('sqlite:///'):
-                import os
-                db_path = con_str[10:]  # 去掉'sqlite:///'前缀
-                if not os.path.exists(db_path):
-                    try:
-                        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-                    except Exception as e:
-                        pass
-                    open(db_path, 'w').close()
-            self.engine = create_engine(con_str,
-                                     pool_size=2,          # 最小空闲连接数
-                                     max_overflow=20,      # 允许的最大溢出连接数
-                                     pool_timeout=30,      # 获取连接时的超时时间（秒）
-                                     echo=False,
-                                     pool_recycle=60,  # 连接池回收时间（秒）
-                                     isolation_level="AUTOCOMMIT",  # 设置隔离级别
-                                    #  isolation_level="READ COMMITTED",  # 设置隔离级别
-                                    #  query_cache_size=0,
-                                     connect_args={"check_same_thread": False} if con_str.startswith('sqlite:///') else {}
-                                     )
+            self.engine, self.health = ENGINES.get(con_str, "primary", tag=self.tag)
             self.session_factory=self.get_session_factory()
+            self.Session=None
+            self._init_replicas()
         except Exception as e:
             print(f"Error creating database connection: {e}")
             raise
+    def _init_replicas(self) -> None:
+        """创建只读副本连接，已创建的副本直接复用"""
+        existing={replica.url: replica for replica in self.replicas}
+        replicas=[]
+        for i, url in enumerate(self.replica_urls):
+            if url in existing:
+                replicas.append(existing[url])
+                continue
+            try:
+                name=f"replica{i}"
+                engine, health = ENGINES.get(url, name, tag=self.tag, measure_lag=True)
+                replicas.append(Replica(name, url, engine, health))
+            except Exception as e:
+                print_error(f"[{self.tag}]只读副本连接失败: {e}")
+        self.replicas=replicas
     def create_tables(self):
         """Create all tables defined in models"""
         from core.models.base import Base as B # 导入所有模型
@@ -61,6 +474,14 @@ class Db:
             B.metadata.create_all(self.engine)
         except Exception as e:
             print_error(f"Error creating tables: {e}")
+        # create_all 只为新表建索引，已有表补建缺失的索引
+        for table in B.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(self.engine, checkfirst=True)
+                except Exception as e:
+                    print_warning(f"Error creating index {index.name}: {e}")
+        self.migrate_tag_feeds()
 
         print('All Tables Created Successfully!')    
         
@@ -91,13 +512,64 @@ class Db:
             pass      
         return False
      
+    def _article_row(self, article_data: dict) -> dict:
+        """将采集到的文章数据整理为articles表的一行"""
+        from datetime import datetime
+        from core.models.base import DATA_STATUS
+        now=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        art_id=article_data.get("id")
+        if art_id:
+            art_id=f"{str(article_data.get('mp_id'))}-{art_id}".replace("MP_WXS_","")
+        created_at=article_data.get("created_at") or now
+        updated_at=article_data.get("updated_at") or now
+        return {
+            "id": art_id,
+            "mp_id": article_data.get("mp_id"),
+            "title": article_data.get("title"),
+            "pic_url": article_data.get("pic_url"),
+            "url": article_data.get("url"),
+            "description": article_data.get("description"),
+            "content": article_data.get("content"),
+            "status": DATA_STATUS.ACTIVE,
+            "publish_time": article_data.get("publish_time"),
+            "created_at": datetime.strptime(created_at,'%Y-%m-%d %H:%M:%S') if isinstance(created_at,str) else created_at,
+            "updated_at": datetime.strptime(updated_at,'%Y-%m-%d %H:%M:%S') if isinstance(updated_at,str) else updated_at,
+            "is_export": article_data.get("is_export"),
+            "is_read": 0,
+            "has_content": 1 if article_data.get("content") else 0,
+        }
+
+    def _insert_new_articles(self, session, rows: List[dict]) -> set:
+        """写入文章并返回实际写入的文章ID，已存在的文章跳过
+
+        支持 INSERT ... RETURNING 的数据库（SQLite 3.35+、PostgreSQL）一条语句批量写入并返回写入的ID；
+        其他数据库逐条写入，主键冲突的视为已存在
+        """
+        from sqlalchemy.exc import IntegrityError
+        conn=session.connection()
+        dialect=self.engine.dialect
+        if dialect.name in ("sqlite","postgresql") and dialect.insert_executemany_returning:
+            if dialect.name=="sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt=insert(Article).on_conflict_do_nothing(index_elements=["id"]).returning(Article.id)
+            return {row[0] for row in conn.execute(stmt, rows)}
+        # MySQL的 ON DUPLICATE KEY UPDATE 在 FOUND_ROWS 下无法从影响行数区分写入和跳过
+        from sqlalchemy import insert
+        inserted=set()
+        for row in rows:
+            try:
+                conn.execute(insert(Article), row)
+                inserted.add(row["id"])
+            except IntegrityError:
+                print_warning(f"Article already exists: {row['id']}")
+        return inserted
+
     def add_article(self, article_data: dict,check_exist=False) -> bool:
         try:
             session=self.get_session()
-            from datetime import datetime
-            art = Article(**article_data)
-            if art.id:
-               art.id=f"{str(art.mp_id)}-{art.id}".replace("MP_WXS_","")
+            art = Article(**self._article_row(article_data))
             
             if check_exist:
                 # 检查文章是否已存在
@@ -106,27 +578,240 @@ class Db:
                     print_warning(f"Article already exists: {art.id}")
                     return False
                 
-            if art.created_at is None:
-                art.created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if art.updated_at is None:
-                art.updated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            art.created_at=datetime.strptime(art.created_at ,'%Y-%m-%d %H:%M:%S')
-            art.updated_at=datetime.strptime(art.updated_at,'%Y-%m-%d %H:%M:%S')
-            art.content=art.content
-            from core.models.base import DATA_STATUS
-            art.status=DATA_STATUS.ACTIVE
             session.add(art)
             # self._session.merge(art)
+            session.flush()
             sta=session.commit()
             
         except Exception as e:
             if "UNIQUE" in str(e) or "Duplicate entry" in str(e):
-                print_warning(f"Article already exists: {art.id}")
+                print_warning(f"Article already exists: {article_data.get('id')}")
             else:
                 print_error(f"Failed to add article: {e}")
             return False
         return True    
+
+    def add_articles(self, articles_data: List[dict]) -> List[dict]:
+        """批量写入文章，已存在的文章直接跳过，整批只提交一次
+
+        Args:
+            articles_data: 采集到的文章数据列表
+
+        Returns:
+            新写入的文章（原始数据字典）列表
+        """
+        rows={}
+        for data in articles_data or []:
+            row=self._article_row(data)
+            if row["id"] and row["id"] not in rows:
+                rows[row["id"]]=(row,data)
+        if not rows:
+            return []
+        session=self.get_session()
+        try:
+            existing={r[0] for r in session.query(Article.id).filter(Article.id.in_(list(rows.keys()))).all()}
+            new=[item for art_id,item in rows.items() if art_id not in existing]
+            if new:
+                # 并发写入时由数据库的冲突处理兜底，计数、推送和返回值只按实际写入的文章计算
+                inserted=self._insert_new_articles(session, [row for row,_ in new])
+                new=[item for item in new if item[0]["id"] in inserted]
+                deltas={}
+                for row,_ in new:
+                    deltas[row["mp_id"]]=deltas.get(row["mp_id"],0)+1
+                self._bump_article_counts(session, deltas)
+                self._touch_feeds(session, deltas.keys())
+                session.info.setdefault("new_articles", set()).update(deltas.keys())
+                self._stage_contents(session, [row for row,_ in new if row.get("content")])
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            print_error(f"Failed to add articles: {e}")
+            return []
+        return [data for _,data in new]
         
+    def _bump_article_counts(self, session, deltas: dict) -> None:
+        """在调用方事务内增量更新公众号文章计数
+
+        计数行不存在时不创建，留待首次读取时按articles表初始化，避免重复计数；
+        直接在连接上执行，flush过程中（见 _apply_article_counts）也可调用
+        """
+        from sqlalchemy import update
+        from datetime import datetime
+        for mp_id, delta in (deltas or {}).items():
+            if not mp_id or not delta:
+                continue
+            session.connection().execute(update(ArticleCount)
+                            .where(ArticleCount.mp_id == mp_id)
+                            .values(count=ArticleCount.count + delta, updated_at=datetime.now()))
+
+    def refresh_article_counts(self, mp_ids: List[str]=None) -> dict:
+        """按articles表重新统计公众号文章数（GROUP BY mp_id）并写回计数表
+
+        Args:
+            mp_ids: 需要统计的公众号ID列表，None表示全部
+
+        Returns:
+            {公众号ID: 文章数}
+        """
+        from sqlalchemy import func
+        from datetime import datetime
+        session=self.get_session()
+        query=session.query(Article.mp_id, func.count(Article.id)).filter(Article.status == 1)
+        if mp_ids is not None:
+            query=query.filter(Article.mp_id.in_(mp_ids))
+        counts={mp_id: 0 for mp_id in mp_ids or []}
+        counts.update({row[0]: row[1] for row in query.group_by(Article.mp_id).all() if row[0]})
+        try:
+            if mp_ids is None:
+                # 全量统计时删除已没有文章的计数行（如已清理孤立文章的公众号）
+                session.query(ArticleCount).delete(synchronize_session=False)
+            now=datetime.now()
+            for mp_id, count in counts.items():
+                session.merge(ArticleCount(mp_id=mp_id, count=count, updated_at=now))
+            session.commit()
+        except Exception as e:
+            # 并发初始化同一计数行时可能冲突，本次统计结果仍然有效
+            session.rollback()
+            print_warning(f"写入文章计数失败: {e}")
+        return counts
+
+    def get_article_counts(self, mp_ids: List[str], exact: bool=False) -> dict:
+        """获取公众号文章数
+
+        Args:
+            mp_ids: 公众号ID列表
+            exact: False读取计数表（缺失的计数行按需初始化）；True直接统计articles表并校正计数表，供管理界面使用
+
+        Returns:
+            {公众号ID: 文章数}
+        """
+        mp_ids=[i for i in dict.fromkeys(mp_ids or []) if i]
+        if not mp_ids:
+            return {}
+        if exact:
+            return self.refresh_article_counts(mp_ids)
+        try:
+            rows=self.get_read_session().query(ArticleCount.mp_id, ArticleCount.count).filter(ArticleCount.mp_id.in_(mp_ids)).all()
+        except Exception as e:
+            print_warning(f"读取文章计数失败，改为实时统计: {e}")
+            return self.refresh_article_counts(mp_ids)
+        counts={row[0]: max(row[1] or 0, 0) for row in rows}
+        missing=[i for i in mp_ids if i not in counts]
+        if missing:
+            counts.update(self.refresh_article_counts(missing))
+        return counts
+
+    def delete_article_counts(self, mp_ids: List[str]) -> None:
+        """公众号的文章被批量删除后（如清理孤立文章）删除其计数行"""
+        mp_ids=[i for i in dict.fromkeys(mp_ids or []) if i]
+        if not mp_ids:
+            return
+        session=self.get_session()
+        try:
+            session.query(ArticleCount).filter(ArticleCount.mp_id.in_(mp_ids)).delete(synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print_warning(f"删除文章计数失败: {e}")
+
+    def count_articles(self, mp_ids: List[str]=None, exact: bool=False) -> int:
+        """统计多个公众号的文章总数，mp_ids为None时统计全部公众号
+
+        全部公众号包括已删除公众号留下的计数行：删除公众号不会删除其文章，
+        这些文章在清理孤立文章前仍计入总数，与 COUNT(*) 一致。
+        计数行只在首次读取时初始化，从未读取过计数就被删除的公众号的文章不在总数内，
+        refresh_article_counts() 全量统计时会校正
+        """
+        if mp_ids is None:
+            session=self.get_read_session()
+            mp_ids=[row[0] for row in session.query(Feed.id).all()]
+            mp_ids+=[row[0] for row in session.query(ArticleCount.mp_id).all()]
+        return sum(self.get_article_counts(mp_ids, exact=exact).values())
+
+    def get_tag_feed_ids(self, tag_ids: List[str], active_only: bool=False) -> dict:
+        """一次查询解析多个标签关联的公众号（tag_feeds关联表）
+
+        Args:
+            tag_ids: 标签ID列表
+            active_only: 只解析启用状态的标签
+
+        Returns:
+            {标签ID: [公众号ID]}，不存在的标签对应空列表
+        """
+        from core.models.tags import Tags
+        tag_ids=[i for i in dict.fromkeys(tag_ids or []) if i]
+        result={tag_id: [] for tag_id in tag_ids}
+        if not tag_ids:
+            return result
+        query=self.get_read_session().query(TagFeed.tag_id, TagFeed.mp_id).filter(TagFeed.tag_id.in_(tag_ids))
+        if active_only:
+            query=query.join(Tags, Tags.id == TagFeed.tag_id).filter(Tags.status == 1)
+        for tag_id, mp_id in query.all():
+            result[tag_id].append(mp_id)
+        return result
+
+    def migrate_tag_feeds(self, force: bool=False) -> int:
+        """将 Tags.mps_id 中的JSON迁移到tag_feeds关联表
+
+        Args:
+            force: 为True时重建全部关联，否则仅在关联表为空时迁移
+
+        Returns:
+            写入的关联记录数
+        """
+        from core.models.tags import Tags
+        from core.models.tag_feed import parse_mps_id
+        from datetime import datetime
+        session=self.get_session()
+        try:
+            if not force and session.query(TagFeed.tag_id).first() is not None:
+                return 0
+            session.query(TagFeed).delete(synchronize_session=False)
+            now=datetime.now()
+            rows=[{"tag_id": tag_id, "mp_id": mp_id, "created_at": now}
+                  for tag_id, mps_id in session.query(Tags.id, Tags.mps_id).all()
+                  for mp_id in parse_mps_id(mps_id)]
+            if rows:
+                session.execute(TagFeed.__table__.insert(), rows)
+            session.commit()
+            if rows:
+                print_success(f"已迁移 {len(rows)} 条标签-公众号关联")
+            return len(rows)
+        except Exception as e:
+            session.rollback()
+            print_error(f"迁移标签关联失败: {e}")
+            return 0
+
+    def get_article_contents(self, ids: List[str]) -> dict:
+        """按需批量加载文章正文，返回 {文章ID: 正文}"""
+        ids=[i for i in ids or [] if i]
+        if not ids:
+            return {}
+        try:
+            rows=self.get_read_session().query(Article.id, Article.content).filter(Article.id.in_(ids)).all()
+            return {row[0]: row[1] for row in rows}
+        except Exception as e:
+            print_error(f"Failed to load article content: {e}")
+            return {}
+
+    def load_article_content(self, article_id: str) -> Optional[dict]:
+        """从数据库读取文章正文及来源公众号，格式与正文存储一致"""
+        try:
+            row=self.get_read_session().query(Article.id, Article.title, Article.content, Article.publish_time,
+                                              Article.mp_id, Article.pic_url, Feed.mp_name)\
+                .outerjoin(Feed, Feed.id == Article.mp_id).filter(Article.id == article_id).first()
+        except Exception as e:
+            print_error(f"Failed to load article content: {e}")
+            return None
+        if row is None or not row.content:
+            return None
+        return {"id": row.id, "title": row.title, "content": row.content, "publish_time": row.publish_time,
+                "mp_id": row.mp_id, "pic_url": row.pic_url, "mp_name": row.mp_name}
+
+    def get_article_content(self, article_id: str) -> Optional[str]:
+        """按需加载单篇文章正文"""
+        return self.get_article_contents([article_id]).get(article_id)
+
     def get_articles(self, id:str=None, limit:int=30, offset:int=0) -> List[Article]:
         try:
             data = self.get_session().query(Article).limit(limit).offset(offset)
@@ -200,6 +885,7 @@ class Db:
         if self.Session is None:
             _session()
         
+        self.metrics["sessions"]+=1
         session = self.Session()
         # session.expire_all()
         # session.expire_on_commit = True  # 确保每次提交后对象过期
@@ -209,18 +895,52 @@ class Db:
             print_info(f"[{self.tag}] Session is already closed.")
             _session()
             return self.Session()
-        # 检查数据库连接是否已断开
-        try:
-            from core.models import User
-            # 尝试执行一个简单的查询来检查连接状态
-            session.query(User.id).count()
-        except Exception as e:
-            from core.print import print_warning
-            print_warning(f"[{self.tag}] Database connection lost: {e}. Reconnecting...")
-            self.init(self.connection_str)
+        # 连接可用性由连接池pre-ping与后台探活保证，这里只在探活失败后尝试重连
+        if not self.health.healthy and self.health.reconnect():
             _session()
             return self.Session()
         return session
+    def get_read_session(self):
+        """获取只读会话
+
+        轮询选择健康且复制延迟不超过 db_replica.max_lag 的只读副本，
+        没有配置副本或副本均不可用时回退到主库会话。
+        只能用于不要求读到刚写入数据的查询（RSS、页面、导出、统计）。
+        """
+        self.metrics["read_sessions"]+=1
+        replica=self._pick_replica()
+        if replica is not None:
+            return replica.Session()
+        return self.get_session()
+    def open_read_session(self):
+        """创建独立的只读会话（不使用线程内共享的scoped_session）
+
+        用于流式输出等会在其他线程继续读取数据的场景，使用方负责关闭
+        """
+        self.metrics["read_sessions"]+=1
+        replica=self._pick_replica()
+        if replica is not None:
+            return replica.factory()
+        return self.session_factory()
+    def _pick_replica(self) -> Optional[Replica]:
+        """轮询选择可用的只读副本，没有可用副本时返回None"""
+        if not self.replicas:
+            return None
+        for _ in range(len(self.replicas)):
+            replica=self.replicas[self._replica_index % len(self.replicas)]
+            self._replica_index+=1
+            if replica.usable(self.max_lag):
+                return replica
+        self.read_fallbacks+=1
+        return None
+    def get_health(self) -> dict:
+        """获取连接健康统计信息"""
+        stats=self.health.stats()
+        stats["pool"]=ENGINES.stats()
+        if self.replicas:
+            stats["replicas"]=[replica.health.stats() for replica in self.replicas]
+            stats["read_fallbacks"]=self.read_fallbacks
+        return stats
     def auto_refresh(self):
         # 定义一个事件监听器，在对象更新后自动刷新
         def receive_after_update(mapper, connection, target):
@@ -238,5 +958,4 @@ class Db:
             session.remove()
 
 # 全局数据库实例
-DB = Db(User_In_Thread=True)
-DB.init(cfg.get("db"))
\ No newline at end of file
+DB = Db(User_In_Thread=True)
\ No newline at end of file
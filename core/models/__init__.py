@@ -10,5 +10,12 @@ from .message_task import MessageTask
 from .config_management import ConfigManagement
 # 导入Access Key模型
 from .access_key import AccessKey
+# 导入文章计数模型
+from .article_count import ArticleCount
+# 导入标签及标签-公众号关联模型
+from .tags import Tags
+from .tag_feed import TagFeed
+# 导入WebSub订阅者模型
+from .websub import WebSubSubscription
 # 导入基础模型
 from .base import *
\ No newline at end of file
@@ -1,7 +1,15 @@
 from  .base import Base,Column,String,Integer,DateTime,Text,DATA_STATUS
+from sqlalchemy import Index,event,inspect
+from sqlalchemy.orm import deferred
 class ArticleBase(Base):
     from_attributes = True
     __tablename__ = 'articles'
+    __table_args__ = (
+        # 按公众号/状态筛选并按发布时间排序（公众号RSS、文章列表）
+        Index("ix_articles_mp_status_time", "mp_id", "status", "publish_time"),
+        # 按状态筛选并按发布时间排序（全部RSS、标签RSS）
+        Index("ix_articles_status_time", "status", "publish_time"),
+    )
     id = Column(String(255), primary_key=True)
     mp_id = Column(String(255))
     title = Column(String(1000))
@@ -14,19 +22,25 @@ class ArticleBase(Base):
     updated_at = Column(DateTime)  
     is_export = Column(Integer)
     is_read = Column(Integer, default=0)
+    # 是否已有正文（1有 0无），避免在大表上做 content IS NULL 扫描
+    has_content = Column(Integer, default=0, index=True)
 class Article(ArticleBase):
-    content = Column(Text)
+    # 正文体积大，默认延迟加载；需要时使用 undefer(Article.content) 或 Db.get_article_contents
+    content = deferred(Column(Text))
     
-    def to_dict(self):
-        """将Article对象转换为字典"""
-        return {
+    def to_dict(self, include_content: bool = None):
+        """将Article对象转换为字典
+
+        Args:
+            include_content: None时只在正文已加载时输出content，列表逐条转换不会逐条查询正文；True时按需加载正文
+        """
+        data = {
             'id': self.id,
             'mp_id': self.mp_id,
             'title': self.title,
             'pic_url': self.pic_url,
             'url': self.url,
             'description': self.description,
-            'content': self.content,
             'status': self.status,
             'publish_time': self.publish_time,
             'created_at': self.created_at.isoformat() if self.created_at else None,
@@ -34,3 +48,11 @@ class Article(ArticleBase):
             'is_export': self.is_export,
             'is_read': self.is_read
         }
+        if include_content or (include_content is None and 'content' not in inspect(self).unloaded):
+            data['content'] = self.content
+        return data
+
+@event.listens_for(Article.content, "set")
+def _sync_has_content(target, value, oldvalue, initiator):
+    """写入正文时同步 has_content 标记"""
+    target.has_content = 1 if value else 0
@@ -0,0 +1,10 @@
+from  .base import Base,Column,String,Integer,DateTime
+class ArticleCount(Base):
+    #公众号文章计数（status=1的文章数），文章写入/删除时增量维护，列表页直接读取，避免每次COUNT(*)
+    __tablename__ = 'article_counts'
+    # 公众号ID，主键
+    mp_id = Column(String(255), primary_key=True)
+    # 有效文章数量
+    count = Column(Integer, default=0)
+    # 最后一次更新时间
+    updated_at = Column(DateTime)
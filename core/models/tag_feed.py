@@ -0,0 +1,44 @@
+from  .base import Base,Column,String,DateTime
+from .tags import Tags
+from sqlalchemy import event, inspect, delete, insert
+import json
+class TagFeed(Base):
+    #标签与公众号的关联表，由 Tags.mps_id 自动同步，供标签订阅按索引联表查询
+    __tablename__ = 'tag_feeds'
+    # 标签ID
+    tag_id = Column(String(255), primary_key=True)
+    # 公众号ID（单独建索引，便于按公众号反查所属标签）
+    mp_id = Column(String(255), primary_key=True, index=True)
+    # 记录创建时间
+    created_at = Column(DateTime)
+
+def parse_mps_id(mps_id) -> list:
+    """解析 Tags.mps_id 中的公众号ID列表（JSON格式: [{"id": ..}, ..]）"""
+    try:
+        mps_data = json.loads(mps_id) if mps_id else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(mps_data, list):
+        return []
+    return list(dict.fromkeys(str(mp['id']) for mp in mps_data if isinstance(mp, dict) and mp.get('id')))
+
+def _write_tag_feeds(connection, tag_id, mps_id):
+    from datetime import datetime
+    connection.execute(delete(TagFeed.__table__).where(TagFeed.__table__.c.tag_id == tag_id))
+    rows = [{"tag_id": tag_id, "mp_id": mp_id, "created_at": datetime.now()} for mp_id in parse_mps_id(mps_id)]
+    if rows:
+        connection.execute(insert(TagFeed.__table__), rows)
+
+# 标签写入/更新/删除时在同一事务内同步关联表
+@event.listens_for(Tags, "after_insert")
+def _tag_inserted(mapper, connection, target):
+    _write_tag_feeds(connection, target.id, target.mps_id)
+
+@event.listens_for(Tags, "after_update")
+def _tag_updated(mapper, connection, target):
+    if inspect(target).attrs.mps_id.history.has_changes():
+        _write_tag_feeds(connection, target.id, target.mps_id)
+
+@event.listens_for(Tags, "after_delete")
+def _tag_deleted(mapper, connection, target):
+    connection.execute(delete(TagFeed.__table__).where(TagFeed.__table__.c.tag_id == target.id))
@@ -0,0 +1,22 @@
+from .base import Base, Column, String, DateTime, Integer
+from datetime import datetime
+
+class WebSubSubscription(Base):
+    """WebSub 订阅者，订阅源有新文章时由内置Hub推送内容"""
+    __tablename__ = 'websub_subscriptions'
+
+    id = Column(String(32), primary_key=True)  # md5(topic + callback)
+    topic = Column(String(1024), nullable=False)  # 订阅的订阅源地址
+    callback = Column(String(1024), nullable=False)  # 订阅者回调地址
+    secret = Column(String(200), nullable=True)  # 推送签名密钥 (X-Hub-Signature)
+    lease_seconds = Column(Integer, default=0)  # 订阅有效期 单位秒
+    expires_at = Column(DateTime, nullable=True)  # 过期时间
+    delivered = Column(Integer, default=0)  # 累计推送成功次数
+    failures = Column(Integer, default=0)  # 连续推送失败次数
+    last_delivered_at = Column(DateTime, nullable=True)  # 最后推送成功时间
+    created_at = Column(DateTime, default=datetime.now)  # 创建时间
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # 更新时间
+
+    def is_expired(self) -> bool:
+        """检查订阅是否已过期"""
+        return self.expires_at is not None and datetime.now() > self.expires_at
@@ -0,0 +1,59 @@
+import base64
+import json
+from typing import Optional, Tuple
+from sqlalchemy import and_, or_
+from core.models.article import Article
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误"""
+
+
+def encode_cursor(publish_time: int, article_id: str) -> str:
+    """将 (publish_time, id) 编码为不透明的游标字符串"""
+    raw = json.dumps([int(publish_time or 0), str(article_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[int, str]]:
+    """解析游标，空值返回None，格式错误抛出InvalidCursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        publish_time, article_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(publish_time), str(article_id)
+    except Exception:
+        raise InvalidCursor(f"无效的分页游标: {cursor}")
+
+
+def apply_cursor(query, cursor: Optional[Tuple[int, str]], desc: bool = True):
+    """按 (publish_time, id) 排序并从游标位置之后开始取数据"""
+    if desc:
+        query = query.order_by(Article.publish_time.desc(), Article.id.desc())
+    else:
+        query = query.order_by(Article.publish_time.asc(), Article.id.asc())
+    if cursor is None:
+        return query
+    publish_time, article_id = cursor
+    if desc:
+        return query.filter(or_(Article.publish_time < publish_time,
+                                and_(Article.publish_time == publish_time, Article.id < article_id)))
+    return query.filter(or_(Article.publish_time > publish_time,
+                            and_(Article.publish_time == publish_time, Article.id > article_id)))
+
+
+def fetch_page(query, limit: int, article_of=lambda row: row):
+    """多取一条判断是否还有下一页，返回 (当前页数据, 下一页游标)
+
+    Args:
+        query: 已通过 apply_cursor 排序的查询
+        limit: 每页数量
+        article_of: 从查询结果行中取出Article对象的函数（联表查询时使用）
+    """
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = article_of(rows[-1])
+    return rows, encode_cursor(last.publish_time, last.id)
@@ -0,0 +1,241 @@
+import os
+import json
+import atexit
+import time
+import threading
+from typing import Callable, List, Optional
+from core.config import cfg
+from core.queue import TaskQueueManager
+from core.print import print_error, print_info, print_warning
+
+
+class FeedAccessLog:
+    """订阅源访问频率记录
+
+    按 (路径, 公众号ID, 标签ID, 格式, 条数, 内容类型, 域名) 记录首页请求次数，
+    计数按半衰期衰减，长期无人访问的变体自然降温；超过容量时淘汰得分最低的记录。
+    各工作进程先在本进程累计，每隔 flush_interval 秒合并到共享缓存后端（prerender 命名空间），
+    运行采集任务的进程读取合并后的记录决定预生成哪些变体；多个进程同时合并时可能丢失少量计数，只影响排序
+    """
+    def __init__(self, max_entries: int = 1000, half_life: float = 24 * 3600, backend=None, flush_interval: float = 60):
+        self.max_entries = max_entries
+        self.half_life = half_life
+        self.flush_interval = flush_interval
+        self._backend = backend
+        self._items = {}
+        # 上次合并后本进程新增的访问次数
+        self._pending = {}
+        # 首次访问立即合并，之后按间隔合并
+        self._flushed = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from core.cache_backend import create_backend
+            self._backend = create_backend("prerender", os.path.normpath("data/cache/prerender"))
+        return self._backend
+
+    def _score(self, count: float, last: float, now: float) -> float:
+        return count * 0.5 ** ((now - last) / self.half_life)
+
+    def record(self, variant: tuple) -> None:
+        now = time.time()
+        with self._lock:
+            self._pending[variant] = self._pending.get(variant, 0) + 1
+            due = now - self._flushed >= self.flush_interval
+        if due:
+            self.sync()
+
+    def _load(self) -> dict:
+        item = self.backend.get("access")
+        if item is None:
+            return {}
+        return {tuple(variant): (count, last) for variant, count, last in json.loads(item[1].decode("utf-8"))}
+
+    def sync(self) -> None:
+        """把本进程新增的访问次数合并到共享后端，并取回所有进程合并后的记录"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.time()
+            local = dict(self._items)
+        now = time.time()
+        try:
+            items, shared = self._load(), True
+        except Exception as e:
+            # 共享后端不可用时只使用本进程的记录
+            print_warning(f"读取订阅源访问记录失败: {e}")
+            items, shared = local, False
+        for variant, hits in pending.items():
+            count, last = items.get(variant, (0.0, now))
+            items[variant] = (self._score(count, last, now) + hits, now)
+        if len(items) > self.max_entries:
+            hottest = sorted(items, key=lambda key: self._score(*items[key], now), reverse=True)[:self.max_entries]
+            items = {variant: items[variant] for variant in hottest}
+        if pending and shared:
+            try:
+                self.backend.set("access", json.dumps([[list(variant), count, last]
+                                                       for variant, (count, last) in items.items()]).encode("utf-8"))
+            except Exception as e:
+                print_warning(f"保存订阅源访问记录失败: {e}")
+        with self._lock:
+            self._items = items
+
+    def hot(self, match: Callable[[tuple], bool], limit: int, min_hits: float) -> List[tuple]:
+        """返回满足条件且得分不低于 min_hits 的变体，按得分从高到低取前 limit 个"""
+        self.sync()
+        now = time.time()
+        with self._lock:
+            scored = [(self._score(count, last, now), variant) for variant, (count, last) in self._items.items()]
+        scored = [(score, variant) for score, variant in scored if score >= min_hits and match(variant)]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [variant for _, variant in scored[:limit]]
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            top = sorted(((self._score(count, last, now), variant) for variant, (count, last) in self._items.items()),
+                         reverse=True)[:10]
+            pending = sum(self._pending.values())
+        return {"variants": len(self._items), "pending_hits": pending,
+                "top": [{"path": variant[0], "score": round(score, 2)} for score, variant in top]}
+
+
+class FeedPrerenderer:
+    """采集完成后在后台预先生成热门订阅源
+
+    变体列表来自访问频率记录：该公众号、全部文章源以及包含该公众号的标签中访问较多的格式和条数。
+    使用单独的队列线程逐个生成，每个变体之间暂停 interval 秒，并尽量降低线程调度优先级，
+    不与读者请求争用资源；同一公众号排队期间重复触发只生成一次。
+    预生成只在运行采集任务的进程中进行（由采集结束时 schedule 触发），访问记录和订阅源版本号都取自共享后端，
+    生成的缓存文件带有版本记录，各工作进程直接使用。
+    读者拿到过期缓存时由 refresh 在该工作进程的另一个队列中立即重新生成该变体
+    """
+    def __init__(self):
+        self.enabled = str(cfg.get("rss.prerender.enabled", True)).lower() not in ("false", "0", "")
+        self.max_variants = int(cfg.get("rss.prerender.max_variants", 20) or 20)
+        self.min_hits = float(cfg.get("rss.prerender.min_hits", 2) or 0)
+        self.interval = float(cfg.get("rss.prerender.interval", 1) or 0)
+        self.access_log = FeedAccessLog(flush_interval=float(cfg.get("rss.prerender.sync_interval", 60) or 0))
+        # 进程退出前合并尚未同步的访问次数
+        atexit.register(self.access_log.sync)
+        self.renderer: Optional[Callable[[tuple], None]] = None
+        self.rendered = 0
+        self.refreshed = 0
+        self.failed = 0
+        self._pending = set()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._queue = None
+        self._refresh_queue = None
+
+    def set_renderer(self, renderer: Callable[[tuple], None]) -> None:
+        """注册变体生成函数（由apis/rss提供，按访问记录重放订阅源请求）"""
+        self.renderer = renderer
+
+    def record(self, variant: tuple) -> None:
+        if self.enabled:
+            self.access_log.record(variant)
+
+    def _ensure_renderer(self) -> None:
+        # 多工作进程部署时采集任务在主进程运行，主进程不加载web应用，需要在这里注册生成函数
+        if self.renderer is None:
+            try:
+                import apis.rss  # noqa: F401  导入时注册生成函数
+            except Exception as e:
+                print_warning(f"加载订阅源生成函数失败: {e}")
+
+    def schedule(self, mp_id: str) -> None:
+        """公众号采集完成后排队预生成其热门订阅源"""
+        if not self.enabled or not mp_id:
+            return
+        self._ensure_renderer()
+        if self.renderer is None:
+            return
+        with self._lock:
+            if mp_id in self._pending:
+                return
+            self._pending.add(mp_id)
+            if self._queue is None:
+                self._queue = TaskQueueManager(tag="订阅源预生成")
+                self._queue.run_task_background()
+        self._queue.add_task(self._run, mp_id)
+
+    def refresh(self, variant: tuple) -> bool:
+        """排队重新生成单个变体，同一变体排队期间只生成一次；未注册生成函数时返回False"""
+        if self.renderer is None:
+            return False
+        with self._lock:
+            if variant in self._refreshing:
+                return True
+            self._refreshing.add(variant)
+            if self._refresh_queue is None:
+                self._refresh_queue = TaskQueueManager(tag="订阅源刷新")
+                self._refresh_queue.run_task_background()
+        self._refresh_queue.add_task(self._refresh, variant)
+        return True
+
+    def _refresh(self, variant: tuple) -> None:
+        try:
+            self.renderer(variant)
+            self.refreshed += 1
+        except Exception as e:
+            self.failed += 1
+            print_error(f"刷新订阅源失败 {variant[0]}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(variant)
+
+    def _tag_ids(self, mp_id: str) -> set:
+        from core.db import DB
+        from core.models.tag_feed import TagFeed
+        session = DB.get_read_session()
+        return {row[0] for row in session.query(TagFeed.tag_id).filter(TagFeed.mp_id == mp_id).all()}
+
+    def variants(self, mp_id: str) -> List[tuple]:
+        """该公众号相关的热门变体：公众号本身、全部文章源、所属标签"""
+        tag_ids = self._tag_ids(mp_id)
+        def match(variant):
+            _, feed_id, tag_id = variant[:3]
+            if feed_id == mp_id:
+                return True
+            if feed_id in ("all", None):
+                return tag_id is None or tag_id in tag_ids
+            return False
+        return self.access_log.hot(match, self.max_variants, self.min_hits)
+
+    def _lower_priority(self) -> None:
+        # Linux下线程即调度实体，可以单独调低当前线程的优先级
+        try:
+            if hasattr(os, "setpriority") and hasattr(threading, "get_native_id"):
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except OSError:
+            pass
+
+    def _run(self, mp_id: str) -> None:
+        with self._lock:
+            self._pending.discard(mp_id)
+        self._lower_priority()
+        variants = self.variants(mp_id)
+        if not variants:
+            return
+        print_info(f"预生成订阅源[{mp_id}] {len(variants)}个")
+        for variant in variants:
+            try:
+                self.renderer(variant)
+                self.rendered += 1
+            except Exception as e:
+                self.failed += 1
+                print_error(f"预生成订阅源失败 {variant[0]}: {e}")
+            if self.interval:
+                time.sleep(self.interval)
+
+    def stats(self) -> dict:
+        stats = self.access_log.stats()
+        stats.update({"enabled": self.enabled, "rendered": self.rendered, "refreshed": self.refreshed,
+                      "failed": self.failed, "pending": len(self._pending), "refreshing": len(self._refreshing)})
+        return stats
+
+
+# 订阅源预生成器（访问记录保存在共享后端）
+PRERENDER = FeedPrerenderer()
@@ -2,7 +2,446 @@ import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, timezone
 import os
 import json
+import gzip
+import asyncio
+import time
+import hashlib
+import textwrap
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from core.content_format import format_content
+from core.content_store import CONTENTS
+try:
+    import fcntl
+except ImportError:  # Windows 下只做进程内加锁
+    fcntl = None
+
+# 订阅源统一使用北京时间，时区对象和星期、月份名称只创建一次
+CST = timezone(timedelta(hours=8))
+_CST_OFFSET = 8 * 3600
+_DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTH_NAMES = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+# 一天内的 "HH:MM" 共1440个，秒数单独拼接
+_HOUR_MINUTES = tuple(f"{h:02d}:{m:02d}" for h in range(24) for m in range(60))
+_SECONDS = tuple(f"{s:02d}" for s in range(60))
+_DAY_CACHE = {}
+
+def _day_prefix(day: int) -> tuple:
+    """按天缓存日期部分 (RFC 822 前缀, ISO 前缀)，同一天的条目只计算一次"""
+    prefix = _DAY_CACHE.get(day)
+    if prefix is None:
+        d = datetime(1970, 1, 1) + timedelta(days=day)
+        prefix = (f"{_DAY_NAMES[d.weekday()]}, {d.day:02d} {_MONTH_NAMES[d.month]} {d.year} ",
+                  f"{d.year:04d}-{d.month:02d}-{d.day:02d}T")
+        if len(_DAY_CACHE) > 100000:
+            _DAY_CACHE.clear()
+        _DAY_CACHE[day] = prefix
+    return prefix
+
+def format_rfc822(timestamp: int) -> str:
+    """整数时间戳转北京时间的RFC 822字符串，与 datetime.strftime('%a, %d %b %Y %H:%M:%S %z') 结果一致"""
+    day, seconds = divmod(int(timestamp) + _CST_OFFSET, 86400)
+    minutes, second = divmod(seconds, 60)
+    return f"{_day_prefix(day)[0]}{_HOUR_MINUTES[minutes]}:{_SECONDS[second]} +0800"
+
+def format_iso(timestamp: int) -> str:
+    """整数时间戳转北京时间的ISO 8601字符串，与 datetime.isoformat() 结果一致"""
+    day, seconds = divmod(int(timestamp) + _CST_OFFSET, 86400)
+    minutes, second = divmod(seconds, 60)
+    return f"{_day_prefix(day)[1]}{_HOUR_MINUTES[minutes]}:{_SECONDS[second]}+08:00"
+
+def format_dates(timestamps, fmt=format_rfc822) -> list:
+    """批量格式化时间戳"""
+    return [fmt(timestamp) for timestamp in timestamps]
+
+class FragmentCache:
+    """订阅条目片段缓存
+
+    文章采集后基本不再变化，序列化后的 <item>/<entry>/JSON 对象按
+    (文章ID, 格式, 内容类型, 配置开关, 条目摘要) 缓存在进程内，按字节数做LRU淘汰
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.max_bytes <= 0:
+            return None
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value: str):
+        size = len(value)
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += size
+            while self.size > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "size": self.size,
+            "max_size": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def _fragment_cache_size() -> int:
+    from core.config import cfg
+    return int(cfg.get("rss.fragment_cache_mb", 64) or 0) * 1024 * 1024
+
+# 进程内共享的条目片段缓存
+FRAGMENTS = FragmentCache(_fragment_cache_size())
+
+class FeedValidators:
+    """订阅源条件请求校验值缓存
+
+    记录每个订阅源最近一次生成时的 (ETag, Last-Modified) 及订阅源版本号，
+    版本未变化且未超过 max_age 秒时，客户端带着相同的校验值轮询可以不查询数据库直接返回304。
+    版本号每次请求从共享后端读取（见 FeedVersions），其他进程写入文章后本进程的校验值随即失效；
+    校验值同时写入共享后端，其他进程生成过的订阅源本进程也能直接返回304
+    """
+    def __init__(self, max_age: int, max_entries: int = 4096, backend=None):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._backend = backend
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = FEED_VERSIONS.backend
+        return self._backend
+
+    @staticmethod
+    def _name(key) -> str:
+        return "e_" + hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+
+    def _remember(self, key, etag: str, last_modified: int, version: str, expires: float):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (etag, last_modified, version, expires)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def get(self, key, version: str = "0"):
+        if self.max_age <= 0:
+            return None
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                etag, last_modified, cached_version, expires = value
+                if cached_version == version and expires >= time.monotonic():
+                    return etag, last_modified
+                self._items.pop(key, None)
+        try:
+            item = self.backend.get(self._name(key))
+        except Exception:
+            return None
+        if item is None:
+            return None
+        created, raw = item
+        try:
+            etag, last_modified, cached_version = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return None
+        remaining = self.max_age - (time.time() - created)
+        if cached_version != version or remaining <= 0:
+            return None
+        self._remember(key, etag, last_modified, version, time.monotonic() + remaining)
+        return etag, last_modified
+
+    def set(self, key, etag: str, last_modified: int, version: str = "0"):
+        if self.max_age <= 0:
+            return
+        self._remember(key, etag, last_modified, version, time.monotonic() + self.max_age)
+        try:
+            self.backend.set(self._name(key), json.dumps([etag, last_modified, version]).encode("utf-8"))
+        except Exception as e:
+            from core.print import print_warning
+            print_warning(f"保存订阅源校验值失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+def feed_validators(rows, *flags):
+    """根据条目 (id, publish_time, updated_at, has_content) 和格式开关计算 (ETag, Last-Modified)
+
+    Last-Modified 取最新的发布/更新时间戳，ETag 为弱校验值
+    """
+    digest = hashlib.sha1(repr(flags).encode("utf-8"))
+    last_modified = 0
+    for article_id, publish_time, updated_at, has_content in rows:
+        updated = int(updated_at.timestamp()) if isinstance(updated_at, datetime) else 0
+        last_modified = max(last_modified, int(publish_time or 0), updated)
+        digest.update(f"{article_id}:{publish_time}:{updated}:{has_content};".encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:32]}"', last_modified
+
+def _feed_max_age() -> int:
+    from core.config import cfg
+    return int(cfg.get("rss.cache_max_age", 300) or 0)
+
+# 订阅源校验值（进程内缓存，同时保存在共享后端）
+VALIDATORS = FeedValidators(_feed_max_age())
+
+_ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+def _precompress_encodings() -> tuple:
+    """需要预压缩的编码（rss.precompress），未安装brotli时跳过br"""
+    from core.config import cfg
+    encodings = []
+    for encoding in str(cfg.get("rss.precompress", "gzip,br") or "").split(","):
+        encoding = encoding.strip().lower()
+        if encoding == "br" and _brotli() is None:
+            continue
+        if encoding in _ENCODING_SUFFIX and encoding not in encodings:
+            encodings.append(encoding)
+    return tuple(encodings)
+
+PRECOMPRESS = _precompress_encodings()
+
+def _compress_file(path: str, encoding: str) -> str:
+    """将缓存文件压缩为 {path}.{后缀}，返回压缩后的文件路径"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if encoding == "br":
+        data = _brotli().compress(data, quality=9)
+    else:
+        data = gzip.compress(data, compresslevel=9)
+    target = f"{path}{_ENCODING_SUFFIX[encoding]}"
+    with open(target, "wb") as f:
+        f.write(data)
+    return target
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """解析Accept-Encoding，返回客户端接受的编码（q=0的除外）"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+class FeedVersions:
+    """订阅源版本号
+
+    每个公众号、标签以及全部文章源各有一个版本号，文章、公众号、标签经 Db 写入并提交后更新。
+    版本号保存在共享缓存后端（cache.backend 的 feeds 命名空间），多个工作进程和采集进程看到同一个版本；
+    版本号为 "{更新时间}-{随机值}"，只比较是否相等，不需要原子递增。
+    缓存文件旁的 {文件}.ver 记录生成时的版本号、预压缩编码和校验值，版本一致才视为有效，
+    任一进程生成的缓存其他进程都能直接使用，失效时只需更新版本号，不用扫描缓存目录。
+    正在生成的缓存文件在共享后端登记租约，所有进程中同一文件同时只由一个请求生成，其他请求等待后直接读取
+    """
+    ALL = ("all",)
+    INITIAL = "0"
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        # 共享后端不可用时退回进程内版本号
+        self._local = {}
+        self.generating = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from core.cache_backend import create_backend
+            self._backend = create_backend("feeds", os.path.normpath("data/cache/feeds"))
+        return self._backend
+
+    @staticmethod
+    def key(feed_id: str = None, tag_id: str = None) -> tuple:
+        """订阅源对应的版本键"""
+        if feed_id not in ("all", None):
+            return ("feed", feed_id)
+        if tag_id is not None:
+            return ("tag", tag_id)
+        return FeedVersions.ALL
+
+    @staticmethod
+    def _name(key: tuple) -> str:
+        # 公众号ID、标签ID可能含有不能作为文件名的字符
+        return "v_" + hashlib.md5(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: tuple) -> str:
+        try:
+            item = self.backend.get(self._name(key))
+        except Exception as e:
+            from core.print import print_warning
+            print_warning(f"读取订阅源版本号失败: {e}")
+            return self._local.get(key, self.INITIAL)
+        return item[1].decode("utf-8") if item else self.INITIAL
+
+    def bump(self, keys) -> None:
+        version = f"{time.time():.6f}-{os.urandom(4).hex()}"
+        with self._lock:
+            for key in keys:
+                self._local[key] = version
+        for key in keys:
+            try:
+                self.backend.set(self._name(key), version.encode("utf-8"))
+            except Exception as e:
+                from core.print import print_warning
+                print_warning(f"更新订阅源版本号失败: {e}")
+
+    @staticmethod
+    def _meta_path(rss_file: str) -> str:
+        return f"{rss_file}.ver"
+
+    @staticmethod
+    def _updated(version) -> float:
+        """版本号中的更新时间，用于判断两个版本的先后"""
+        try:
+            return float(str(version).partition("-")[0])
+        except ValueError:
+            return 0.0
+
+    def meta(self, rss_file: str):
+        """缓存文件的版本记录 {"version", "encodings", "etag", "last_modified"}，没有记录时返回None"""
+        try:
+            with open(self._meta_path(rss_file), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _publish_lock(self, rss_file: str):
+        """替换缓存文件时的跨进程锁（仅POSIX），避免两个进程交替替换内容和版本记录导致错位"""
+        with self._lock, open(os.path.join(os.path.dirname(rss_file) or ".", ".publish.lock"), "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def publish(self, rss_file: str, tmp_file: str, version: str, variants: dict = None, validator: tuple = None) -> None:
+        """替换缓存文件（及预压缩文件）并写入版本记录
+
+        先替换内容再写版本记录，读到新版本号时内容一定已是新的；
+        已有更新版本的缓存时放弃替换，开始得早、结束得晚的旧版本不会覆盖新内容
+
+        Args:
+            variants: {编码: 临时文件}，与缓存文件一起替换为 {rss_file}.{后缀}
+            validator: 生成内容的 (ETag, Last-Modified)，进程内校验值过期后返回缓存文件时使用
+        """
+        variants = variants or {}
+        with self._publish_lock(rss_file):
+            current = self.meta(rss_file)
+            if current is not None and self._updated(current.get("version")) > self._updated(version):
+                return
+            for encoding, variant_tmp in variants.items():
+                os.replace(variant_tmp, f"{rss_file}{_ENCODING_SUFFIX[encoding]}")
+            os.replace(tmp_file, rss_file)
+            meta_path = self._meta_path(rss_file)
+            meta_tmp = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(meta_tmp, "w", encoding="utf-8") as f:
+                meta = {"version": version, "encodings": list(variants)}
+                if validator is not None:
+                    meta["etag"], meta["last_modified"] = validator
+                json.dump(meta, f)
+            os.replace(meta_tmp, meta_path)
+
+    def cached(self, rss_file: str):
+        """缓存文件生成时的版本号，没有版本记录时返回None"""
+        meta = self.meta(rss_file)
+        return meta.get("version") if meta else None
+
+    def stale_age(self, rss_file: str, version: str):
+        """缓存文件落后于当前版本的时间（秒，从当前版本号更新时算起，各进程一致），没有旧缓存或缓存仍是最新时返回None"""
+        cached = self.cached(rss_file)
+        if cached is None or cached == version:
+            return None
+        return max(0.0, time.time() - self._updated(version))
+
+    @staticmethod
+    def _flight_name(rss_file: str) -> str:
+        return "g_" + hashlib.md5(rss_file.encode("utf-8")).hexdigest()
+
+    def begin(self, rss_file: str, timeout: float):
+        """登记生成缓存文件
+
+        Returns:
+            租约令牌；其他进程或请求正在生成时返回None。共享后端不可用时返回空字符串，各自生成。
+            超过 timeout 仍未结束的生成视为已中断，由其他请求接手
+        """
+        try:
+            token = self.backend.acquire(self._flight_name(rss_file), timeout)
+        except Exception as e:
+            from core.print import print_warning
+            print_warning(f"登记订阅源生成失败: {e}")
+            return ""
+        if token is not None:
+            with self._lock:
+                self.generating += 1
+        return token
+
+    def in_flight(self, rss_file: str) -> bool:
+        """是否有请求正在生成该缓存文件"""
+        try:
+            return self.backend.locked(self._flight_name(rss_file))
+        except Exception:
+            return False
+
+    def end(self, rss_file: str, token: str) -> None:
+        with self._lock:
+            self.generating -= 1
+        if not token:
+            return
+        try:
+            self.backend.release(self._flight_name(rss_file), token)
+        except Exception as e:
+            from core.print import print_warning
+            print_warning(f"结束订阅源生成登记失败: {e}")
+
+    def encodings(self, rss_file: str) -> tuple:
+        """缓存文件随当前版本一起生成的预压缩编码"""
+        meta = self.meta(rss_file)
+        return tuple(meta.get("encodings") or ()) if meta else ()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend.name, "generating": self.generating}
+
+# 订阅源版本号（保存在共享后端）
+FEED_VERSIONS = FeedVersions()
+
 class RSS:
     cache_dir = os.path.normpath("data/cache/rss")
     content_cache_dir = os.path.normpath("data/cache/content")
@@ -18,6 +457,10 @@ class RSS:
         if not normalized_path.startswith(self.cache_dir):
             raise ValueError("Invalid file path: Path traversal detected.")
         self.rss_file = normalized_path
+        self.version = None
+        self.validator = None
+        self._meta = None
+        self._flight = None
         pass
     def get_type(self):
         if self.ext in ["rss","atom","md","txt"]:
@@ -28,16 +471,30 @@ class RSS:
     
     def cache_content(self, content_id: str, content: dict):
         """缓存文章内容"""
-        content["content"]=self.add_logo_prefix_to_urls(content["content"])
-        content_path = os.path.normpath(f"{self.content_cache_dir}/{content_id}.json")
-        if not content_path.startswith(self.content_cache_dir):
-            raise ValueError("Invalid content path: Path traversal detected.")
-        
-        with open(content_path, "w", encoding="utf-8") as f:
-            json.dump(content, f, ensure_ascii=False, indent=2)
+        self.cache_contents({content_id: content})
+
+    def cache_contents(self, contents: dict):
+        """批量缓存文章内容（文章入库时调用一次），图片地址在写入前统一加上代理前缀"""
+        for content in contents.values():
+            content["content"]=self.add_logo_prefix_to_urls(content.get("content") or "")
+        CONTENTS.put_many(contents)
+
+    def get_cached_parts(self, content_id: str):
+        """获取缓存的文章 (元数据, 正文字节)，兼容旧版本按文章写入的JSON文件"""
+        parts = CONTENTS.get_parts(content_id)
+        if parts is not None:
+            return parts
+        content = self.get_cached_content(content_id)
+        if content is None:
+            return None
+        body = content.pop("content", None) or ""
+        return content, body.encode("utf-8")
 
     def get_cached_content(self, content_id: str) -> dict:
-        """获取缓存的文章内容"""
+        """获取缓存的文章内容，兼容旧版本按文章写入的JSON文件"""
+        content = CONTENTS.get(content_id)
+        if content is not None:
+            return content
         content_path = os.path.normpath(f"{self.content_cache_dir}/{content_id}.json")
         if not content_path.startswith(self.content_cache_dir):
             raise ValueError("Invalid content path: Path traversal detected.")
@@ -75,11 +532,19 @@ class RSS:
 
         # If datetime is naive, attach CST (UTC+8)
         if dt_obj.tzinfo is None:
-            cst = timezone(timedelta(hours=8))
-            dt_obj = dt_obj.replace(tzinfo=cst)
+            dt_obj = dt_obj.replace(tzinfo=CST)
+        if dt_obj.utcoffset() == CST.utcoffset(None):
+            return format_rfc822(int(dt_obj.timestamp()))
 
         return dt_obj.strftime('%a, %d %b %Y %H:%M:%S %z')
     
+    def _item_rfc822(self, rss_item: dict) -> str:
+        """条目带整数 publish_time 时走快速格式化，否则按 updated 解析"""
+        publish_time = rss_item.get("publish_time")
+        if publish_time is not None:
+            return format_rfc822(publish_time)
+        return self.datetime_to_rfc822(rss_item["updated"])
+
     def add_logo_prefix_to_urls(self, text: str) -> str:
         """在字符串中所有http/https开头的图片URL前添加/static/res/logo/前缀
         
@@ -96,16 +561,114 @@ class RSS:
         except:
             return text
        
-    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
+    def _resolve_next(self, next_url):
+        """下一页链接可以是字符串，也可以是在全部条目输出后才求值的函数"""
+        return next_url() if callable(next_url) else next_url
+
+    def _write_through(self, chunks, items=None):
+        """边输出边写入缓存文件
+
+        先写临时文件，全部输出完成后再替换旧缓存；中途失败或客户端断开时不留下不完整的缓存
+        """
+        tmp_file = None
+        f = None
+        if self.rss_file is not None:
+            tmp_file = f"{self.rss_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            f = open(tmp_file, "w", encoding="utf-8", newline="")
+        try:
+            for chunk in chunks:
+                if f is not None:
+                    f.write(chunk)
+                yield chunk
+            if f is not None:
+                f.close()
+                f = None
+                # 输出完成后生成预压缩文件，与缓存文件一起替换
+                variants = {encoding: _compress_file(tmp_file, encoding) for encoding in PRECOMPRESS}
+                if self.version is None:
+                    for encoding, variant_tmp in variants.items():
+                        os.replace(variant_tmp, f"{self.rss_file}{_ENCODING_SUFFIX[encoding]}")
+                    os.replace(tmp_file, self.rss_file)
+                else:
+                    FEED_VERSIONS.publish(self.rss_file, tmp_file, self.version, variants, self.validator)
+        finally:
+            if f is not None:
+                f.close()
+            if tmp_file is not None:
+                for path in [tmp_file] + [f"{tmp_file}{suffix}" for suffix in _ENCODING_SUFFIX.values()]:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+            # 关闭上游的数据库游标生成器
+            if items is not None and hasattr(items, "close"):
+                items.close()
+
+    def _fragment(self, rss_item: dict, flags: tuple, render) -> str:
+        """读取或生成单个条目的序列化片段
+
+        除文章ID和格式开关外，键中还包含条目元数据及正文的摘要（blake2b），
+        正文修改或补全、公众号改名或链接域名变化后自动生成新片段
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((rss_item.get("title"), rss_item.get("link"), rss_item.get("description"),
+                            rss_item.get("image"), rss_item.get("mp_name"), rss_item.get("publish_time", str(rss_item.get("updated"))),
+                            rss_item.get("feed"))).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update((rss_item.get("content") or "").encode("utf-8"))
+        signature = digest.digest()
+        key = (rss_item.get("id"), flags, getattr(self, "content_type", None), signature)
+        text = FRAGMENTS.get(key)
+        if text is None:
+            text = render()
+            FRAGMENTS.set(key, text)
+        return text
+
+    def _rss_item(self, rss_item: dict, full_context: bool, add_cover: bool, cdata: bool) -> ET.Element:
+        item = ET.Element("item")
+        ET.SubElement(item, "id").text = rss_item["id"]
+        ET.SubElement(item, "title").text = rss_item["title"]
+        ET.SubElement(item, "description").text = rss_item["description"] 
+        ET.SubElement(item, "guid").text = rss_item["link"]
+        # 添加图片封面
+        if add_cover:
+            enclosure = ET.SubElement(item, "enclosure")
+            enclosure.set("url", rss_item["image"])
+            enclosure.set("length", "0")
+            enclosure.set("type", "image/jpeg")
+        if full_context==True:
+            try:
+                if cdata:
+                    content = f"<![CDATA[{str(rss_item['content'])}]]>"  # 使用CDATA包裹内容
+                else:
+                    content = str(rss_item['content'])
+                ET.SubElement(item, "content:encoded").text = content
+            except Exception as e:
+                print(f"Error adding content:encoded element: {e}")
+            pass
+        # ET.SubElement(item, "category").text = rss_item["category"]
+        # ET.SubElement(item, "author").text = rss_item["author"]
+        ET.SubElement(item, "link").text = rss_item["link"]
+        ET.SubElement(item, "pubDate").text = self._item_rfc822(rss_item)
+        return item
+
+    def stream_rss(self, rss_list, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str=""):
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url=None,
+                    hub_url:str=None,self_url:str=None):
+        """逐条生成RSS内容（生成器），rss_list 可以是惰性迭代的条目"""
         from core.config import cfg
         full_context=bool(cfg.get("rss.full_context",False))
+        add_cover=cfg.get("rss.add_cover",False)==True
+        cdata=cfg.get("rss.cdata",False)==True
         
         # 创建根元素(RSS标准)
         rss = ET.Element("rss", version="2.0")
         if full_context==True:
             rss.attrib["xmlns:content"] = "http://purl.org/rss/1.0/modules/content/"
+        # 下一页链接（游标分页）在全部条目之后输出；WebSub的hub/self链接同样使用atom:link
+        if next_url or hub_url:
+            rss.attrib["xmlns:atom"] = "http://www.w3.org/2005/Atom"
         channel=ET.SubElement(rss, "channel")
         # 设置渠道信息
         ET.SubElement(channel, "title").text = title
@@ -114,68 +677,91 @@ class RSS:
         ET.SubElement(channel, "language").text = language
         ET.SubElement(channel, "generator").text = "Mp-We-Rss"
         # Use timezone-aware now (CST/UTC+8) so %z shows +0800
-        ET.SubElement(channel, "lastBuildDate").text = datetime.now(timezone(timedelta(hours=8))).strftime("%a, %d %b %Y %H:%M:%S %z")
+        ET.SubElement(channel, "lastBuildDate").text = format_rfc822(time.time())
+        if hub_url:
+            ET.SubElement(channel, "atom:link", rel="hub", href=hub_url)
+            if self_url:
+                ET.SubElement(channel, "atom:link", rel="self", href=self_url, type="application/rss+xml")
     
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
+        if add_cover and image_url != "":
             image = ET.SubElement(channel, "image")
             ET.SubElement(image, "url").text = image_url
             ET.SubElement(image, "title").text = title
             ET.SubElement(image, "link").text = link
 
+        footer = "</channel></rss>"
+        head = ET.tostring(rss, encoding="unicode", method="xml", short_empty_elements=False)
+        yield '<?xml version="1.0" encoding="utf-8"?>\r\n' + head[:-len(footer)]
+        flags = ("rss", full_context, add_cover, cdata)
         for rss_item in rss_list:
-            item = ET.SubElement(channel, "item")
-            ET.SubElement(item, "id").text = rss_item["id"]
-            ET.SubElement(item, "title").text = rss_item["title"]
-            ET.SubElement(item, "description").text = rss_item["description"] 
-            ET.SubElement(item, "guid").text = rss_item["link"]
-            # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(item, "enclosure")
-                enclosure.set("url", rss_item["image"])
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
-            if full_context==True:
-                try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{str(rss_item['content'])}]]>"  # 使用CDATA包裹内容
-                    else:
-                        content = str(rss_item['content'])
-                    ET.SubElement(item, "content:encoded").text = content
-                except Exception as e:
-                    print(f"Error adding content:encoded element: {e}")
-                pass
-            # ET.SubElement(item, "category").text = rss_item["category"]
-            # ET.SubElement(item, "author").text = rss_item["author"]
-            ET.SubElement(item, "link").text = rss_item["link"]
-            ET.SubElement(item, "pubDate").text = self.datetime_to_rfc822(str(rss_item["updated"]))
-
-        # 生成XML字符串(添加声明和美化输出)
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                ET.tostring(rss, encoding="utf-8", method="xml", short_empty_elements=False).decode("utf-8")
+            yield self._fragment(rss_item, flags, lambda: ET.tostring(self._rss_item(rss_item, full_context, add_cover, cdata),
+                                                                     encoding="unicode", method="xml", short_empty_elements=False))
+        next_url = self._resolve_next(next_url)
+        if next_url:
+            yield ET.tostring(ET.Element("atom:link", rel="next", href=next_url), encoding="unicode", method="xml", short_empty_elements=False)
+        yield footer
+
+    def generate_rss(self,rss_list: dict, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url:str=None,
+                    hub_url:str=None,self_url:str=None):
+        return "".join(self._write_through(self.stream_rss(rss_list, title=title, link=link, description=description,language=language,image_url=image_url,next_url=next_url,
+                                                           hub_url=hub_url,self_url=self_url)))
+
+    def _atom_entry(self, rss_item: dict, full_context: bool, add_cover: bool, cdata: bool) -> ET.Element:
+        entry = ET.Element("entry")
+        ET.SubElement(entry, "id").text = rss_item["id"]
+        ET.SubElement(entry, "title").text = str(rss_item["title"])
+        ET.SubElement(entry, "link", href=str(rss_item["link"]))
+        ET.SubElement(entry, "updated").text =self._item_rfc822(rss_item)
+        ET.SubElement(entry, "summary").text = str(rss_item["description"])
+        ET.SubElement(entry, "author").text = str(rss_item["mp_name"])
+         # 添加图片封面
+        if add_cover:
+            enclosure = ET.SubElement(entry, "enclosure")
+            enclosure.set("url", str(rss_item["image"]))
+            enclosure.set("length", "0")
+            enclosure.set("type", "image/jpeg")
         
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
-        return tree_str
-     
-    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+        if full_context:
+            type=self.get_content_type()
+            # content = ET.SubElement(entry, "content", type=f"{str(type)}") 
+            # content.text = format_content(rss_item["content"],type)
+            content=format_content(rss_item["content"],type)
+            try:
+                if cdata:
+                    content = f"<![CDATA[{content}]]>"  # 使用CDATA包裹内容
+                else:
+                    ET.SubElement(entry, "content:encoded").text = content
+            except Exception as e:
+                print(f"Error adding content:encoded element: {e}")
+            pass
+        return entry
+
+    def stream_atom(self,rss_list, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
-        """生成Atom格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url=None,
+                    hub_url:str=None,self_url:str=None):
+        """逐条生成Atom格式的内容（生成器）
         
         Args:
-            rss_list: RSS条目列表
+            rss_list: RSS条目列表或惰性迭代的条目
             title: 频道标题
             link: 频道链接
             description: 频道描述
             language: 语言
+            next_url: 下一页链接，或在全部条目输出后求值的函数
+            hub_url: WebSub的hub地址，声明后订阅者可以订阅推送
+            self_url: 订阅源自身地址（WebSub的topic）
             
         Returns:
-            Atom格式的XML字符串
+            Atom格式XML片段的生成器
         """
         from core.config import cfg
         full_context = bool(cfg.get("rss.full_context", False))
+        add_cover=cfg.get("rss.add_cover",False)==True
+        cdata=cfg.get("rss.cdata",False)==True
         
         # 创建根元素(Atom标准)
         feed = ET.Element("feed", xmlns="http://www.w3.org/2005/Atom")
@@ -184,54 +770,46 @@ class RSS:
         ET.SubElement(feed, "title").text = title
         ET.SubElement(feed, "link",rel="alternate", href=link)
         ET.SubElement(feed, "link",rel="icon", href=image_url)
+        if hub_url:
+            ET.SubElement(feed, "link",rel="hub", href=hub_url)
+            if self_url:
+                ET.SubElement(feed, "link",rel="self", href=self_url)
         ET.SubElement(feed, "logo").text=str(image_url)
         ET.SubElement(feed, "icon").text=str(image_url)
         # Use timezone-aware now (CST/UTC+8) so %z shows +0800
-        ET.SubElement(feed, "updated").text = datetime.now(timezone(timedelta(hours=8))).strftime("%a, %d %b %Y %H:%M:%S %z")
+        ET.SubElement(feed, "updated").text = format_rfc822(time.time())
         ET.SubElement(feed, "id").text = str(link)
         ET.SubElement(feed, "author").text = "Mp-We-Rss"
         # 设置image子项
-        if cfg.get("rss.add_cover",False)==True and image_url != "":
+        if add_cover and image_url != "":
             image = ET.SubElement(feed, "image")
             ET.SubElement(image, "url").text = str(image_url)
             ET.SubElement(image, "title").text = str(title)
             ET.SubElement(image, "link").text = str(link)
+
+        footer = "</feed>"
+        head = ET.tostring(feed, encoding="unicode", method="xml")
+        yield '<?xml version="1.0" encoding="utf-8"?>\r\n' + head[:-len(footer)]
+        flags = ("atom", full_context, add_cover, cdata, self.get_content_type())
         for rss_item in rss_list:
-            entry = ET.SubElement(feed, "entry")
-            ET.SubElement(entry, "id").text = rss_item["id"]
-            ET.SubElement(entry, "title").text = str(rss_item["title"])
-            ET.SubElement(entry, "link", href=str(rss_item["link"]))
-            ET.SubElement(entry, "updated").text =self.datetime_to_rfc822(str(rss_item["updated"]))
-            ET.SubElement(entry, "summary").text = str(rss_item["description"])
-            ET.SubElement(entry, "author").text = str(rss_item["mp_name"])
-             # 添加图片封面
-            if cfg.get("rss.add_cover",False)==True:
-                enclosure = ET.SubElement(entry, "enclosure")
-                enclosure.set("url", str(rss_item["image"]))
-                enclosure.set("length", "0")
-                enclosure.set("type", "image/jpeg")
+            yield self._fragment(rss_item, flags, lambda: ET.tostring(self._atom_entry(rss_item, full_context, add_cover, cdata),
+                                                                     encoding="unicode", method="xml"))
+        next_url = self._resolve_next(next_url)
+        if next_url:
+            yield ET.tostring(ET.Element("link", rel="next", href=next_url), encoding="unicode", method="xml")
+        yield footer
+
+    def generate_atom(self,rss_list: dict, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url:str=None,
+                    hub_url:str=None,self_url:str=None) -> str:
+        """生成Atom格式的RSS内容，参数同 stream_atom
             
-            if full_context:
-                type=self.get_content_type()
-                # content = ET.SubElement(entry, "content", type=f"{str(type)}") 
-                # content.text = format_content(rss_item["content"],type)
-                content=format_content(rss_item["content"],type)
-                try:
-                    if cfg.get("rss.cdata",False)==True:
-                        content = f"<![CDATA[{content}]]>"  # 使用CDATA包裹内容
-                    else:
-                        ET.SubElement(entry, "content:encoded").text = content
-                except Exception as e:
-                    print(f"Error adding content:encoded element: {e}")
-                pass
-        # 生成XML字符串
-        tree_str = '<?xml version="1.0" encoding="utf-8"?>\r\n' + \
-                  ET.tostring(feed, encoding="utf-8", method="xml").decode("utf-8")
-        
-        if self.rss_file is not None:
-            with open(self.rss_file, "w", encoding="utf-8") as f:
-                f.write(tree_str)
-        return tree_str
+        Returns:
+            Atom格式的XML字符串
+        """
+        return "".join(self._write_through(self.stream_atom(rss_list, title=title, link=link, description=description,language=language,image_url=image_url,next_url=next_url,
+                                                            hub_url=hub_url,self_url=self_url)))
     def set_content_type(self,type:str=None):
         self.content_type=type
     def get_content_type(self)->str:
@@ -243,79 +821,210 @@ class RSS:
         elif ext in("txt"):
             return "text"
         return "html"
-    def generate_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
+    def _json_item(self, item: dict, type) -> dict:
+        return {
+            "id": item["id"],
+            "title": item["title"],
+            "description": item["description"],
+            "link": item["link"],
+            "updated": format_iso(item["publish_time"]) if item.get("publish_time") is not None else
+                       item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
+            "content": format_content(item["content"],type),
+            "channel_name": item.get("mp_name", ""),
+            "feed": item.get("feed")
+        }
+
+    def stream_json(self, rss_list,title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="") -> str:
-        """获取JSON格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url=None,
+                    hub_url:str=None,self_url:str=None):
+        """逐条生成JSON格式的内容（生成器），items之后输出next字段
         
         Args:
-            rss_list: RSS条目列表
+            rss_list: RSS条目列表或惰性迭代的条目
             
         Returns:
-            JSON格式的字符串
+            JSON片段的生成器
         """
         type=self.get_content_type()
-        result = {
+        channel = {
             "name":title,
             "link":link,
             "description":description,
             "language": language,
             "cover":image_url,
-            "items": [
-                {
-                    "id": item["id"],
-                    "title": item["title"],
-                    "description": item["description"],
-                    "link": item["link"],
-                    "updated": item["updated"].isoformat() if isinstance(item["updated"], datetime) else item["updated"],
-                    "content": format_content(item["content"],type),
-                    "channel_name": item.get("mp_name", ""),
-                    "feed": item.get("feed")
-                } for item in rss_list
-            ]
         }
-        return json.dumps(result, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        if hub_url:
+            channel["hubs"] = [{"type": "WebSub", "url": hub_url}]
+            if self_url:
+                channel["feed_url"] = self_url
+        head = json.dumps(channel, ensure_ascii=False, indent=2, default=self.serialize_datetime)
+        yield head[:-2] + ',\n  "items": ['
+        sep = "\n"
+        flags = ("json", type)
+        for item in rss_list:
+            yield sep + self._fragment(item, flags, lambda: textwrap.indent(
+                json.dumps(self._json_item(item, type), ensure_ascii=False, indent=2, default=self.serialize_datetime), "    "))
+            sep = ",\n"
+        next_url = self._resolve_next(next_url)
+        yield ("\n  ]" if sep != "\n" else "]") + ',\n  "next": ' + json.dumps(next_url, ensure_ascii=False) + "\n}"
 
+    def generate_json(self, rss_list: dict,title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",next_url:str=None,
+                    hub_url:str=None,self_url:str=None) -> str:
+        """获取JSON格式的RSS内容
+        
+        Args:
+            rss_list: RSS条目列表
+            
+        Returns:
+            JSON格式的字符串
+        """
+        return "".join(self._write_through(self.stream_json(rss_list, title=title, link=link, description=description,language=language,image_url=image_url,next_url=next_url,
+                                                            hub_url=hub_url,self_url=self_url)))
+
+    def set_version(self, version: str):
+        """设置订阅源当前版本号，生成的缓存文件按该版本号记录"""
+        self.version = version
+    def set_validator(self, etag: str, last_modified: int):
+        """设置本次生成内容的校验值，与版本号一起写入版本记录"""
+        self.validator = (etag, last_modified)
+    def cached_validator(self):
+        """缓存文件生成时记录的 (ETag, Last-Modified)，没有记录时返回None"""
+        meta = self._meta if self._meta is not None else FEED_VERSIONS.meta(self.rss_file)
+        if not meta or not meta.get("etag"):
+            return None
+        return meta["etag"], meta.get("last_modified") or 0
+    def is_current(self) -> bool:
+        """缓存文件是否按当前版本号生成（可能由其他进程生成）"""
+        if self.version is None:
+            return False
+        self._meta = FEED_VERSIONS.meta(self.rss_file)
+        return self._meta is not None and self._meta.get("version") == self.version
+    def is_stale(self, stale_ttl: float) -> bool:
+        """缓存文件已过期，但当前版本号更新不超过 stale_ttl 秒，可以先返回旧内容再后台刷新"""
+        if self.version is None or stale_ttl <= 0:
+            return False
+        age = FEED_VERSIONS.stale_age(self.rss_file, self.version)
+        return age is not None and age <= stale_ttl
+    def begin_flight(self, timeout: float) -> bool:
+        """登记由本请求生成缓存文件
+
+        Returns:
+            True表示由本请求生成，响应结束后需调用 end_flight（见 apis.rss.FeedResponse）；
+            False表示其他请求（可能在其他进程）正在生成，可用 wait_flight 等待
+        """
+        if self.version is None:
+            return True
+        token = FEED_VERSIONS.begin(self.rss_file, timeout)
+        if token is None:
+            return False
+        self._flight = token
+        return True
+    def end_flight(self):
+        """结束本请求的生成登记；未进入流式输出就返回时也需调用，重复调用无影响"""
+        if self._flight is not None:
+            token, self._flight = self._flight, None
+            FEED_VERSIONS.end(self.rss_file, token)
+    async def wait_flight(self, timeout: float) -> bool:
+        """等待其他请求生成完成，返回缓存文件是否已是当前版本
+
+        生成可能在其他进程中进行，这里轮询版本记录和租约，不占用线程池的线程
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_current():
+                return True
+            if not FEED_VERSIONS.in_flight(self.rss_file):
+                break
+            await asyncio.sleep(0.05)
+        return self.is_current()
+    def read_cache(self, accept_encoding: str = ""):
+        """读取缓存文件，按Accept-Encoding优先返回预压缩版本
+
+        Returns:
+            (内容字节, 编码)，未使用预压缩版本时编码为None；没有缓存时返回 (None, None)
+        """
+        accepted = accepted_encodings(accept_encoding)
+        available = ()
+        if self.version is not None:
+            # 优先使用 is_current 时读到的版本记录，与判断是否有效时看到的是同一份
+            available = tuple(self._meta.get("encodings") or ()) if self._meta is not None else FEED_VERSIONS.encodings(self.rss_file)
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in available:
+                try:
+                    with open(f"{self.rss_file}{_ENCODING_SUFFIX[encoding]}", "rb") as f:
+                        return f.read(), encoding
+                except FileNotFoundError:
+                    break
+        try:
+            with open(self.rss_file, "rb") as f:
+                return f.read(), None
+        except FileNotFoundError:
+            return None, None
     def get_cache(self):
         if not hasattr(self, 'rss_file') or not self.rss_file:
                return None
         try:
-            with open(self.rss_file, "r", encoding="utf-8") as f:
+            with open(self.rss_file, "r", encoding="utf-8", newline="") as f:
                 return f.read()  
         except FileNotFoundError:
             return None     
-    def generate(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
+    def stream(self,rss_list,ext=str, title: str = "Mp-We-Rss", 
                     link: str = "https://github.com/rachelos/we-mp-rss",
-                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None) -> str:
-        """根据扩展名获取对应格式的RSS内容
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None,next_url=None,
+                    hub_url:str=None,self_url:str=None):
+        """根据扩展名逐块输出对应格式的内容，同时写入缓存文件
         
         Args:
-            rss_list: RSS条目列表
+            rss_list: RSS条目列表，或从数据库游标惰性读取条目的生成器
             ext: 文件扩展名(.rss/.xml/.atom/.json)
+            next_url: 下一页链接（游标分页），或在全部条目输出后求值的函数，为空时不输出
+            hub_url/self_url: WebSub的hub地址和订阅源自身地址，为空时不声明
             **kwargs: 传递给各格式生成方法的参数
             
         Returns:
-            对应格式的字符串
+            字符串片段的生成器
             
         Raises:
             ValueError: 当扩展名不支持时
         """
         ext = ext.lower().strip('.')
         self.ext=ext
+        kwargs=dict(title=title, link=link, description=description,language=language,image_url=image_url,next_url=next_url)
+        feed_kwargs=dict(kwargs, hub_url=hub_url, self_url=self_url)
         if ext in ('rss', 'xml'):
-            return self.generate_rss(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self._write_through(self.stream_rss(rss_list, **feed_kwargs), rss_list)
         elif ext in ('atom','md','txt'):
-            return self.generate_atom(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self._write_through(self.stream_atom(rss_list, **feed_kwargs), rss_list)
         elif ext in ('json','jmd'):
-            return self.generate_json(rss_list, title=title, link=link, description=description,language=language,image_url=image_url)
+            return self._write_through(self.stream_json(rss_list, **feed_kwargs), rss_list)
         elif template is not None:
-            return self.generate_by_template(rss_list,template, title=title, link=link, description=description,language=language,image_url=image_url)
+            def render():
+                items=list(rss_list)
+                # 模板中可能使用 updated，只有模板输出才构造datetime
+                for item in items:
+                    if "updated" not in item and item.get("publish_time") is not None:
+                        item["updated"]=datetime.fromtimestamp(item["publish_time"], tz=CST)
+                kwargs["next_url"]=self._resolve_next(next_url)
+                yield self.generate_by_template(items, template, **kwargs)
+            return render()
         else:
             raise ValueError(f"Unsupported extension: {ext}")
-    def generate_by_template(self,rss_list: dict, template: str, title: str = "Mp-We-Rss",link: str = "https://github.com/rachelos/we-mp-rss",description: str = "RSS频道",language: str = "zh-CN",image_url:str=""):
+    def generate(self,rss_list: dict,ext=str, title: str = "Mp-We-Rss", 
+                    link: str = "https://github.com/rachelos/we-mp-rss",
+                    description: str = "RSS频道", language: str = "zh-CN",image_url:str="",template:str=None,next_url:str=None) -> str:
+        """根据扩展名获取对应格式的RSS内容，参数同 stream
+            
+        Returns:
+            对应格式的字符串
+        """
+        return "".join(self.stream(rss_list, ext=ext, title=title, link=link, description=description,language=language,image_url=image_url,template=template,next_url=next_url))
+    def generate_by_template(self,rss_list: dict, template: str, title: str = "Mp-We-Rss",link: str = "https://github.com/rachelos/we-mp-rss",description: str = "RSS频道",language: str = "zh-CN",image_url:str="",next_url:str=None):
             from core.lax import TemplateParser
             template = TemplateParser(template)
-            return template.render({"articles": rss_list, "title": title,"link":link,"description":description,"language":language,"image_url":image_url})
+            return template.render({"articles": rss_list, "title": title,"link":link,"description":description,"language":language,"image_url":image_url,"next_url":next_url})
             pass
     def clear_cache(self,mp_id:str=""):
 
@@ -0,0 +1,348 @@
+import re
+import hmac
+import socket
+import hashlib
+import secrets
+import ipaddress
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from urllib.parse import urlsplit, parse_qs, urlencode
+from core.config import cfg
+from core.queue import TaskQueueManager
+from core.rss import FeedVersions
+from core.print import print_error, print_info, print_warning
+
+# 可订阅的订阅源路径（与 apis/rss 的路由保持一致），默认条数与路由的limit默认值一致
+_TOPIC_ROUTES = (
+    (re.compile(r"/feed/tag/(?P<tag_id>[^/]+)\.(?P<ext>\w+)$"), 50),
+    (re.compile(r"/feed/search/(?P<kw>[^/]+)/(?P<feed_id>[^/]+)\.(?P<ext>\w+)$"), 50),
+    (re.compile(r"/feed/(?P<feed_id>[^/]+)\.(?P<ext>\w+)$"), 50),
+    (re.compile(r"/rss/(?P<feed_id>[^/]+)$"), 10),
+)
+
+
+def parse_topic(topic: str) -> Optional[dict]:
+    """解析订阅源地址，返回重放请求所需的参数，不是本服务的订阅源时返回None"""
+    try:
+        url = urlsplit(topic)
+    except ValueError:
+        return None
+    if url.scheme not in ("http", "https") or not url.netloc:
+        return None
+    for pattern, default_limit in _TOPIC_ROUTES:
+        match = pattern.search(url.path)
+        if match is None:
+            continue
+        params = match.groupdict()
+        feed_id = params.get("feed_id")
+        if feed_id in ("api", "fresh", "content"):
+            return None
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            limit = min(max(int(query.get("limit") or default_limit), 1), 100)
+        except ValueError:
+            return None
+        return {
+            "path": match.group(0),
+            "base_url": f"{url.scheme}://{url.netloc}{url.path[:match.start()]}/",
+            "feed_id": feed_id,
+            "tag_id": params.get("tag_id"),
+            "ext": params.get("ext") or "xml",
+            "kw": params.get("kw") or "",
+            "limit": limit,
+            "content_type": query.get("ctype"),
+        }
+    return None
+
+
+def _is_callback(url: str) -> bool:
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    return parts.scheme in ("http", "https") and bool(parts.hostname)
+
+
+def _callback_host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def is_public_address(host: str) -> bool:
+    """域名解析出的所有地址都是公网地址时返回True（内网、回环、链路本地、保留、组播地址均不是）"""
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return False
+    if not infos:
+        return False
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        # IPv4映射的IPv6地址按IPv4判断
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return False
+    return True
+
+
+def _same_base(base_url: str, public_base: str) -> bool:
+    a, b = urlsplit(base_url), urlsplit(public_base)
+    return (a.scheme.lower(), a.netloc.lower(), a.path.rstrip("/")) == (b.scheme.lower(), b.netloc.lower(), b.path.rstrip("/"))
+
+
+class WebSubHub:
+    """内置 WebSub (PubSubHubbub) Hub
+
+    订阅源输出中声明 rel="hub"，阅读器通过 /feed/hub 订阅后不必再轮询：
+    订阅/退订请求先回调订阅者校验意图再生效；采集入库新文章后按公众号、所属标签和全部文章源
+    找出受影响的订阅源，每个订阅源只生成一次内容，再逐个POST给订阅者。
+    校验和推送都在单独的队列线程中执行，不阻塞请求和采集。
+
+    /feed/hub 不需要登录，因此默认关闭，并且：
+    只接受 rss.base_url 下的订阅源作为topic（未配置 rss.base_url 时不接受订阅），重放时也使用该地址；
+    回调地址解析到内网、回环、链路本地等非公网地址时拒绝（校验和推送前都检查，且不跟随重定向），
+    内网部署的阅读器需显式开启 allow_private_callbacks；每个topic、每个回调域名的订阅数和排队中的校验数有上限
+    """
+    def __init__(self):
+        self.enabled = str(cfg.get("rss.websub.enabled", False)).lower() not in ("false", "0", "")
+        self.base_url = str(cfg.get("rss.base_url", "") or "")
+        self.allow_private = str(cfg.get("rss.websub.allow_private_callbacks", False)).lower() not in ("false", "0", "")
+        self.max_per_topic = int(cfg.get("rss.websub.max_per_topic", 100) or 0)
+        self.max_per_host = int(cfg.get("rss.websub.max_per_host", 20) or 0)
+        self.hub_url = cfg.get("rss.websub.hub_url", "") or ""
+        self.lease_seconds = int(cfg.get("rss.websub.lease_seconds", 864000) or 864000)
+        self.max_lease_seconds = int(cfg.get("rss.websub.max_lease_seconds", 2592000) or 2592000)
+        self.timeout = float(cfg.get("rss.websub.timeout", 10) or 10)
+        self.max_failures = int(cfg.get("rss.websub.max_failures", 10) or 0)
+        self.fetcher: Optional[Callable[[dict], tuple]] = None
+        self.verified = 0
+        self.delivered = 0
+        self.failed = 0
+        self.rejected = 0
+        # 回调域名 -> 排队中的校验数
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._queue = None
+
+    def get_hub_url(self, base_url: str) -> str:
+        """订阅源中声明的Hub地址，未配置时使用本服务的 /feed/hub"""
+        return self.hub_url or f"{str(base_url).rstrip('/')}/feed/hub"
+
+    def topic(self, topic: str) -> Optional[dict]:
+        """解析订阅的topic，只接受 rss.base_url 下的订阅源，重放请求的base_url使用配置的地址"""
+        params = parse_topic(topic)
+        if params is None or not self.base_url or not _same_base(params["base_url"], self.base_url):
+            return None
+        params["base_url"] = self.base_url
+        return params
+
+    def callback_allowed(self, callback: str) -> bool:
+        """回调地址是否允许访问：非公网地址需开启 allow_private_callbacks"""
+        if not _is_callback(callback):
+            return False
+        return self.allow_private or is_public_address(_callback_host(callback))
+
+    def _over_limit(self, session, topic: str, callback: str) -> Optional[str]:
+        """新增订阅是否超过每个topic、每个回调域名的上限，超过时返回错误信息"""
+        from core.models.websub import WebSubSubscription
+        if self.max_per_topic and session.query(WebSubSubscription).filter(
+                WebSubSubscription.topic == topic).count() >= self.max_per_topic:
+            return "该订阅源的订阅数已达上限"
+        if self.max_per_host:
+            host = _callback_host(callback)
+            callbacks = session.query(WebSubSubscription.callback).filter(
+                WebSubSubscription.callback.like(f"%{host}%")).all()
+            if sum(1 for row in callbacks if _callback_host(row[0]) == host) >= self.max_per_host:
+                return "该回调域名的订阅数已达上限"
+        return None
+
+    def set_fetcher(self, fetcher: Callable[[dict], tuple]) -> None:
+        """注册订阅源内容生成函数（由apis/rss提供，按 parse_topic 的结果返回 (Content-Type, 内容)）"""
+        self.fetcher = fetcher
+
+    def _submit(self, task, *args) -> None:
+        with self._lock:
+            if self._queue is None:
+                self._queue = TaskQueueManager(tag="WebSub推送")
+                self._queue.run_task_background()
+        self._queue.add_task(task, *args)
+
+    def request(self, form: dict) -> Optional[str]:
+        """处理订阅/退订请求，参数校验通过后排队校验订阅者意图并返回None，否则返回错误信息"""
+        mode = form.get("hub.mode")
+        topic = form.get("hub.topic") or ""
+        callback = form.get("hub.callback") or ""
+        if mode not in ("subscribe", "unsubscribe"):
+            return "hub.mode 必须为 subscribe 或 unsubscribe"
+        if self.topic(topic) is None:
+            return "hub.topic 不是本服务的订阅源"
+        if not _is_callback(callback):
+            return "hub.callback 必须为 http(s) 地址"
+        secret = form.get("hub.secret") or None
+        if secret is not None and len(secret.encode("utf-8")) >= 200:
+            return "hub.secret 长度必须小于200字节"
+        try:
+            lease = int(form.get("hub.lease_seconds") or self.lease_seconds)
+        except ValueError:
+            return "hub.lease_seconds 必须为整数"
+        lease = min(max(lease, 1), self.max_lease_seconds)
+        host = _callback_host(callback)
+        with self._lock:
+            # 校验请求会访问回调地址，同一域名排队中的校验数同样受限，避免借Hub向某个地址发大量请求
+            if self.max_per_host and self._pending.get(host, 0) >= self.max_per_host:
+                self.rejected += 1
+                return "该回调域名的校验请求过多，请稍后再试"
+            self._pending[host] = self._pending.get(host, 0) + 1
+        self._submit(self._verify, mode, topic, callback, lease, secret)
+        return None
+
+    def _verify(self, mode: str, topic: str, callback: str, lease: int, secret: Optional[str]) -> bool:
+        try:
+            return self._apply(mode, topic, callback, lease, secret)
+        finally:
+            host = _callback_host(callback)
+            with self._lock:
+                if self._pending.get(host, 0) <= 1:
+                    self._pending.pop(host, None)
+                else:
+                    self._pending[host] -= 1
+
+    def confirm(self, mode: str, topic: str, callback: str, lease: int) -> bool:
+        """回调订阅者确认订阅意图：返回2xx且响应内容等于challenge时视为确认"""
+        import requests
+        if not self.callback_allowed(callback):
+            self.rejected += 1
+            print_warning(f"WebSub拒绝非公网回调地址 {callback}")
+            return False
+        challenge = secrets.token_urlsafe(24)
+        params = {"hub.mode": mode, "hub.topic": topic, "hub.challenge": challenge}
+        if mode == "subscribe":
+            params["hub.lease_seconds"] = lease
+        separator = "&" if urlsplit(callback).query else "?"
+        try:
+            response = requests.get(f"{callback}{separator}{urlencode(params)}", timeout=self.timeout,
+                                    allow_redirects=False)
+            confirmed = 200 <= response.status_code < 300 and response.text.strip() == challenge
+        except Exception as e:
+            print_warning(f"WebSub校验订阅者失败 {callback}: {e}")
+            return False
+        if not confirmed:
+            print_warning(f"WebSub订阅者未确认{mode} {callback}")
+        return confirmed
+
+    def _apply(self, mode: str, topic: str, callback: str, lease: int, secret: Optional[str]) -> bool:
+        """校验订阅者意图后保存或删除订阅"""
+        if not self.confirm(mode, topic, callback, lease):
+            return False
+        from core.db import DB
+        from core.models.websub import WebSubSubscription
+        session = DB.get_session()
+        try:
+            sub_id = hashlib.md5(f"{topic}\n{callback}".encode("utf-8")).hexdigest()
+            sub = session.query(WebSubSubscription).filter(WebSubSubscription.id == sub_id).first()
+            if mode == "unsubscribe":
+                if sub is not None:
+                    session.delete(sub)
+            else:
+                if sub is None:
+                    error = self._over_limit(session, topic, callback)
+                    if error:
+                        self.rejected += 1
+                        print_warning(f"WebSub拒绝订阅 {topic} -> {callback}: {error}")
+                        return False
+                    sub = WebSubSubscription(id=sub_id, topic=topic, callback=callback, delivered=0)
+                    session.add(sub)
+                sub.secret = secret
+                sub.lease_seconds = lease
+                sub.expires_at = datetime.now() + timedelta(seconds=lease)
+                sub.failures = 0
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print_error(f"WebSub保存订阅失败: {e}")
+            return False
+        self.verified += 1
+        print_info(f"WebSub {mode}: {topic} -> {callback}")
+        return True
+
+    def publish(self, mp_ids) -> None:
+        """公众号入库新文章后排队推送受影响的订阅源"""
+        mp_ids = {mp_id for mp_id in mp_ids if mp_id}
+        if not self.enabled or not mp_ids or self.fetcher is None:
+            return
+        self._submit(self._distribute, mp_ids)
+
+    def _distribute(self, mp_ids: set) -> None:
+        from core.db import DB
+        from core.models.websub import WebSubSubscription
+        from core.models.tag_feed import TagFeed
+        session = DB.get_session()
+        try:
+            keys = {FeedVersions.ALL} | {FeedVersions.key(feed_id=mp_id) for mp_id in mp_ids}
+            keys.update(FeedVersions.key(tag_id=row[0]) for row in
+                        session.query(TagFeed.tag_id).filter(TagFeed.mp_id.in_(mp_ids)).all())
+            topics = {}
+            for sub in session.query(WebSubSubscription).all():
+                if sub.is_expired():
+                    session.delete(sub)
+                    continue
+                params = self.topic(sub.topic)
+                if params is not None and FeedVersions.key(params["feed_id"], params["tag_id"]) in keys:
+                    topics.setdefault(sub.topic, (params, []))[1].append(sub)
+            for topic, (params, subs) in topics.items():
+                try:
+                    content_type, body = self.fetcher(params)
+                except Exception as e:
+                    print_error(f"WebSub生成订阅源失败 {topic}: {e}")
+                    continue
+                hub_url = self.get_hub_url(params["base_url"])
+                for sub in subs:
+                    self._deliver(session, sub, hub_url, content_type, body)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print_error(f"WebSub推送失败: {e}")
+
+    def _deliver(self, session, sub, hub_url: str, content_type: str, body: bytes) -> None:
+        """内容分发：POST订阅源内容，带上hub/self链接和签名；订阅者返回410或连续失败过多时移除订阅"""
+        import requests
+        headers = {
+            "Content-Type": content_type,
+            "Link": f'<{hub_url}>; rel="hub", <{sub.topic}>; rel="self"',
+        }
+        if sub.secret:
+            signature = hmac.new(sub.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-Hub-Signature"] = f"sha256={signature}"
+        if not self.callback_allowed(sub.callback):
+            # 订阅后域名改为解析到内网地址，直接移除订阅
+            self.rejected += 1
+            print_warning(f"WebSub移除非公网回调地址的订阅 {sub.callback}")
+            session.delete(sub)
+            return
+        try:
+            response = requests.post(sub.callback, data=body, headers=headers, timeout=self.timeout,
+                                     allow_redirects=False)
+            status = response.status_code
+        except Exception as e:
+            print_warning(f"WebSub推送失败 {sub.callback}: {e}")
+            status = None
+        if status is not None and 200 <= status < 300:
+            self.delivered += 1
+            sub.delivered = (sub.delivered or 0) + 1
+            sub.failures = 0
+            sub.last_delivered_at = datetime.now()
+            return
+        self.failed += 1
+        sub.failures = (sub.failures or 0) + 1
+        if status == 410 or (self.max_failures and sub.failures >= self.max_failures):
+            print_warning(f"WebSub移除订阅 {sub.callback} (状态码 {status}, 连续失败 {sub.failures} 次)")
+            session.delete(sub)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "verified": self.verified, "delivered": self.delivered,
+                "failed": self.failed, "rejected": self.rejected, "pending": sum(self._pending.values())}
+
+
+# 进程内共享的 WebSub Hub
+HUB = WebSubHub()
@@ -7,7 +7,7 @@ from core.db import DB
 from core.models.feed import Feed
 from .cfg import cfg,wx_cfg
 from core.print import print_error,print_info, print_warning
-from core.rss import RSS
+from core.prerender import PRERENDER
 from driver.success import setStatus
 from driver.wxarticle import Web
 from core.wait import Wait
@@ -66,6 +66,7 @@ class WxGather:
         return wx
     def __init__(self,is_add:bool=False):
         self.articles=[]
+        self._pending=[]
         self.is_add=is_add
         self._cookies={}
         self.start_time = None  # 记录开始时间
@@ -119,8 +120,8 @@ class WxGather:
         print_warning(f"{tips}等待{wait}秒后继续...")
         time.sleep(wait)
 
-    def FillBack(self,CallBack=None,data=None,Ext_Data=None):
-        if CallBack is not None:
+    def FillBack(self,CallBack=None,data=None,Ext_Data=None,Batch_CallBack=None):
+        if CallBack is not None or Batch_CallBack is not None:
             if data is not  None:
                 setStatus(True)
                 from core.models import Article
@@ -136,11 +137,27 @@ class WxGather:
                 }
                 if 'digest' in data:
                     art['description']=data['digest']
+                if Batch_CallBack is not None:
+                    # 批量模式下先缓存，按页通过FlushBack统一写入
+                    self._pending.append((art,Ext_Data))
+                    return
                 if CallBack(art):
                     art["ext"]=Ext_Data
                     # art.pop("content")
                     self.articles.append(art)
 
+    def FlushBack(self,Batch_CallBack=None):
+        """将缓存的一页文章交给批量回调写入，只保留新写入的文章"""
+        pending,self._pending=self._pending,[]
+        if Batch_CallBack is None or not pending:
+            return
+        inserted=Batch_CallBack([art for art,_ in pending]) or []
+        inserted_ids={id(art) for art in inserted}
+        for art,ext in pending:
+            if id(art) in inserted_ids:
+                art["ext"]=ext
+                self.articles.append(art)
+
     #通过公众号码平台接口查询公众号
     def search_Biz(self,kw:str="",limit=10,offset=0):
 
@@ -186,7 +203,9 @@ class WxGather:
     
     
     def Start(self,mp_id=None):
+        self.mp_id=mp_id
         self.articles=[]
+        self._pending=[]
         self.get_token()
         if self.token=="" or self.token is None:
              self.Error("请先扫码登录公众号平台")
@@ -229,13 +248,9 @@ class WxGather:
         
         if getattr(self, 'articles', None) is not None:
             print(f"成功{len(self.articles)}条")
-            rss=RSS()
-            mp_id=""
-            try:
-                mp_id=self.articles[0]['mp_id']
-            except:
-                pass
-            rss.clear_cache(mp_id=mp_id)  
+            # 订阅源缓存由Db在文章写入提交后递增版本号失效，不再扫描缓存目录
+            # 在后台预生成该公众号相关的热门订阅源，读者请求直接命中缓存
+            PRERENDER.schedule(getattr(self, 'mp_id', None))
         
         # 输出执行时间统计
         if execution_time > 0:
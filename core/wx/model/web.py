@@ -24,7 +24,7 @@ class MpsWeb(WxGather):
             logger.error(e)
         return ""
     # 重写 get_Articles 方法
-    def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page:int=0,MaxPage:int=1,interval=10,Gather_Content=False,Item_Over_CallBack=None,Over_CallBack=None):
+    def get_Articles(self, faker_id:str=None,Mps_id:str=None,Mps_title="",CallBack=None,start_page:int=0,MaxPage:int=1,interval=10,Gather_Content=False,Item_Over_CallBack=None,Over_CallBack=None,Batch_CallBack=None):
         super().Start(mp_id=Mps_id)
         if self.Gather_Content:
             Gather_Content=True
@@ -96,8 +96,8 @@ class MpsWeb(WxGather):
                                         item["content"] = ""
                                     item["id"] = item["aid"]
                                     item["mp_id"] = Mps_id
-                                    if CallBack is not None:
-                                        super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id})
+                                    if CallBack is not None or Batch_CallBack is not None:
+                                        super().FillBack(CallBack=CallBack,data=item,Ext_Data={"mp_title":Mps_title,"mp_id":Mps_id},Batch_CallBack=Batch_CallBack)
                     print(f"第{i+1}页爬取成功\n")
                 # 翻页
                 i += 1
@@ -108,6 +108,8 @@ class MpsWeb(WxGather):
                 print(f"Request error: {e}")
                 break
             finally:
+                # 每页只提交一次
+                super().FlushBack(Batch_CallBack)
                 super().Item_Over(item={"mps_id":Mps_id,"mps_title":Mps_title},CallBack=Item_Over_CallBack)
         super().Over(CallBack=Over_CallBack)
         pass
\ No newline at end of file
@@ -7,6 +7,11 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
+# 新增字段后需要回填历史数据的语句
+BACKFILL_SQL = {
+    ("articles", "has_content"): "UPDATE articles SET has_content = CASE WHEN content IS NULL OR content = '' THEN 0 ELSE 1 END",
+}
+
 class DatabaseSynchronizer:
     """数据库模型同步器"""
     
@@ -181,9 +186,25 @@ class DatabaseSynchronizer:
                                             # SQLite和MySQL语法
                                             conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {col_name} {model_col.type}"))
                                     self.logger.info(f"新增字段: {table_name}.{col_name}")
+                                    backfill = BACKFILL_SQL.get((table_name, col_name))
+                                    if backfill:
+                                        with self.engine.begin() as conn:
+                                            conn.execute(text(backfill))
+                                        self.logger.info(f"回填字段: {table_name}.{col_name}")
                                 except SQLAlchemyError as e:
                                     self.logger.error(f"添加字段 {table_name}.{col_name} 失败: {e}")
                         
+                        # 补建缺失的索引
+                        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table_name)}
+                        for index in model.__table__.indexes:
+                            if index.name in existing_indexes:
+                                continue
+                            try:
+                                index.create(self.engine)
+                                self.logger.info(f"新增索引: {table_name}.{index.name}")
+                            except SQLAlchemyError as e:
+                                self.logger.error(f"创建索引 {table_name}.{index.name} 失败: {e}")
+
                         self.logger.info(f"表已同步: {table_name}")
                         
                 except SQLAlchemyError as e:
@@ -15,6 +15,9 @@ def UpdateArticle(art:dict,check_exist=False):
         mps_count=mps_count+1
         return True
     return False
+def UpdateArticles(arts:list[dict]):
+    """批量写入一页采集结果，返回新写入的文章"""
+    return DB.add_articles(arts)
 def Update_Over(data=None):
     print("更新完成")
     pass
\ No newline at end of file
@@ -16,7 +16,7 @@ def fetch_articles_without_content():
     try:
         # 查询content为空的文章
         from sqlalchemy import or_
-        articles = session.query(Article).filter(or_(Article.content.is_(None), Article.content == "")).limit(10).all()
+        articles = session.query(Article).filter(or_(Article.has_content == 0, Article.has_content.is_(None))).limit(10).all()
         
         if not articles:
             print_warning("暂无需要获取内容的文章")
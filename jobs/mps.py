@@ -1,6 +1,6 @@
 from datetime import datetime
 from core.models.article import Article
-from .article import UpdateArticle,Update_Over
+from .article import UpdateArticle,UpdateArticles,Update_Over
 import core.db as db
 from core.wx import WxGather
 from core.log import logger
@@ -19,7 +19,7 @@ def fetch_all_article():
         mps=db.DB.get_all_mps()
         for item in mps:
             try:
-                wx.get_Articles(item.faker_id,CallBack=UpdateArticle,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
+                wx.get_Articles(item.faker_id,Batch_CallBack=UpdateArticles,Mps_id=item.id,Mps_title=item.mp_name, MaxPage=1)
             except Exception as e:
                 print(e)
         print(wx.articles) 
@@ -58,7 +58,7 @@ def do_job(mp=None,task:MessageTask=None,isTest=False):
         else:
             wx=WxGather().Model()
             try:
-                wx.get_Articles(mp.faker_id,CallBack=UpdateArticle,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=1,Over_CallBack=Update_Over,interval=interval)
+                wx.get_Articles(mp.faker_id,Batch_CallBack=UpdateArticles,Mps_id=mp.id,Mps_title=mp.mp_name, MaxPage=1,Over_CallBack=Update_Over,interval=interval)
             except Exception as e:
                 print_error(e)
                 # raise
@@ -0,0 +1,124 @@
+"""
+测试公众号文章计数（article_counts）随文章新增、删除和状态变化的增量维护
+
+使用临时SQLite数据库，不需要config.yaml和外部数据库：
+    python -m pytest -q test_article_counts.py
+    或者
+    python test_article_counts.py
+"""
+
+import os
+import tempfile
+
+from core.config import cfg
+
+# 没有config.yaml时为模块级的DB提供一个临时库，保证core.db可以导入
+cfg.config.setdefault("db", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "default.db"))
+
+from sqlalchemy import func
+from core.db import Db
+from core.models.article import Article
+from core.models.base import DATA_STATUS
+
+MP_ID = "MP_WXS_1"
+
+
+def make_db() -> Db:
+    db = Db(tag="计数测试")
+    db.init("sqlite:///" + os.path.join(tempfile.mkdtemp(), "counts.db"))
+    db.create_tables()
+    return db
+
+
+def article(n: int, mp_id: str = MP_ID) -> dict:
+    return {"id": str(n), "mp_id": mp_id, "title": f"文章{n}", "url": f"https://example.com/{n}",
+            "publish_time": 1700000000 + n}
+
+
+def assert_counts(db: Db, mp_id: str = MP_ID):
+    """计数表与 COUNT(*) 一致，并返回计数"""
+    session = db.get_session()
+    exact = session.query(func.count(Article.id)).filter(Article.mp_id == mp_id, Article.status == DATA_STATUS.ACTIVE).scalar()
+    counted = db.get_article_counts([mp_id])[mp_id]
+    assert counted == exact, (counted, exact)
+    return counted
+
+
+def test_insert_counts():
+    db = make_db()
+    assert db.add_article(article(1))
+    # 首次读取时按articles表初始化计数行，之后增量维护
+    assert assert_counts(db) == 1
+    assert db.add_article(article(2))
+    assert assert_counts(db) == 2
+    # 批量写入只计入真正新写入的文章
+    assert len(db.add_articles([article(2), article(3), article(4)])) == 2
+    assert assert_counts(db) == 4
+    assert db.add_articles([article(3)]) == []
+    assert assert_counts(db) == 4
+
+
+def test_bulk_insert_returns_only_inserted():
+    db = make_db()
+    db.add_article(article(1))
+    assert assert_counts(db) == 1
+    session = db.get_session()
+    # 绕过预先检查（相当于检查之后被并发写入），只返回真正写入的文章
+    rows = [db._article_row(article(n)) for n in (1, 2, 3)]
+    assert db._insert_new_articles(session, rows) == {"1-2", "1-3"}
+    session.commit()
+    assert len(db.add_articles([article(3), article(4)])) == 1
+    assert session.query(func.count(Article.id)).scalar() == 4
+
+
+def test_delete_and_status_counts():
+    db = make_db()
+    db.add_articles([article(n) for n in range(1, 6)] + [article(9, "MP_WXS_2")])
+    assert assert_counts(db) == 5
+    session = db.get_session()
+
+    # 直接删除ORM对象
+    session.delete(session.get(Article, "1-1"))
+    session.commit()
+    assert assert_counts(db) == 4
+
+    # 逻辑删除：提交后属性已过期，原状态在flush前从数据库读取
+    row = session.get(Article, "1-2")
+    session.commit()
+    row.status = DATA_STATUS.DELETED
+    session.commit()
+    assert assert_counts(db) == 3
+
+    # 先逻辑删除再物理删除只减一次，已删除的文章再删除不影响计数
+    row = session.get(Article, "1-3")
+    row.status = DATA_STATUS.DELETED
+    session.delete(row)
+    session.commit()
+    session.delete(session.get(Article, "1-2"))
+    session.commit()
+    assert assert_counts(db) == 2
+
+    # 恢复状态、改归属公众号
+    row = session.get(Article, "1-4")
+    row.status = DATA_STATUS.INACTIVE
+    session.commit()
+    assert assert_counts(db) == 1
+    row.status = DATA_STATUS.ACTIVE
+    session.commit()
+    assert assert_counts(db) == 2
+    assert assert_counts(db, "MP_WXS_2") == 1
+    row.mp_id = "MP_WXS_2"
+    session.commit()
+    assert assert_counts(db) == 1 and assert_counts(db, "MP_WXS_2") == 2
+
+    # 只修改其他字段不影响计数
+    row.is_read = 1
+    session.commit()
+    assert assert_counts(db) == 1 and assert_counts(db, "MP_WXS_2") == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,320 @@
+"""
+测试共享缓存后端（file/sqlite/redis）及多进程缓存失效
+
+Redis后端使用本地的RESP协议替身服务，SQLite和文件后端使用临时文件，不需要外部服务：
+    python -m pytest -q test_cache_backend.py
+    或者
+    python test_cache_backend.py
+"""
+
+import os
+import time
+import fnmatch
+import tempfile
+import threading
+import socketserver
+
+from core.cache import ViewCache
+from core.cache_backend import FileCacheBackend, SQLiteCacheBackend, RedisCacheBackend
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """本地RESP替身服务，只实现缓存后端用到的命令"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.data = {}
+        self.expires = {}
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _bulk(value) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                with self.server.lock:
+                    self.wfile.write(self.dispatch(args))
+        finally:
+            with self.server.lock:
+                for handlers in self.server.subscribers.values():
+                    handlers.discard(self)
+
+    def _alive(self, key) -> bool:
+        expires = self.server.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.server.data.pop(key, None)
+            self.server.expires.pop(key, None)
+        return key in self.server.data
+
+    def dispatch(self, args) -> bytes:
+        data, expires = self.server.data, self.server.expires
+        command = args[0].upper()
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            return _bulk(data.get(args[1]) if self._alive(args[1]) else None)
+        if command == b"MGET":
+            values = [data.get(key) if self._alive(key) else None for key in args[1:]]
+            return b"*%d\r\n" % len(values) + b"".join(_bulk(value) for value in values)
+        if command == b"SET":
+            key, value, options = args[1], args[2], [arg.upper() for arg in args[3:]]
+            if b"NX" in options and self._alive(key):
+                return _bulk(None)
+            data[key] = value
+            expires.pop(key, None)
+            if b"EX" in options:
+                expires[key] = time.time() + int(args[3 + options.index(b"EX") + 1])
+            if b"PX" in options:
+                expires[key] = time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % sum(1 for key in args[1:] if data.pop(key, None) is not None)
+        if command == b"INCR":
+            value = int(data.get(args[1], b"0")) + 1
+            data[args[1]] = str(value).encode()
+            return b":%d\r\n" % value
+        if command == b"SADD":
+            members = data.setdefault(args[1], set())
+            before = len(members)
+            members.update(args[2:])
+            return b":%d\r\n" % (len(members) - before)
+        if command == b"SMEMBERS":
+            members = data.get(args[1], set())
+            return b"*%d\r\n" % len(members) + b"".join(_bulk(member) for member in members)
+        if command == b"EXPIRE":
+            return b":1\r\n"
+        if command == b"SUBSCRIBE":
+            self.server.subscribers.setdefault(args[1], set()).add(self)
+            return b"*3\r\n" + _bulk(b"subscribe") + _bulk(args[1]) + b":1\r\n"
+        if command == b"PUBLISH":
+            handlers = list(self.server.subscribers.get(args[1], ()))
+            for handler in handlers:
+                handler.wfile.write(b"*3\r\n" + _bulk(b"message") + _bulk(args[1]) + _bulk(args[2]))
+            return b":%d\r\n" % len(handlers)
+        if command == b"SCAN":
+            pattern = args[args.index(b"MATCH") + 1].decode()
+            keys = [key for key in list(data) if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(_bulk(key) for key in keys)
+        return b"-ERR unknown command\r\n"
+
+
+def backends():
+    """返回 [(名称, 创建同一存储的后端实例的函数)]，同一存储的两个实例相当于两个工作进程"""
+    cache_dir = tempfile.mkdtemp()
+    sqlite_path = os.path.join(tempfile.mkdtemp(), "cache.db")
+    redis = FakeRedis()
+    return redis, [
+        ("file", lambda: FileCacheBackend(cache_dir)),
+        ("sqlite", lambda: SQLiteCacheBackend(sqlite_path, "views")),
+        ("redis", lambda: RedisCacheBackend(redis.url, "views", prefix="test")),
+    ]
+
+
+def test_get_set_delete():
+    redis, items = backends()
+    try:
+        for name, create in items:
+            a, b = create(), create()
+            assert a.get("page_1") is None, name
+            a.set("page_1", b"hello")
+            a.set("page_2", b"world")
+            created, raw = b.get("page_1")
+            assert raw == b"hello" and abs(created - time.time()) < 60, name
+            b.delete("page_1")
+            assert a.get("page_1") is None and a.get("page_2")[1] == b"world", name
+            a.set("other_1", b"x")
+            a.delete_pattern("page_*")
+            assert b.get("page_2") is None and b.get("other_1")[1] == b"x", name
+            b.clear()
+            assert a.get("other_1") is None, name
+    finally:
+        redis.close()
+
+
+def test_tag_index():
+    redis, items = backends()
+    try:
+        for name, create in items:
+            a, b = create(), create()
+            a.set("article_1", b"1")
+            a.set("feed_1", b"2")
+            a.set("home", b"3")
+            a.add_tags("article_1", ["article:1", "feed:MP1"])
+            a.add_tags("feed_1", ["feed:MP1"])
+            a.add_tags("home", ["view:home"])
+            b.delete_tags(["article:1"])
+            assert a.get("article_1") is None and a.get("feed_1") is not None, name
+            b.delete_tags(["feed:MP1"])
+            assert a.get("feed_1") is None and a.get("home")[1] == b"3", name
+            # 已删除的标签再次删除不影响其他缓存
+            b.delete_tags(["feed:MP1", "missing"])
+            assert a.get("home") is not None, name
+    finally:
+        redis.close()
+
+
+def test_file_tag_index_compaction():
+    backend = FileCacheBackend(tempfile.mkdtemp())
+    for _ in range(5):
+        backend.set("feed_1", b"1")
+        backend.add_tags("feed_1", ["feed:all"])
+    backend.set("feed_2", b"2")
+    backend.add_tags("feed_2", ["feed:all", "feed:MP1"])
+    # 同一键重复写入不增加索引
+    assert sorted(os.listdir(backend._tag_path("feed:all"))) == ["feed_1", "feed_2"]
+    # 删除缓存后清理指向已删除键的索引，没有键的标签目录一并删除
+    backend.delete_pattern("feed_2")
+    assert os.listdir(backend._tag_path("feed:all")) == ["feed_1"]
+    assert not os.path.exists(backend._tag_path("feed:MP1"))
+    backend.delete("feed_1")
+    backend.prune_tags()
+    assert os.listdir(backend.tags_dir) == []
+
+    # 旧版本逐行记录的索引文件在写入时转换，删除标签时仍然有效
+    backend.set("old", b"0")
+    backend.set("new", b"1")
+    with open(backend._tag_path("feed:all"), "w", encoding="utf-8") as f:
+        f.write("old\nold\n")
+    backend.add_tags("new", ["feed:all"])
+    assert sorted(os.listdir(backend._tag_path("feed:all"))) == ["new", "old"]
+    backend.delete_tags(["feed:all"])
+    assert backend.get("old") is None and backend.get("new") is None
+
+
+def test_version_and_leases():
+    redis, items = backends()
+    try:
+        for name, create in items:
+            a, b = create(), create()
+            before = b.version()
+            a.bump()
+            assert b.version() != before, name
+            # 失效事件按版本号顺序读取，没有事件的版本（或已清理的事件）返回None
+            version = a.bump(b"first")
+            assert a.bump(b"second") == version + 1, name
+            assert b.events(version - 1) == [b"first", b"second"] and b.events(version + 1) == [], name
+            assert b.events(before) is None, name
+            token = a.acquire("render", 0.3)
+            assert token and b.acquire("render", 5) is None and b.locked("render"), name
+            b.release("render", "not-mine")
+            assert a.locked("render"), name
+            a.release("render", token)
+            assert not b.locked("render"), name
+            token = a.acquire("expire", 0.2)
+            time.sleep(0.3)
+            assert token and not b.locked("expire") and b.acquire("expire", 5), name
+    finally:
+        redis.close()
+
+
+def make_worker(backend) -> ViewCache:
+    """模拟一个工作进程的视图缓存：独立的进程内缓存，共用后端"""
+    cache = ViewCache(tempfile.mkdtemp(), default_ttl=60, enabled=True, memory_mb=1, disk=True, namespace="views")
+    cache.backend = backend
+    cache.sync_interval = 0
+    return cache
+
+
+def test_cross_worker_invalidation():
+    redis, items = backends()
+    try:
+        for name, create in items:
+            worker_a, worker_b = make_worker(create()), make_worker(create())
+            worker_a.set("article", {"title": "v1"}, _tags=["article:1"], article_id="1")
+            # B 从后端读到后放入自己的进程内缓存
+            assert worker_b.get("article", article_id="1") == {"title": "v1"}, name
+            assert worker_b.get("article", article_id="1") == {"title": "v1"}, name
+            # A 删除后递增版本号，B 下次读取时丢弃进程内缓存
+            worker_a.delete("article", article_id="1")
+            assert worker_b.get("article", article_id="1") is None, name
+
+            worker_a.set("article", {"title": "v2"}, _tags=["article:1"], article_id="1")
+            assert worker_b.get("article", article_id="1") == {"title": "v2"}, name
+            worker_a.invalidate("article:1")
+            assert worker_b.get("article", article_id="1") is None, name
+    finally:
+        redis.close()
+
+
+def test_selective_invalidation():
+    redis, items = backends()
+    try:
+        for name, create in items:
+            worker_a, worker_b = make_worker(create()), make_worker(create())
+            for article_id in ("1", "2"):
+                worker_a.set("article", {"id": article_id}, _tags=[f"article:{article_id}"], article_id=article_id)
+                assert worker_b.get("article", article_id=article_id) == {"id": article_id}, name
+            worker_b.set("home", {"page": "home"})
+            worker_a.get("home")
+            # B 的进程内缓存只删除带 article:1 标签的条目，A 自己的失效不清空自己的进程内缓存
+            worker_a.invalidate("article:1")
+            assert worker_b.get("article", article_id="1") is None, name
+            hits = worker_b.memory.hits
+            assert worker_b.get("article", article_id="2") == {"id": "2"} and worker_b.memory.hits == hits + 1, name
+            hits = worker_a.memory.hits
+            assert worker_a.get("home") == {"page": "home"} and worker_a.memory.hits == hits + 1, name
+            assert worker_a._version == worker_a.backend.version(), name
+
+            # 按键删除和按前缀清除同样只影响对应的条目
+            worker_b.delete("article", article_id="2")
+            assert worker_a.get("article", article_id="2") is None, name
+            hits = worker_a.memory.hits
+            assert worker_a.get("home") == {"page": "home"} and worker_a.memory.hits == hits + 1, name
+            worker_b.clear("home")
+            assert worker_a.get("home") is None, name
+    finally:
+        redis.close()
+
+
+def test_redis_invalidation_pushed():
+    redis = FakeRedis()
+    try:
+        worker_a = make_worker(RedisCacheBackend(redis.url, "views", prefix="test"))
+        worker_b = make_worker(RedisCacheBackend(redis.url, "views", prefix="test"))
+        # 订阅后不再轮询，只在收到通知时同步
+        worker_b.sync_interval = 3600
+        worker_a.set("article", {"title": "v1"}, _tags=["article:1"], article_id="1")
+        assert worker_b.get("article", article_id="1") == {"title": "v1"}
+        deadline = time.time() + 5
+        while not worker_b._listening and time.time() < deadline:
+            time.sleep(0.01)
+        worker_b.get("article", article_id="1")
+        assert worker_b._listening and worker_b._next_sync == float("inf")
+
+        worker_a.invalidate("article:1")
+        deadline = time.time() + 5
+        while worker_b._next_sync and time.time() < deadline:
+            time.sleep(0.01)
+        assert worker_b.get("article", article_id="1") is None
+    finally:
+        redis.close()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name} 通过")
@@ -0,0 +1,89 @@
+"""
+测试文章正文存储（SQLite存储和追加写的段文件存储）
+
+数据写入临时目录：
+    python -m pytest -q test_content_store.py
+    或者
+    python test_content_store.py
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+
+from core.content_store import ContentStore, SegmentContentStore
+
+
+def content(n: int, body: str = None) -> dict:
+    return {"id": str(n), "title": f"文章{n}", "content": body or f"<p>正文{n}</p>" * 20, "publish_time": 1700000000 + n,
+            "mp_id": "MP_WXS_1", "pic_url": "", "mp_name": "公众号"}
+
+
+def stores():
+    base = os.path.join(tempfile.mkdtemp(), "content")
+    return [
+        ("sqlite", lambda: ContentStore(f"{base}.db")),
+        ("segment", lambda: SegmentContentStore(base)),
+        ("segment-gzip", lambda: SegmentContentStore(f"{base}-gzip", compress="gzip")),
+    ]
+
+
+def test_put_get_delete():
+    for name, create in stores():
+        a, b = create(), create()
+        a.put_many({"1": content(1), "2": content(2)})
+        assert b.get("1") == content(1) and b.get("3") is None, name
+        if hasattr(b, "get_parts"):
+            meta, body = b.get_parts("2")
+            assert "content" not in meta and str(body, "utf-8") == content(2)["content"], name
+        # 覆盖写入以最后一次为准，删除后读不到
+        a.put("1", content(1, "新的正文"))
+        assert b.get("1")["content"] == "新的正文", name
+        b.delete_many(["1", "missing"])
+        assert a.get("1") is None and a.get("2") == content(2), name
+
+
+def test_segment_compaction():
+    base = os.path.join(tempfile.mkdtemp(), "content")
+    store = SegmentContentStore(base, compact_min_bytes=1 << 30)
+    for round_ in range(5):
+        store.put_many({str(n): content(n, f"第{round_}次写入" * 50) for n in range(20)})
+    store.delete_many([str(n) for n in range(10)])
+    stats = store.stats()
+    assert stats["items"] == 10 and stats["dead"] > stats["live"]
+    result = store.compact()
+    assert result["after"] < result["before"] and result["after"] == store.stats()["live"]
+    # 压缩后本进程和其他实例（相当于其他进程）读到的都是最新内容
+    other = SegmentContentStore(base)
+    for n in range(20):
+        expected = content(n, "第4次写入" * 50) if n >= 10 else None
+        assert store.get(str(n)) == expected and other.get(str(n)) == expected
+    # 压缩后继续追加写入
+    store.put("30", content(30))
+    assert other.get("30") == content(30)
+
+
+def test_segment_auto_compaction():
+    base = os.path.join(tempfile.mkdtemp(), "content")
+    store = SegmentContentStore(base, compact_ratio=0.5, compact_min_bytes=1)
+    store.put("1", content(1))
+    for _ in range(3):
+        store.put("1", content(1))
+    # 无效数据超过一半时写入后自动压缩，只剩一条记录
+    assert store.stats()["dead"] == 0 and store.get("1") == content(1)
+
+
+def test_import_creates_no_files():
+    cwd = tempfile.mkdtemp()
+    root = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-c", "import core.content_store"], cwd=cwd, check=True,
+                   env=dict(os.environ, PYTHONPATH=root), capture_output=True)
+    assert os.listdir(cwd) == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,94 @@
+"""
+测试订阅源缓存文件的条件请求：进程内校验值有效和过期后都能返回304和缓存头
+
+缓存文件写入临时目录，不需要config.yaml和数据库：
+    python -m pytest -q test_feed_validators.py
+    或者
+    python test_feed_validators.py
+"""
+
+import os
+import tempfile
+
+from core.config import cfg
+
+# 没有config.yaml时为模块级的DB提供一个临时库，保证apis.rss可以导入
+cfg.config.setdefault("db", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "default.db"))
+
+from starlette.requests import Request
+from apis.rss import cached_response
+from core.rss import RSS, FeedValidators
+from core.cache_backend import FileCacheBackend
+
+ETAG = 'W/"0123456789abcdef"'
+LAST_MODIFIED = 1700000000
+ITEMS = [{"id": "1", "title": "文章1", "link": "https://example.com/1", "description": "摘要", "content": "",
+          "image": "", "mp_name": "公众号", "publish_time": LAST_MODIFIED, "feed": {"id": "MP_WXS_1"}}]
+
+
+def make_request(**headers) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/feed/MP_WXS_1.rss", "query_string": b"", "headers": raw})
+
+
+def make_feed(cache_dir: str, version: str = "1.0-a") -> RSS:
+    rss = RSS(name="MP_WXS_1", cache_dir=cache_dir, ext="rss")
+    rss.set_version(version)
+    return rss
+
+
+def publish_feed(cache_dir: str) -> RSS:
+    rss = make_feed(cache_dir)
+    rss.set_validator(ETAG, LAST_MODIFIED)
+    rss.generate(ITEMS, ext="rss", title="公众号")
+    return rss
+
+
+def test_304_with_live_validator():
+    cache_dir = tempfile.mkdtemp()
+    rss = publish_feed(cache_dir)
+    validators = FeedValidators(max_age=300, backend=FileCacheBackend(tempfile.mkdtemp()))
+    validators.set(rss.rss_file, ETAG, LAST_MODIFIED, rss.version)
+    validator = validators.get(rss.rss_file, rss.version)
+    assert validator == (ETAG, LAST_MODIFIED)
+    response = cached_response(rss, make_request(if_none_match=ETAG), validator, {})
+    assert response.status_code == 304 and response.headers["ETag"] == ETAG
+
+
+def test_304_after_validator_expired():
+    cache_dir = tempfile.mkdtemp()
+    publish_feed(cache_dir)
+    # 新的请求（或其他进程）：进程内校验值已过期，只有缓存文件和版本记录
+    rss = make_feed(cache_dir)
+    assert rss.is_current()
+    response = cached_response(rss, make_request(if_none_match=ETAG), None, {})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == ETAG and "max-age" in response.headers["Cache-Control"]
+
+    response = cached_response(rss, make_request(if_modified_since="Wed, 15 Nov 2023 00:00:00 GMT"), None, {})
+    assert response.status_code == 304
+
+    # 不带条件或校验值不一致时返回缓存内容，同样带上校验值和缓存头
+    for request in (make_request(), make_request(if_none_match='W/"other"')):
+        response = cached_response(rss, request, None, {})
+        assert response.status_code == 200 and b"<rss" in response.body
+        assert response.headers["ETag"] == ETAG and "Last-Modified" in response.headers
+        assert "max-age" in response.headers["Cache-Control"]
+
+
+def test_no_validator_without_record():
+    cache_dir = tempfile.mkdtemp()
+    rss = make_feed(cache_dir)
+    # 未设置校验值生成的缓存（如旧版本写入的版本记录）不返回304
+    rss.generate(ITEMS, ext="rss", title="公众号")
+    rss = make_feed(cache_dir)
+    assert rss.is_current() and rss.cached_validator() is None
+    response = cached_response(rss, make_request(if_none_match=ETAG), None, {})
+    assert response.status_code == 200 and "ETag" not in response.headers
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,95 @@
+"""
+测试文章列表的 (publish_time, id) 游标分页：游标编解码，以及发布时间相同时翻页不重复、不遗漏
+
+使用临时SQLite数据库，不需要config.yaml和外部数据库：
+    python -m pytest -q test_pagination.py
+    或者
+    python test_pagination.py
+"""
+
+import os
+import tempfile
+
+from core.config import cfg
+
+# 没有config.yaml时为模块级的DB提供一个临时库，保证core.db可以导入
+cfg.config.setdefault("db", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "default.db"))
+
+from core.db import Db
+from core.models.article import Article
+from core.models.feed import Feed
+from core.pagination import encode_cursor, decode_cursor, apply_cursor, fetch_page, InvalidCursor
+
+MP_ID = "MP_WXS_1"
+# 多篇文章发布时间相同，且相同时间的文章跨越分页边界
+PUBLISH_TIMES = [1700000000] * 5 + [1700000100] * 4 + [1700000200, 1700000300] + [1700000400] * 3
+
+
+def make_db() -> Db:
+    db = Db(tag="分页测试")
+    db.init("sqlite:///" + os.path.join(tempfile.mkdtemp(), "pagination.db"))
+    db.create_tables()
+    db.add_articles([{"id": str(n), "mp_id": MP_ID, "title": f"文章{n}", "url": f"https://example.com/{n}",
+                      "publish_time": publish_time} for n, publish_time in enumerate(PUBLISH_TIMES)])
+    return db
+
+
+def walk(make_query, limit: int, desc: bool = True, article_of=lambda row: row) -> list:
+    """从第一页开始按游标翻到最后一页，返回依次取到的文章id"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = apply_cursor(make_query(), decode_cursor(cursor), desc=desc)
+        rows, cursor = fetch_page(query, limit, article_of=article_of)
+        ids.extend(article_of(row).id for row in rows)
+        pages += 1
+        assert pages <= len(PUBLISH_TIMES) + 1, "游标没有前进"
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    for publish_time, article_id in ((1700000000, "3192178-2247483647_1"), (0, ""), (1, "含中文/+=?")):
+        cursor = encode_cursor(publish_time, article_id)
+        # 游标可直接放进URL查询参数
+        assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+        assert decode_cursor(cursor) == (publish_time, article_id)
+    assert decode_cursor(encode_cursor(None, 12)) == (0, "12")
+    assert decode_cursor("") is None and decode_cursor(None) is None
+
+
+def test_invalid_cursor():
+    for cursor in ("not-a-cursor", "e30", encode_cursor(1, "a")[:-3] + "!!!"):
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            continue
+        raise AssertionError(f"应当拒绝游标 {cursor}")
+
+
+def test_pages_with_equal_publish_time():
+    db = make_db()
+    session = db.get_session()
+    expected_desc = [a.id for a in session.query(Article).order_by(Article.publish_time.desc(), Article.id.desc())]
+    assert len(expected_desc) == len(PUBLISH_TIMES)
+    for limit in (1, 2, 3, 4, len(PUBLISH_TIMES), len(PUBLISH_TIMES) + 1):
+        assert walk(lambda: session.query(Article), limit) == expected_desc, limit
+        assert walk(lambda: session.query(Article), limit, desc=False) == expected_desc[::-1], limit
+
+
+def test_joined_query_pages():
+    db = make_db()
+    session = db.get_session()
+    session.add(Feed(id=MP_ID, mp_name="公众号"))
+    session.commit()
+    # 与文章列表视图一样联表查询，从结果行中取出Article
+    make_query = lambda: session.query(Article, Feed.mp_name).join(Feed, Feed.id == Article.mp_id)
+    ids = walk(make_query, 4, article_of=lambda row: row[0])
+    assert ids == walk(lambda: session.query(Article), 4)
+    assert len(set(ids)) == len(PUBLISH_TIMES)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,106 @@
+"""
+测试订阅源访问记录的跨进程合并、衰减和淘汰，以及采集后按访问记录选择预生成的变体
+
+访问记录写入临时目录的文件缓存后端，不需要config.yaml和数据库：
+    python -m pytest -q test_prerender.py
+    或者
+    python test_prerender.py
+"""
+
+import json
+import time
+import tempfile
+
+from core.prerender import FeedAccessLog, FeedPrerenderer
+from core.cache_backend import FileCacheBackend
+
+MP_ID = "MP_WXS_1"
+
+
+def variant(feed_id: str = MP_ID, tag_id: str = None, limit: int = 10, ext: str = "rss") -> tuple:
+    path = f"/feed/{feed_id or 'tag/' + tag_id}.{ext}"
+    return (path, feed_id, tag_id, ext, limit, "", "https://rss.example.com/")
+
+
+def make_log(directory: str, **kwargs) -> FeedAccessLog:
+    return FeedAccessLog(backend=FileCacheBackend(directory), **kwargs)
+
+
+def test_counts_merged_across_processes():
+    directory = tempfile.mkdtemp()
+    # 每次访问都合并的进程和按间隔合并的进程共用一个后端
+    eager = make_log(directory, flush_interval=0)
+    lazy = make_log(directory, flush_interval=3600)
+    gather = make_log(directory)
+    for _ in range(3):
+        eager.record(variant())
+    # 首次访问立即合并，之后的访问留在本进程直到下次同步
+    lazy.record(variant())
+    lazy.record(variant())
+    assert lazy.stats()["pending_hits"] == 1
+    assert gather.hot(lambda v: True, 10, 4.5) == []
+    lazy.sync()
+    assert lazy.stats()["pending_hits"] == 0
+    assert gather.hot(lambda v: True, 10, 4.5) == [variant()]
+    assert gather.stats()["variants"] == 1 and gather.stats()["top"][0]["score"] > 4.9
+
+
+def test_hot_ranking_and_filter():
+    log = make_log(tempfile.mkdtemp(), flush_interval=0)
+    for hits, item in ((5, variant(limit=5)), (3, variant(limit=20)), (1, variant(limit=50)), (4, variant("MP_WXS_2"))):
+        for _ in range(hits):
+            log.record(item)
+    ours = lambda v: v[1] == MP_ID
+    assert log.hot(ours, 10, 2) == [variant(limit=5), variant(limit=20)]
+    assert log.hot(ours, 1, 0) == [variant(limit=5)]
+    assert log.hot(lambda v: True, 10, 3.5) == [variant(limit=5), variant("MP_WXS_2")]
+
+
+def test_decay_and_capacity():
+    directory = tempfile.mkdtemp()
+    backend = FileCacheBackend(directory)
+    now = time.time()
+    # 两个半衰期前的8次访问只相当于现在的2次
+    backend.set("access", json.dumps([[list(variant(limit=1)), 8, now - 2 * 3600],
+                                      [list(variant(limit=2)), 3, now]]).encode("utf-8"))
+    log = make_log(directory, half_life=3600, max_entries=2, flush_interval=3600)
+    assert log.hot(lambda v: True, 10, 0) == [variant(limit=2), variant(limit=1)]
+    # 超过容量时淘汰得分最低的记录：本进程累计的访问合并后挤掉衰减后的记录
+    for _ in range(5):
+        log.record(variant(limit=3))
+    assert log.stats()["pending_hits"] == 5
+    assert log.hot(lambda v: True, 10, 0) == [variant(limit=3), variant(limit=2)]
+    assert make_log(directory).hot(lambda v: True, 10, 0) == [variant(limit=3), variant(limit=2)]
+
+
+def test_prerender_variants_of_feed():
+    prerender = FeedPrerenderer()
+    prerender.interval = 0
+    prerender.min_hits = 2
+    prerender.access_log = make_log(tempfile.mkdtemp(), flush_interval=0)
+    prerender._tag_ids = lambda mp_id: {"tag1"}
+    expected = [variant(), variant("all"), variant(None, "tag1")]
+    for item in expected + [variant("MP_WXS_2"), variant(None, "tag2")]:
+        for _ in range(3):
+            prerender.record(item)
+    prerender.record(variant(limit=50))
+
+    rendered = []
+    prerender.set_renderer(rendered.append)
+    prerender._run(MP_ID)
+    # 只生成该公众号、全部文章源和所属标签中达到访问次数的变体
+    assert sorted(rendered, key=str) == sorted(expected, key=str)
+    assert prerender.rendered == 3 and prerender.failed == 0
+
+    def fail(item):
+        raise RuntimeError("render failed")
+    prerender.set_renderer(fail)
+    prerender._run(MP_ID)
+    assert prerender.failed == 3
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,155 @@
+"""
+测试图片反向代理：流式转发和缓存、不跟随重定向、各种结束方式下都释放每个域名的并发名额
+
+用本地HTTP服务模拟上游图片服务器（代理的域名改写到本地地址），不访问外部网络：
+    python -m pytest -q test_proxy.py
+    或者
+    python test_proxy.py
+"""
+
+import os
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.config import cfg
+
+# 代理缓存写入临时目录
+cfg.config.setdefault("cache", {"dir": tempfile.mkdtemp()})
+
+import httpx
+from fastapi import FastAPI
+from apis import res
+
+IMAGE = b"x" * 5000
+
+
+class Upstream:
+    """本地替身上游：/redirect 返回302，/missing 返回404，其余返回图片"""
+
+    def __init__(self):
+        self.calls = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                upstream.calls.append(self.path)
+                if self.path.startswith("/redirect"):
+                    self.send_response(302)
+                    self.send_header("Location", "http://169.254.169.254/latest")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if self.path.startswith("/missing"):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "2")
+                    self.end_headers()
+                    self.wfile.write(b"nf")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(IMAGE)))
+                self.end_headers()
+                self.wfile.write(IMAGE)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Rewrite(httpx.AsyncBaseTransport):
+    """把对微信图片域名的请求改写到本地上游"""
+
+    def __init__(self, port: int, fail: Exception = None):
+        self.port = port
+        self.fail = fail
+        self.transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        if self.fail is not None:
+            raise self.fail
+        request.url = request.url.copy_with(host="127.0.0.1", port=self.port)
+        return await self.transport.handle_async_request(request)
+
+
+def run(upstream: Upstream, paths, fail: Exception = None):
+    """用替身连接池依次请求代理，返回响应和请求结束后mmbiz.qpic.cn的剩余名额"""
+    app = FastAPI()
+    app.include_router(res.router)
+
+    async def main():
+        res.CACHE_DIR = tempfile.mkdtemp()
+        res.PROXY._bind()
+        res.PROXY._client = httpx.AsyncClient(transport=Rewrite(upstream.server.server_address[1], fail))
+        responses = []
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for path in paths:
+                try:
+                    responses.append(await client.get(f"/res/logo/http://mmbiz.qpic.cn{path}"))
+                except (Exception, asyncio.CancelledError) as e:
+                    responses.append(e)
+        free = res.PROXY.limit("mmbiz.qpic.cn")._value
+        await res.PROXY.close()
+        return responses, free
+
+    return asyncio.run(main())
+
+
+def test_stream_and_cache():
+    upstream = Upstream()
+    try:
+        (first, second), free = run(upstream, ["/a.png", "/a.png"])
+        assert first.status_code == 200 and first.content == IMAGE
+        assert first.headers["content-type"] == "image/png"
+        # 第二次命中缓存，不再请求上游
+        assert second.status_code == 200 and second.content == IMAGE
+        assert upstream.calls == ["/a.png"] and free == res.PROXY.per_host
+        assert not [name for name in os.listdir(res.CACHE_DIR) if name.endswith(".tmp")]
+    finally:
+        upstream.close()
+
+
+def test_redirect_not_followed():
+    upstream = Upstream()
+    try:
+        (response, missing, again), free = run(upstream, ["/redirect.png", "/missing.png", "/missing.png"])
+        assert response.status_code == 302
+        assert response.headers["location"] == "http://169.254.169.254/latest"
+        # 302原样返回，没有跟随到其他地址；404不缓存，再次请求仍转发到上游
+        assert missing.status_code == 404 and again.status_code == 404
+        assert upstream.calls == ["/redirect.png", "/missing.png", "/missing.png"]
+        assert free == res.PROXY.per_host
+    finally:
+        upstream.close()
+
+
+def test_permit_released_on_errors():
+    upstream = Upstream()
+    try:
+        # 连接失败返回502
+        (response,), free = run(upstream, ["/a.png"], fail=httpx.ConnectError("refused"))
+        assert response.status_code == 502 and free == res.PROXY.per_host
+        # 非httpx异常（以及请求被取消）同样释放名额
+        (response,), free = run(upstream, ["/a.png"], fail=RuntimeError("boom"))
+        assert isinstance(response, RuntimeError) and free == res.PROXY.per_host
+        (response,), free = run(upstream, ["/a.png"], fail=asyncio.CancelledError())
+        assert free == res.PROXY.per_host
+        assert upstream.calls == []
+    finally:
+        upstream.close()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
@@ -0,0 +1,89 @@
+"""
+测试订阅源日期格式化：整数时间戳直接拼接的北京时间RFC 822/ISO 8601字符串与datetime格式化结果一致
+
+不需要config.yaml和数据库：
+    python -m pytest -q test_rss_dates.py
+    或者
+    python test_rss_dates.py
+"""
+
+import random
+import tempfile
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
+
+from core.rss import RSS, CST, format_rfc822, format_iso, format_dates, _day_prefix
+
+# 北京时间的日、月、年边界（UTC 16:00 即北京时间次日0点）、闰日以及1970年以前
+TIMESTAMPS = [
+    0, 1, -1, -8 * 3600, -8 * 3600 - 1, 86399, 57599, 57600,
+    int(datetime(2023, 12, 31, 15, 59, 59, tzinfo=timezone.utc).timestamp()),
+    int(datetime(2023, 12, 31, 16, 0, 0, tzinfo=timezone.utc).timestamp()),
+    int(datetime(2024, 2, 28, 16, 0, 0, tzinfo=timezone.utc).timestamp()),
+    int(datetime(2024, 2, 29, 23, 59, 59, tzinfo=CST).timestamp()),
+    int(datetime(1969, 12, 31, 23, 0, 0, tzinfo=CST).timestamp()),
+    int(datetime(2099, 12, 31, 23, 59, 59, tzinfo=CST).timestamp()),
+    1700000000,
+]
+
+
+def expected_rfc822(timestamp: int) -> str:
+    return format_datetime(datetime.fromtimestamp(timestamp, tz=CST))
+
+
+def expected_iso(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=CST).isoformat()
+
+
+def samples() -> list:
+    rng = random.Random(20231114)
+    return TIMESTAMPS + [rng.randrange(0, 4102444800) for _ in range(2000)]
+
+
+def test_format_matches_datetime():
+    for timestamp in samples():
+        assert format_rfc822(timestamp) == expected_rfc822(timestamp), timestamp
+        assert format_iso(timestamp) == expected_iso(timestamp), timestamp
+
+
+def test_day_boundary():
+    midnight = int(datetime(2024, 3, 1, tzinfo=CST).timestamp())
+    assert format_rfc822(midnight - 1) == "Thu, 29 Feb 2024 23:59:59 +0800"
+    assert format_rfc822(midnight) == "Fri, 01 Mar 2024 00:00:00 +0800"
+    assert format_iso(midnight - 1) == "2024-02-29T23:59:59+08:00"
+    assert format_iso(midnight) == "2024-03-01T00:00:00+08:00"
+    # 同一天的日期部分只计算一次
+    day = (midnight + 8 * 3600) // 86400
+    assert _day_prefix(day) is _day_prefix(day)
+    assert _day_prefix(day) == ("Fri, 01 Mar 2024 ", "2024-03-01T")
+
+
+def test_format_dates_and_float_input():
+    timestamps = samples()[:50]
+    assert format_dates(timestamps) == [expected_rfc822(t) for t in timestamps]
+    assert format_dates(timestamps, fmt=format_iso) == [expected_iso(t) for t in timestamps]
+    # 数据库中的时间戳可能是浮点数或字符串，按整数秒处理
+    assert format_rfc822(1700000000.9) == format_rfc822("1700000000") == expected_rfc822(1700000000)
+
+
+def test_datetime_to_rfc822():
+    rss = RSS(name="MP_WXS_1", cache_dir=tempfile.mkdtemp(), ext="rss")
+    moment = datetime(2024, 2, 29, 23, 59, 59, tzinfo=CST)
+    # 北京时间、无时区（按北京时间）和字符串走快速路径，其他时区保持原时区
+    assert rss.datetime_to_rfc822(moment) == "Thu, 29 Feb 2024 23:59:59 +0800"
+    assert rss.datetime_to_rfc822(moment.replace(tzinfo=None)) == "Thu, 29 Feb 2024 23:59:59 +0800"
+    assert rss.datetime_to_rfc822("2024-02-29T23:59:59") == "Thu, 29 Feb 2024 23:59:59 +0800"
+    utc = moment.astimezone(timezone.utc)
+    assert rss.datetime_to_rfc822(utc) == "Thu, 29 Feb 2024 15:59:59 +0000"
+    assert rss.datetime_to_rfc822("2024-02-29T15:59:59Z") == "Thu, 29 Feb 2024 15:59:59 +0000"
+    assert rss.datetime_to_rfc822(moment.astimezone(timezone(timedelta(hours=-5)))) == "Thu, 29 Feb 2024 10:59:59 -0500"
+    # 条目有整数发布时间时优先使用
+    assert rss._item_rfc822({"publish_time": 1700000000, "updated": utc}) == expected_rfc822(1700000000)
+    assert rss._item_rfc822({"updated": utc}) == "Thu, 29 Feb 2024 15:59:59 +0000"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"{name} 通过")
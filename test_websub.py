@@ -0,0 +1,161 @@
+"""
+测试内置 WebSub Hub 的安全限制和推送
+
+用本地HTTP服务模拟订阅者（回显challenge并记录推送内容），不访问外部网络：
+    python -m pytest -q test_websub.py
+    或者
+    python test_websub.py
+"""
+
+import hmac
+import hashlib
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from core.websub import WebSubHub, is_public_address
+
+BASE_URL = "https://rss.example.com/"
+TOPIC = "https://rss.example.com/feed/MP_WXS_1.rss?limit=10"
+
+
+class Subscriber:
+    """本地替身订阅者：GET 回显 hub.challenge，POST 记录推送内容"""
+
+    def __init__(self):
+        self.verifications = []
+        self.deliveries = []
+        subscriber = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+                subscriber.verifications.append(query)
+                body = query.get("hub.challenge", "").encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                subscriber.deliveries.append((dict(self.headers), body))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.callback = f"http://127.0.0.1:{self.server.server_address[1]}/callback"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Session:
+    """只记录被删除的订阅"""
+
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, sub):
+        self.deleted.append(sub)
+
+
+def make_hub(allow_private=False):
+    hub = WebSubHub()
+    hub.enabled = True
+    hub.base_url = BASE_URL
+    hub.allow_private = allow_private
+    hub.timeout = 5
+    return hub
+
+
+def make_sub(callback, secret=None):
+    return SimpleNamespace(topic=TOPIC, callback=callback, secret=secret, delivered=0, failures=0,
+                           last_delivered_at=None)
+
+
+def test_disabled_by_default():
+    from core.config import cfg
+    if cfg.get("rss.websub.enabled", None) is None:
+        assert WebSubHub().enabled is False
+
+
+def test_private_addresses_rejected():
+    for host in ("127.0.0.1", "10.1.2.3", "192.168.1.1", "169.254.169.254", "::1", "fe80::1", "0.0.0.0"):
+        assert not is_public_address(host), host
+    assert is_public_address("93.184.216.34")
+
+
+def test_topic_only_on_public_base_url():
+    hub = make_hub()
+    params = hub.topic(TOPIC)
+    assert params is not None and params["base_url"] == BASE_URL and params["feed_id"] == "MP_WXS_1"
+    assert hub.topic("http://169.254.169.254/feed/MP_WXS_1.rss") is None
+    assert hub.topic("https://evil.example.com/feed/MP_WXS_1.rss") is None
+    assert hub.topic("https://rss.example.com/other/feed/MP_WXS_1.rss") is None
+    hub.base_url = ""
+    assert hub.topic(TOPIC) is None
+
+
+def test_private_callback_not_contacted():
+    subscriber = Subscriber()
+    try:
+        hub = make_hub(allow_private=False)
+        assert hub.confirm("subscribe", TOPIC, subscriber.callback, 60) is False
+        session = Session()
+        sub = make_sub(subscriber.callback)
+        hub._deliver(session, sub, f"{BASE_URL}feed/hub", "application/xml", b"<rss/>")
+        assert session.deleted == [sub]
+        assert subscriber.verifications == [] and subscriber.deliveries == []
+    finally:
+        subscriber.close()
+
+
+def test_verify_and_deliver_to_local_subscriber():
+    subscriber = Subscriber()
+    try:
+        hub = make_hub(allow_private=True)
+        assert hub.confirm("subscribe", TOPIC, subscriber.callback, 60) is True
+        query = subscriber.verifications[0]
+        assert query["hub.mode"] == "subscribe" and query["hub.topic"] == TOPIC and query["hub.lease_seconds"] == "60"
+
+        session = Session()
+        sub = make_sub(subscriber.callback, secret="s3cret")
+        body = b"<rss><channel><title>t</title></channel></rss>"
+        hub._deliver(session, sub, f"{BASE_URL}feed/hub", "application/rss+xml", body)
+        assert session.deleted == [] and sub.delivered == 1 and sub.failures == 0
+        headers, received = subscriber.deliveries[0]
+        assert received == body
+        assert headers["Content-Type"] == "application/rss+xml"
+        assert f"<{TOPIC}>; rel=\"self\"" in headers["Link"]
+        expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        assert headers["X-Hub-Signature"] == f"sha256={expected}"
+    finally:
+        subscriber.close()
+
+
+def test_pending_verifications_limited_per_host():
+    hub = make_hub()
+    hub.max_per_host = 2
+    submitted = []
+    hub._submit = lambda task, *args: submitted.append(args)
+    form = {"hub.mode": "subscribe", "hub.topic": TOPIC, "hub.callback": "https://reader.example.net/cb"}
+    assert hub.request(form) is None
+    assert hub.request(dict(form, **{"hub.callback": "https://reader.example.net/cb2"})) is None
+    assert hub.request(dict(form, **{"hub.callback": "https://reader.example.net/cb3"})) is not None
+    assert hub.request(dict(form, **{"hub.callback": "https://other.example.net/cb"})) is None
+    assert hub.request(dict(form, **{"hub.topic": "https://evil.example.com/feed/MP_WXS_1.rss"})) is not None
+    assert len(submitted) == 3
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name} 通过")
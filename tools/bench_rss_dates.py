@@ -0,0 +1,67 @@
+"""
+RSS日期格式化基准：对比旧流程（datetime.fromtimestamp -> str -> fromisoformat -> strftime）
+与从整数 publish_time 直接格式化的快速流程，并校验两者输出一致
+
+用法（在项目根目录执行）:
+    python -m tools.bench_rss_dates [条目数，默认10000]
+"""
+import sys
+import random
+import timeit
+from datetime import datetime, timezone, timedelta
+from core.rss import format_iso, format_dates
+from core.print import print_info, print_success, print_error
+
+
+def sample_timestamps(count: int) -> list:
+    """模拟公众号文章发布时间：最近两年内随机分布"""
+    now = int(datetime.now().timestamp())
+    rnd = random.Random(count)
+    return [now - rnd.randint(0, 2 * 365 * 86400) for _ in range(count)]
+
+
+def legacy_rfc822(timestamps: list) -> list:
+    """原流程：逐条构造datetime，转字符串后重新解析再格式化"""
+    result = []
+    for ts in timestamps:
+        cst = timezone(timedelta(hours=8))
+        updated = datetime.fromtimestamp(ts, tz=cst)
+        dt_obj = datetime.fromisoformat(str(updated))
+        if dt_obj.tzinfo is None:
+            dt_obj = dt_obj.replace(tzinfo=timezone(timedelta(hours=8)))
+        result.append(dt_obj.strftime('%a, %d %b %Y %H:%M:%S %z'))
+    return result
+
+
+def legacy_iso(timestamps: list) -> list:
+    cst = timezone(timedelta(hours=8))
+    return [datetime.fromtimestamp(ts, tz=cst).isoformat() for ts in timestamps]
+
+
+def bench(count: int = 10000, repeat: int = 5) -> dict:
+    timestamps = sample_timestamps(count)
+    if legacy_rfc822(timestamps) != format_dates(timestamps):
+        raise AssertionError("RFC 822 输出与原流程不一致")
+    if legacy_iso(timestamps) != format_dates(timestamps, format_iso):
+        raise AssertionError("ISO 8601 输出与原流程不一致")
+    cases = {
+        "RFC 822 原流程": lambda: legacy_rfc822(timestamps),
+        "RFC 822 快速流程": lambda: format_dates(timestamps),
+        "ISO 8601 原流程": lambda: legacy_iso(timestamps),
+        "ISO 8601 快速流程": lambda: format_dates(timestamps, format_iso),
+    }
+    return {name: min(timeit.repeat(case, number=1, repeat=repeat)) for name, case in cases.items()}
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    try:
+        results = bench(count)
+    except AssertionError as e:
+        print_error(str(e))
+        sys.exit(1)
+    print_success(f"{count} 条日期格式化，输出与原流程一致")
+    for name, seconds in results.items():
+        print_info(f"    {name}: {seconds * 1000:.2f} ms")
+    print_success(f"RFC 822 加速 {results['RFC 822 原流程'] / results['RFC 822 快速流程']:.1f} 倍，"
+                  f"ISO 8601 加速 {results['ISO 8601 原流程'] / results['ISO 8601 快速流程']:.1f} 倍")
@@ -9,6 +9,6 @@ def fix_html(content:str):
     content=convert_markdown_to_html(content)
     return content
 def fix_article(article):
-    art=article.to_dict()
+    art=article.to_dict(include_content=True)
     art['content']=fix_html(art['content'])
     return art
\ No newline at end of file
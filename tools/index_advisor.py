@@ -0,0 +1,112 @@
+"""
+索引顾问：对应用中常见的文章/公众号查询执行 EXPLAIN，报告全表扫描和额外排序
+
+用法（在项目根目录执行）:
+    python -m tools.index_advisor
+"""
+import sys
+from sqlalchemy import or_, text
+from core.db import DB
+from core.models.article import Article
+from core.models.feed import Feed
+from core.models.tag_feed import TagFeed
+from core.print import print_info, print_success, print_warning, print_error
+
+
+def _sample_mp_ids(session, limit: int = 3) -> list:
+    ids = [row[0] for row in session.query(Feed.id).limit(limit).all()]
+    return ids or ["MP_WXS_0"]
+
+
+def _sample_tag_id(session) -> str:
+    row = session.query(TagFeed.tag_id).first()
+    return row[0] if row else "0"
+
+
+def query_shapes(session) -> dict:
+    """应用中的典型查询（与 apis/rss、views、jobs 中的写法保持一致）"""
+    mp_ids = _sample_mp_ids(session)
+    tag_id = _sample_tag_id(session)
+    return {
+        "公众号RSS (apis/rss.get_mp_articles_source)": session.query(Article.id)
+            .filter(Article.mp_id == mp_ids[0], Article.status == 1)
+            .order_by(Article.publish_time.desc()).limit(10),
+        "全部RSS (apis/rss.get_mp_articles_source)": session.query(Article.id)
+            .filter(Article.status == 1)
+            .order_by(Article.publish_time.desc()).limit(10),
+        "标签RSS (apis/rss.get_mp_articles_source)": session.query(Article.id)
+            .join(TagFeed, TagFeed.mp_id == Article.mp_id)
+            .filter(TagFeed.tag_id == tag_id, Article.status == 1)
+            .order_by(Article.publish_time.desc()).limit(10),
+        "文章列表 (views/articles.articles_view)": session.query(Article.id)
+            .filter(Article.status == 1, Article.mp_id == mp_ids[0])
+            .order_by(Article.publish_time.desc()).limit(5),
+        "公众号文章数 (views/base.get_mps_view)": session.query(Article.mp_id)
+            .filter(Article.mp_id == mp_ids[0], Article.status == 1),
+        "待补全正文 (jobs/fetch_no_article)": session.query(Article.id)
+            .filter(or_(Article.has_content == 0, Article.has_content.is_(None))).limit(10),
+    }
+
+
+def _explain(conn, dialect: str, sql: str) -> list:
+    """执行EXPLAIN并返回 (计划描述, 是否全表扫描, 是否额外排序) 列表"""
+    findings = []
+    if dialect == "sqlite":
+        for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            detail = str(row[-1])
+            full_scan = detail.startswith("SCAN") and "USING" not in detail
+            findings.append((detail, full_scan, "TEMP B-TREE" in detail))
+    elif dialect in ("mysql", "mariadb"):
+        result = conn.execute(text(f"EXPLAIN {sql}"))
+        for row in result.mappings():
+            extra = str(row.get("Extra") or "")
+            detail = f"table={row.get('table')} type={row.get('type')} key={row.get('key')} {extra}"
+            findings.append((detail, row.get("type") == "ALL", "filesort" in extra))
+    elif dialect == "postgresql":
+        for row in conn.execute(text(f"EXPLAIN {sql}")):
+            detail = str(row[0])
+            findings.append((detail, "Seq Scan" in detail, detail.strip().startswith("Sort")))
+    else:
+        raise ValueError(f"不支持的数据库类型: {dialect}")
+    return findings
+
+
+def advise() -> int:
+    """分析所有查询，返回存在问题的查询数量"""
+    engine = DB.get_engine()
+    dialect = engine.dialect.name
+    session = DB.get_session()
+    problems = 0
+    try:
+        with engine.connect() as conn:
+            for name, query in query_shapes(session).items():
+                sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+                findings = _explain(conn, dialect, sql)
+                bad = [f for f in findings if f[1] or f[2]]
+                if bad:
+                    problems += 1
+                    print_warning(f"[需要优化] {name}")
+                else:
+                    print_success(f"[正常] {name}")
+                for detail, full_scan, sort in findings:
+                    tips = []
+                    if full_scan:
+                        tips.append("全表扫描")
+                    if sort:
+                        tips.append("额外排序")
+                    print_info(f"    {detail}" + (f"  <- {'、'.join(tips)}" if tips else ""))
+    finally:
+        session.close()
+    if problems:
+        print_warning(f"共 {problems} 个查询存在全表扫描或额外排序，请执行 python main.py -init True 同步索引")
+    else:
+        print_success("所有查询均命中索引")
+    return problems
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(1 if advise() else 0)
+    except Exception as e:
+        print_error(f"索引分析失败: {e}")
+        sys.exit(2)
@@ -1,6 +1,8 @@
 from .md2doc import MarkdownToWordConverter
 from core.models import Article
 from core.db import DB
+from sqlalchemy.orm import undefer
+from core.pagination import apply_cursor
 from datetime import datetime
 import json
 import csv
@@ -111,27 +113,30 @@ def process_articles(session, mp_id=None,doc_id=None, page_size=10, page_count=1
     record_count = 0
     i = 0
     is_break=False
+    cursor=None
     while True:
         if is_break:
             break
         if page_count != 0 and i >= page_count:
             break
             
-        query = session.query(Article).filter(Article.content != None).where(Article.status == 1)
+        query = session.query(Article).options(undefer(Article.content)).filter(Article.has_content == 1).where(Article.status == 1)
         if mp_id:
             query = query.where(Article.mp_id.in_(mp_id.split(",")))
         if doc_id:
             query = query.where(Article.id.in_(doc_id))
             is_break=True   
 
-        query = query.order_by(Article.publish_time.desc(), Article.id.desc())
+        # 按 (publish_time, id) 游标翻页，避免OFFSET越翻越慢
+        query = apply_cursor(query, cursor)
         if is_break==False:
-            query=query.offset(i * page_size).limit(page_size)
+            query=query.limit(page_size)
         i = i + 1
         arts = query.all()
         
         if arts is None or len(arts) == 0:
             break
+        cursor=(arts[-1].publish_time, arts[-1].id)
             
         for art in arts:
             if process_single_article(art, add_title, remove_images, remove_links, 
@@ -143,7 +148,7 @@ def process_articles(session, mp_id=None,doc_id=None, page_size=10, page_count=1
 
 def export_md_to_doc(mp_id:str=None,doc_id:list=None,page_size:int=10,page_count:int=1,add_title=True,remove_images:bool=True,remove_links:bool=False
                      ,export_md:bool=False,export_docx:bool=False,export_json:bool=False,export_csv:bool=False,export_pdf:bool=True,domain="",zip_filename=None,zip_file=True):
-    session = DB.get_session()
+    session = DB.get_read_session()
     if mp_id==None:
         raise ValueError("公众号ID不能为空")
     docx_path = f"./data/docs/{mp_id}/"
@@ -14,7 +14,7 @@ from apis.base import format_search_kw
 from core.lax.template_parser import TemplateParser
 from views.config import base
 from driver.wxarticle import Web
-from core.cache import cache_view, clear_cache_pattern, data_cache
+from core.cache import cache_view, cache_tags, clear_cache_pattern, data_cache
 # 创建路由器
 router = APIRouter(tags=["文章详情"])
 @router.get("/article/{article_id}", response_class=HTMLResponse, summary="文章详情页")
@@ -29,9 +29,10 @@ async def article_detail_view(
     session = DB.get_session()
     try:
         # 查询文章信息
+        from sqlalchemy.orm import undefer
         article_query = session.query(Article, Feed).join(
             Feed, Article.mp_id == Feed.id
-        ).filter(Article.id == article_id, Article.status == 1, Feed.status == 1).first()
+        ).options(undefer(Article.content)).filter(Article.id == article_id, Article.status == 1, Feed.status == 1).first()
         
         if not article_query:
             raise HTTPException(status_code=404, detail="文章不存在")
@@ -39,6 +40,7 @@ async def article_detail_view(
         if len(article_query) != 2:
             raise HTTPException(status_code=500, detail="数据查询错误")
         article, feed = article_query
+        cache_tags(f"article:{article_id}", f"feed:{article.mp_id}")
         
         # 标记为已读（可选）
         if not article.is_read:
@@ -66,11 +68,13 @@ async def article_detail_view(
         ).order_by(Article.publish_time.asc()).first()
         
         related_list = []
+        # 只为缺少摘要的相关文章加载正文
+        related_contents = DB.get_article_contents([a.id for a in related_articles if not a.description])
         for rel_article in related_articles:
             rel_data = {
                 "id": rel_article.id,
                 "title": rel_article.title,
-                "description": rel_article.description or Web.get_description(rel_article.content),
+                "description": rel_article.description or Web.get_description(related_contents.get(rel_article.id)),
                 "pic_url": Web.get_image_url(rel_article.pic_url),
                 "publish_time": datetime.fromtimestamp(rel_article.publish_time).strftime('%Y-%m-%d %H:%M') if rel_article.publish_time else ""
             }
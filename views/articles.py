@@ -10,11 +10,13 @@ from core.db import DB
 from core.models.article import Article
 from core.models.feed import Feed
 from core.models.tags import Tags
+from core.models.tag_feed import TagFeed
 from apis.base import format_search_kw
 from core.lax.template_parser import TemplateParser
 from views.config import base
 from driver.wxarticle import Web
-from core.cache import cache_view, clear_cache_pattern, data_cache
+from core.cache import cache_view, cache_tags, clear_cache_pattern, data_cache
+from core.pagination import decode_cursor, apply_cursor, fetch_page, InvalidCursor
 
 
 
@@ -31,12 +33,13 @@ async def articles_view(
     tag_id: Optional[str] = Query(None, description="标签ID筛选"),
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     sort: str = Query("publish_time", description="排序方式: publish_time, created_at"),
-    order: str = Query("desc", description="排序顺序: asc, desc")
+    order: str = Query("desc", description="排序顺序: asc, desc"),
+    cursor: Optional[str] = Query(None, description="分页游标（按发布时间排序时有效）")
 ):
     """
     文章列表页面，支持筛选、搜索和排序
     """
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
         # 验证排序参数
         valid_sort_fields = {"publish_time", "created_at"}
@@ -50,20 +53,14 @@ async def articles_view(
         # 预处理标签筛选的mp_ids
         mps_ids = []
         if tag_id:
-            tag = session.query(Tags.mps_id).filter(Tags.id == tag_id, Tags.status == 1).scalar()
-            if tag:
-                try:
-                    mps_data = json.loads(tag)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
+            mps_ids = DB.get_tag_feed_ids([tag_id], active_only=True).get(tag_id, [])
         
         # 构建基础查询条件
         base_conditions = [Article.status == 1]
         if mp_id:
             base_conditions.append(Article.mp_id == mp_id)
         if mps_ids:
-            base_conditions.append(Article.mp_id.in_(mps_ids))
+            base_conditions.append(TagFeed.tag_id == tag_id)
         if keyword and keyword.strip():
             search_filter = format_search_kw(keyword.strip())
             if search_filter is not None:
@@ -72,28 +69,46 @@ async def articles_view(
         # 使用单一查询获取文章和Feed信息
         from sqlalchemy import and_
         
-        # 构建排序
-        if sort == "publish_time":
-            order_clause = Article.publish_time.desc() if order == "desc" else Article.publish_time.asc()
-        else:  # created_at
-            order_clause = Article.created_at.desc() if order == "desc" else Article.created_at.asc()
-        
         # 主查询：一次性获取文章和Feed信息
         query = session.query(Article, Feed).join(
             Feed, Article.mp_id == Feed.id, isouter=True
-        ).filter(and_(*base_conditions)).order_by(order_clause)
-        
-        # 获取总数
-        total = query.count()
+        )
+        if mps_ids:
+            query = query.join(TagFeed, TagFeed.mp_id == Article.mp_id)
+        query = query.filter(and_(*base_conditions))
         
-        # 分页查询
-        offset = (page - 1) * limit
-        articles_data = query.offset(offset).limit(limit).all()
+        # 获取总数：无关键词时读取公众号文章计数表，避免联表COUNT(*)
+        if keyword and keyword.strip():
+            total = query.count()
+        elif mp_id:
+            total = DB.count_articles([mp_id]) if not mps_ids or mp_id in mps_ids else 0
+        elif mps_ids:
+            total = DB.count_articles(mps_ids)
+        else:
+            total = DB.count_articles()
+        
+        # 分页查询：按发布时间排序时使用 (publish_time, id) 游标分页，无游标时回退到offset
+        next_cursor = None
+        if sort == "publish_time":
+            try:
+                cursor_key = decode_cursor(cursor)
+            except InvalidCursor:
+                cursor_key = None
+            query = apply_cursor(query, cursor_key, desc=(order == "desc"))
+            if cursor_key is None:
+                query = query.offset((page - 1) * limit)
+            articles_data, next_cursor = fetch_page(query, limit, article_of=lambda row: row[0])
+        else:  # created_at
+            order_clause = Article.created_at.desc() if order == "desc" else Article.created_at.asc()
+            offset = (page - 1) * limit
+            articles_data = query.order_by(order_clause).offset(offset).limit(limit).all()
         
         # 处理文章数据
         article_list = []
         feed_dict = {}  # 用于后续筛选信息
         
+        # 只为缺少摘要的文章加载正文
+        contents = DB.get_article_contents([article.id for article, _ in articles_data if not article.description])
         for article, feed in articles_data:
             if feed:
                 feed_dict[feed.id] = feed
@@ -101,7 +116,7 @@ async def articles_view(
             article_data = {
                 "id": article.id,
                 "title": article.title,
-                "description": article.description or Web.get_description(article.content),
+                "description": article.description or Web.get_description(contents.get(article.id)),
                 "pic_url": Web.get_image_url(article.pic_url),
                 "url": article.url,
                 "publish_time": datetime.fromtimestamp(article.publish_time).strftime('%Y-%m-%d %H:%M') if article.publish_time else "",
@@ -113,6 +128,15 @@ async def articles_view(
             }
             article_list.append(article_data)
         
+        # 缓存失效标签：页面上的文章，以及筛选范围（新文章入库或清理时按公众号/标签失效）
+        cache_tags(*(f"article:{item['id']}" for item in article_list))
+        if mp_id:
+            cache_tags(f"feed:{mp_id}")
+        if tag_id:
+            cache_tags(f"tag:{tag_id}", *(f"feed:{feed_id}" for feed_id in mps_ids))
+        if not mp_id and not tag_id:
+            cache_tags("feed:all")
+        
         # 获取筛选信息
         filter_info = {}
         if mp_id and mp_id in feed_dict:
@@ -193,6 +217,7 @@ async def articles_view(
             "has_next": has_next,
             "prev_page": prev_page,
             "next_page": next_page,
+            "next_cursor": next_cursor,
             "base_url": "/views/articles?mp_id={mp_id}&tag_id={tag_id}",
             "filter_info": filter_info,
             "tag_options": tag_options,
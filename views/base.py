@@ -10,66 +10,88 @@ from datetime import datetime
 from core.models.tags import Tags
 import json
 #获取公众号视图数据
+def _feeds_page(session, page: int, limit: int):
+    """查询公众号总数和当前页公众号"""
+    total = session.query(Feed).filter(Feed.status == 1).count()
+    offset = (page - 1) * limit
+    feeds = session.query(Feed).filter(Feed.status == 1).order_by(Feed.created_at.desc()).offset(offset).limit(limit).all()
+    return total, feeds
+
+def _tags_page(session, page: int, limit: int):
+    """查询标签总数和当前页标签"""
+    total = session.query(Tags).filter(Tags.status == 1).count()
+    offset = (page - 1) * limit
+    tags = session.query(Tags).filter(Tags.status == 1).order_by(Tags.created_at.desc()).offset(offset).limit(limit).all()
+    return total, tags
+
+def _build_mps_view(feeds, total: int, page: int, limit: int, counts: dict) -> dict:
+    """组装公众号视图数据，counts为 {公众号ID: 文章数}"""
+    feed_list = []
+    for feed in feeds:
+        feed_list.append({
+            "id": feed.id,
+            "name": feed.mp_name,
+            "cover": Web.get_image_url(feed.mp_cover) if feed.mp_cover else "",
+            "intro": feed.mp_intro,
+            "mp_count": 1,  # Feed 本身就是一个公众号
+            "article_count": counts.get(feed.id, 0),
+            "sync_time": datetime.fromtimestamp(feed.sync_time).strftime('%Y-%m-%d %H:%M') if feed.sync_time else "未同步",
+            "created_at": feed.created_at.strftime('%Y-%m-%d') if feed.created_at else ""
+        })
+    
+    # 计算分页信息
+    total_pages = (total + limit - 1) // limit
+    return {
+        "feeds": feed_list,
+        "current_page": page,
+        "total_pages": total_pages,
+        "total_items": total,
+        "limit": limit,
+        "has_prev": page > 1,
+        "has_next": page < total_pages,
+        "breadcrumb": [{"name": "公众号", "url": "/views/mps"}]
+    }
+
+def _build_tags_view(tags, total: int, page: int, limit: int, tag_feeds: dict, counts: dict) -> dict:
+    """组装标签视图数据，标签文章数为所属公众号文章数之和"""
+    tag_list = []
+    for tag in tags:
+        mps_ids = tag_feeds.get(tag.id, [])
+        tag_list.append({
+            "id": tag.id,
+            "name": tag.name,
+            "cover": Web.get_image_url(tag.cover) if tag.cover else "",
+            "intro": tag.intro,
+            "mp_count": len(mps_ids),
+            "article_count": sum(counts.get(mp_id, 0) for mp_id in mps_ids),
+            "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
+            "created_at": tag.created_at.strftime('%Y-%m-%d') if tag.created_at else ""
+        })
+    
+    # 计算分页信息
+    total_pages = (total + limit - 1) // limit
+    return {
+        "tags": tag_list,
+        "current_page": page,
+        "total_pages": total_pages,
+        "total_items": total,
+        "limit": limit,
+        "has_prev": page > 1,
+        "has_next": page < total_pages,
+    }
+
 def get_mps_view(
     page: int ,
-    limit: int 
+    limit: int ,
+    exact: bool = False
 ): 
-    session = DB.get_session()
+    session = DB.get_read_session()
     data={}
     try:
-        # 查询标签总数
-        total = session.query(Feed).filter(Feed.status == 1).count()
-        
-        # 计算偏移量
-        offset = (page - 1) * limit
-
-        # 查询公众号列表
-        feeds = session.query(Feed).filter(Feed.status == 1).order_by(Feed.created_at.desc()).offset(offset).limit(limit).all()
-        
-        # 处理公众号数据
-        feed_list = []
-        for feed in feeds:
-            # 对于 Feed 表，id 就是公众号的 ID
-            mp_id = feed.id
-            
-            # 统计该公众号的文章数量
-            article_count = session.query(Article).filter(
-                Article.mp_id == mp_id,
-                Article.status == 1
-            ).count()
-            
-            feed_data = {
-                "id": feed.id,
-                "name": feed.mp_name,
-                "cover": Web.get_image_url(feed.mp_cover) if feed.mp_cover else "",
-                "intro": feed.mp_intro,
-                "mp_count": 1,  # Feed 本身就是一个公众号
-                "article_count": article_count,
-                "sync_time": datetime.fromtimestamp(feed.sync_time).strftime('%Y-%m-%d %H:%M') if feed.sync_time else "未同步",
-                "created_at": feed.created_at.strftime('%Y-%m-%d') if feed.created_at else ""
-            }
-            feed_list.append(feed_data)
-        
-        # 计算分页信息
-        total_pages = (total + limit - 1) // limit
-        has_prev = page > 1
-        has_next = page < total_pages
-        
-        # 构建面包屑
-        breadcrumb = [
-            {"name": "公众号", "url": "/views/mps"}
-        ]
-        # 使用模板引擎渲染
-        data={
-            "feeds": feed_list,
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "limit": limit,
-            "has_prev": has_prev,
-            "has_next": has_next,
-            "breadcrumb": breadcrumb
-        }
+        total, feeds = _feeds_page(session, page, limit)
+        # 一次批量读取当前页所有公众号的文章数
+        counts = DB.get_article_counts([feed.id for feed in feeds], exact=exact)
+        data = _build_mps_view(feeds, total, page, limit, counts)
     except Exception as e:
         print(e)
     finally:
@@ -81,79 +103,45 @@ def get_mps_view(
 #显示所有标签，支持分页
 def get_tags_view(
     page: int ,
-    limit: int 
+    limit: int ,
+    exact: bool = False
 ):
     """
     显示所有标签，支持分页
+
+    exact=True 时实时统计文章数并校正计数表
     """
-    session = DB.get_session()
+    session = DB.get_read_session()
     data={}
     try:
-        # 查询标签总数
-        total = session.query(Tags).filter(Tags.status == 1).count()
-        
-        # 计算偏移量
-        offset = (page - 1) * limit
-        
-        # 查询标签列表
-        tags = session.query(Tags).filter(Tags.status == 1).order_by(Tags.created_at.desc()).offset(offset).limit(limit).all()
-        
-        # 处理标签数据
-        tag_list = []
-        for tag in tags:
-            # 解析mps_id JSON
-            mps_ids = []
-            if tag.mps_id:
-                try:
-                    mps_data = json.loads(tag.mps_id)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
-            
-            # 统计文章数量
-            article_count = 0
-            if mps_ids:
-                article_count = session.query(Article).filter(
-                    Article.mp_id.in_(mps_ids),
-                    Article.status == 1
-                ).count()
-            
-            # 获取关联的公众号数量
-            mp_count = len(mps_ids) if mps_ids else 0
-            
-            tag_data = {
-                "id": tag.id,
-                "name": tag.name,
-                "cover": Web.get_image_url(tag.cover) if tag.cover else "",
-                "intro": tag.intro,
-                "mp_count": mp_count,
-                "article_count": article_count,
-                "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
-                "created_at": tag.created_at.strftime('%Y-%m-%d') if tag.created_at else ""
-            }
-            tag_list.append(tag_data)
-        
-        # 计算分页信息
-        total_pages = (total + limit - 1) // limit
-        has_prev = page > 1
-        has_next = page < total_pages
-        
-        # 构建面包屑
-        breadcrumb = [
-            {"name": "首页", "url": "/views/home"}
-        ]
-        
-        data={
-            "tags": tag_list,
-            "current_page": page,
-            "total_pages": total_pages,
-            "total_items": total,
-            "limit": limit,
-            "has_prev": has_prev,
-            "has_next": has_next,
+        total, tags = _tags_page(session, page, limit)
+        tag_feeds = DB.get_tag_feed_ids([tag.id for tag in tags])
+        counts = DB.get_article_counts([mp_id for ids in tag_feeds.values() for mp_id in ids], exact=exact)
+        data = _build_tags_view(tags, total, page, limit, tag_feeds, counts)
+    except Exception as e:
+        print(f"获取首页数据错误: {str(e)}")
+    finally:
+        session.close()
+    return data
+
+#首页：标签和公众号共用一次文章数统计，查询次数与每页数量无关
+def get_home_view(
+    page: int ,
+    limit: int ,
+    exact: bool = False
+):
+    session = DB.get_read_session()
+    data={"tags": {}, "mps": {}}
+    try:
+        tags_total, tags = _tags_page(session, page, limit)
+        feeds_total, feeds = _feeds_page(session, page, limit)
+        tag_feeds = DB.get_tag_feed_ids([tag.id for tag in tags])
+        mp_ids = [feed.id for feed in feeds] + [mp_id for ids in tag_feeds.values() for mp_id in ids]
+        counts = DB.get_article_counts(mp_ids, exact=exact)
+        data = {
+            "tags": _build_tags_view(tags, tags_total, page, limit, tag_feeds, counts),
+            "mps": _build_mps_view(feeds, feeds_total, page, limit, counts),
         }
-        
-        
     except Exception as e:
         print(f"获取首页数据错误: {str(e)}")
     finally:
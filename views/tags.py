@@ -9,10 +9,12 @@ from core.db import DB
 from core.models.tags import Tags
 from core.models.feed import Feed
 from core.models.article import Article
+from core.models.tag_feed import TagFeed
 from core.lax.template_parser import TemplateParser
 from views.config import base
 from driver.wxarticle import Web
 from core.cache import cache_view, clear_cache_pattern
+from views.base import get_tags_view
 # 创建路由器
 router = APIRouter(tags=["标签"])
 
@@ -26,56 +28,13 @@ async def tags_view(
     """
     首页显示所有标签，支持分页
     """
-    session = DB.get_session()
     try:
-        # 查询标签总数
-        total = session.query(Tags).filter(Tags.status == 1).count()
-        
-        # 计算偏移量
-        offset = (page - 1) * limit
-        
-        # 查询标签列表
-        tags = session.query(Tags).filter(Tags.status == 1).order_by(Tags.created_at.desc()).offset(offset).limit(limit).all()
-        
-        # 处理标签数据
-        tag_list = []
-        for tag in tags:
-            # 解析mps_id JSON
-            mps_ids = []
-            if tag.mps_id:
-                try:
-                    mps_data = json.loads(tag.mps_id)
-                    mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-                except (json.JSONDecodeError, TypeError):
-                    mps_ids = []
-            
-            # 统计文章数量
-            article_count = 0
-            if mps_ids:
-                article_count = session.query(Article).filter(
-                    Article.mp_id.in_(mps_ids),
-                    Article.status == 1
-                ).count()
-            
-            # 获取关联的公众号数量
-            mp_count = len(mps_ids) if mps_ids else 0
-            
-            tag_data = {
-                "id": tag.id,
-                "name": tag.name,
-                "cover": Web.get_image_url(tag.cover) if tag.cover else "",
-                "intro": tag.intro,
-                "mp_count": mp_count,
-                "article_count": article_count,
-                "sync_time": datetime.fromtimestamp(tag.sync_time).strftime('%Y-%m-%d %H:%M') if tag.sync_time else "未同步",
-                "created_at": tag.created_at.strftime('%Y-%m-%d') if tag.created_at else ""
-            }
-            tag_list.append(tag_data)
-        
-        # 计算分页信息
-        total_pages = (total + limit - 1) // limit
-        has_prev = page > 1
-        has_next = page < total_pages
+        data = get_tags_view(page, limit)
+        tag_list = data.get("tags", [])
+        total = data.get("total_items", 0)
+        total_pages = data.get("total_pages", 0)
+        has_prev = data.get("has_prev", False)
+        has_next = data.get("has_next", False)
         
         # 构建面包屑
         breadcrumb = [
@@ -123,8 +82,6 @@ async def tags_view(
         })
         
         return HTMLResponse(content=html_content)
-    finally:
-        session.close()
 
 
 @router.get("/tag/{tag_id}", response_class=HTMLResponse, summary="标签详情页")
@@ -138,30 +95,20 @@ async def tag_detail_view(
     """
     显示标签详情和关联的文章列表
     """
-    session = DB.get_session()
+    session = DB.get_read_session()
     try:
         # 查询标签信息
         tag = session.query(Tags).filter(Tags.id == tag_id, Tags.status == 1).first()
         if not tag:
             raise HTTPException(status_code=404, detail="标签不存在")
         
-        # 解析mps_id JSON
-        mps_ids = []
-        if tag.mps_id:
-            try:
-                mps_data = json.loads(tag.mps_id)
-                mps_ids = [str(mp['id']) for mp in mps_data] if isinstance(mps_data, list) else []
-            except (json.JSONDecodeError, TypeError):
-                mps_ids = []
-        
-        # 获取关联的公众号信息
-        mps_info = []
-        if mps_ids:
-            mps_info = session.query(Feed).filter(Feed.id.in_(mps_ids)).all()
+        # 获取关联的公众号信息（tag_feeds关联表）
+        mps_info = session.query(Feed).join(TagFeed, TagFeed.mp_id == Feed.id).filter(TagFeed.tag_id == tag.id).all()
+        mps_ids = [mp.id for mp in mps_info]
         
         # 构建基础查询条件
         base_conditions = [
-            Article.mp_id.in_(mps_ids),
+            TagFeed.tag_id == tag.id,
             Article.status == 1
         ]
         
@@ -170,10 +117,13 @@ async def tag_detail_view(
             search_term = f"%{keyword.strip()}%"
             base_conditions.append(Article.title.like(search_term))
         
-        # 查询文章总数
+        # 查询文章总数：有关键字时实时统计，否则读取公众号文章计数
         total = 0
         if mps_ids:
-            total = session.query(Article).filter(*base_conditions).count()
+            if keyword and keyword.strip():
+                total = session.query(Article).join(TagFeed, TagFeed.mp_id == Article.mp_id).filter(*base_conditions).count()
+            else:
+                total = DB.count_articles(mps_ids)
         
         # 计算偏移量
         offset = (page - 1) * limit
@@ -183,13 +133,17 @@ async def tag_detail_view(
         if mps_ids:
             articles_query = session.query(Article, Feed).join(
                 Feed, Article.mp_id == Feed.id
+            ).join(
+                TagFeed, TagFeed.mp_id == Article.mp_id
             ).filter(*base_conditions).order_by(Article.publish_time.desc()).offset(offset).limit(limit).all()
             
+            # 只为缺少摘要的文章加载正文
+            contents = DB.get_article_contents([article.id for article, _ in articles_query if not article.description])
             for article, feed in articles_query:
                 article_data = {
                     "id": article.id,
                     "title": article.title,
-                    "description": article.description or Web.get_description(article.content),
+                    "description": article.description or Web.get_description(contents.get(article.id)),
                     "pic_url": Web.get_image_url(article.pic_url),
                     "mp_cover": Web.get_image_url(feed.mp_cover) if feed else "",
                     "url": article.url,